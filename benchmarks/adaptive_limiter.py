@@ -0,0 +1,155 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Run many concurrent reports against an SCC of limited capacity, with and
+without an AdaptiveLimiter.
+
+The stub SCC answers CAPACITY requests at once, stats reports in
+SERVER_DELAY seconds and appliance listings, sent after every report, in
+INVENTORY_DELAY seconds. Beyond that requests queue and are answered
+proportionally slower, and beyond OVERLOAD requests at once it answers
+503. Without a limiter every thread sends its requests at once, with one
+the requests in flight should settle around CAPACITY with few or no
+failures, and the quick listings should not make the reports look slow.
+
+    python benchmarks/adaptive_limiter.py [reports] [threads] [max_limit]
+"""
+
+import sys
+import json
+import time
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from steelscript.common.service import OAuth
+from steelscript.scc.core import SCC, AdaptiveLimiter, AppliancesReport
+from steelscript.scc.core.scc import SCCServerConnectionHook
+
+from concurrent_reports import StubSCC, StubServer, run_report
+
+# Requests the stub answers at once without slowing down
+CAPACITY = 8
+
+# Requests at once above which the stub answers 503
+OVERLOAD = 3 * CAPACITY
+
+# Seconds the stub takes to answer requests within its capacity
+SERVER_DELAY = 0.2
+INVENTORY_DELAY = 0.02
+
+
+class LimitedSCC(StubSCC):
+    in_flight = 0
+    peak = 0
+    rejected = 0
+
+    def _serve(self, delay, answer):
+        with self.lock:
+            LimitedSCC.in_flight += 1
+            LimitedSCC.peak = max(LimitedSCC.peak, LimitedSCC.in_flight)
+            load = LimitedSCC.in_flight
+        try:
+            if load > OVERLOAD:
+                with self.lock:
+                    LimitedSCC.rejected += 1
+                self.send_error(503)
+                return
+            time.sleep(delay * max(1.0, float(load) / CAPACITY))
+            self._send(answer())
+        finally:
+            with self.lock:
+                LimitedSCC.in_flight -= 1
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if not path.endswith('/appliances'):
+            return super(LimitedSCC, self).do_GET()
+
+        self._count(path)
+        self._serve(INVENTORY_DELAY, lambda: [])
+
+    def do_POST(self):
+        path = self.path.split('?')[0]
+        if path == '/api/common/1.0/oauth/token':
+            return super(LimitedSCC, self).do_POST()
+
+        self._count(path)
+        criteria = json.loads(self._body())
+
+        def answer():
+            start, end = criteria['start_time'], criteria['end_time']
+            return {'granularity': 300,
+                    'query_criteria': criteria,
+                    'response_data': [{'timestamp': t,
+                                       'data': [1, 2, 3, 4]}
+                                      for t in range(start, end, 300)]}
+        self._serve(SERVER_DELAY, answer)
+
+
+def run_mixed(scc, i):
+    run_report(scc, i)
+    AppliancesReport(scc).run()
+
+
+def run(host, reports, threads, limiter):
+    LimitedSCC.peak = LimitedSCC.rejected = 0
+    scc = SCC(host, auth=OAuth('access code'), pool_size=threads,
+              limiter=limiter)
+    limits = []
+
+    def sample(done):
+        while not done.wait(0.05):
+            limits.append(limiter.limit)
+
+    done = threading.Event()
+    if limiter:
+        threading.Thread(target=sample, args=(done,), daemon=True).start()
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [executor.submit(run_mixed, scc, i)
+                   for i in range(reports)]
+        errors = [f.exception() for f in futures if f.exception()]
+    elapsed = time.time() - start
+    done.set()
+
+    name = 'adaptive limiter' if limiter else 'no limiter'
+    print('%s: %.2f s (%.0f reports/s)'
+          % (name, elapsed, reports / elapsed))
+    print('  failed runs:          %d' % len(errors))
+    print('  503 answers:          %d' % LimitedSCC.rejected)
+    print('  peak requests at once %d (capacity %d)'
+          % (LimitedSCC.peak, CAPACITY))
+    if limiter:
+        settled = limits[len(limits) // 2:] or [limiter.limit]
+        print('  limit, second half:   %.1f to %.1f, mean %.1f'
+              % (min(settled), max(settled),
+                 sum(settled) / len(settled)))
+        print('  %s' % limiter.stats())
+    return errors
+
+
+def main(reports, threads, max_limit):
+    server = StubServer(('127.0.0.1', 0), LimitedSCC)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = 'http://127.0.0.1:%d' % server.server_address[1]
+    SCCServerConnectionHook.bootstrap_cache = None
+
+    print('%d reports on %d threads' % (reports, threads))
+    run(host, reports, threads, None)
+    errors = run(host, reports, threads,
+                 AdaptiveLimiter(max_limit=max_limit))
+    server.shutdown()
+    server.server_close()
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    defaults = [600, 64, 32]
+    sys.exit(main(*(args + defaults[len(args):])))
@@ -0,0 +1,144 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Stress a single shared SCC object with concurrent report runs.
+
+A local stub server stands in for the SCC. Every run must succeed with the
+expected data, the session must be bootstrapped exactly once and the number
+of TCP connections opened should stay close to the pool size.
+
+    python benchmarks/concurrent_reports.py [reports] [threads] [pool_size]
+"""
+
+import sys
+import json
+import time
+import datetime
+import threading
+import urllib.parse
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+
+from steelscript.common.service import OAuth
+from steelscript.scc.core import SCC, ThroughputStatsReport
+from steelscript.scc.core.scc import SCCServerConnectionHook
+
+# Seconds the stub takes to answer a report request
+SERVER_DELAY = 0.005
+
+
+class StubSCC(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    lock = threading.Lock()
+    connections = 0
+    requests = {}
+
+    def setup(self):
+        super(StubSCC, self).setup()
+        with self.lock:
+            StubSCC.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _count(self, path):
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def _send(self, obj):
+        body = json.dumps(obj).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length).decode()
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        self._count(path)
+        if path == '/api/common/1.0/services':
+            self._send([])
+        elif path == '/api/common/1.0/auth_info':
+            self._send({'supported_methods': ['OAUTH_2_0']})
+        elif path == '/api/common/1.0/info':
+            self._send({'sw_version': '9.1'})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        path = self.path.split('?')[0]
+        self._count(path)
+        body = self._body()
+        if path == '/api/common/1.0/oauth/token':
+            state = urllib.parse.parse_qs(body)['state'][0]
+            self._send({'access_token': 'token', 'state': state})
+            return
+
+        time.sleep(SERVER_DELAY)
+        criteria = json.loads(body)
+        start, end = criteria['start_time'], criteria['end_time']
+        self._send({'granularity': 300,
+                    'query_criteria': criteria,
+                    'response_data': [{'timestamp': t, 'data': [1, 2, 3, 4]}
+                                      for t in range(start, end, 300)]})
+
+
+class StubServer(ThreadingHTTPServer):
+    # The default backlog of 5 resets connections opened in a burst
+    request_queue_size = 1024
+
+
+def run_report(scc, i):
+    start = datetime.datetime.fromtimestamp(3600 * (i + 1),
+                                            datetime.timezone.utc)
+    report = ThroughputStatsReport(scc)
+    report.run(start_time=start,
+               end_time=start + datetime.timedelta(hours=1),
+               device='serial%d' % i, traffic_type='peak')
+    assert len(report.data) == 12, report.data
+    assert report.data[0]['timestamp'] == 3600 * (i + 1)
+
+
+def main(reports, threads, pool_size):
+    server = StubServer(('127.0.0.1', 0), StubSCC)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = 'http://127.0.0.1:%d' % server.server_address[1]
+
+    # Count every bootstrap rather than reusing earlier sessions
+    SCCServerConnectionHook.bootstrap_cache = None
+
+    scc = SCC(host, auth=OAuth('access code'), pool_size=pool_size)
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [executor.submit(run_report, scc, i)
+                   for i in range(reports)]
+        errors = [f.exception() for f in futures if f.exception()]
+    elapsed = time.time() - start
+    server.shutdown()
+    server.server_close()
+
+    print('%d reports on %d threads, pool size %d: %.2f s (%.0f reports/s)'
+          % (reports, threads, pool_size, elapsed, reports / elapsed))
+    print('  failed runs:          %d' % len(errors))
+    print('  OAuth token requests: %d'
+          % StubSCC.requests.get('/api/common/1.0/oauth/token', 0))
+    print('  TCP connections:      %d' % StubSCC.connections)
+    for e in errors[:5]:
+        print('  %r' % e)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    defaults = [500, 32, 32]
+    sys.exit(main(*(args + defaults[len(args):])))
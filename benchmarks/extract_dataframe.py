@@ -0,0 +1,69 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Compare the row-by-row conversion of stats response data into a pandas
+DataFrame, as formerly done by BaseSCCQuery.extract_dataframe, with the
+columnar conversion through ColumnarResult.
+
+    python benchmarks/extract_dataframe.py [rows ...]
+"""
+
+import sys
+import time
+
+import pandas
+
+from steelscript.scc.core.result import ColumnarResult
+
+VAL_COLS = ['wan_in', 'wan_out', 'lan_in', 'lan_out']
+KEY_COL = 'timestamp'
+
+
+def make_records(n):
+    start = 1500000000
+    return [{'timestamp': start + i * 300,
+             'data': [i * 1.5, i * 2.5, i * 3.5, i * 4.5]}
+            for i in range(n)]
+
+
+def row_by_row(records):
+    ret = []
+    for rec in records:
+        _dict = (dict((k, v) for k, v in zip(VAL_COLS, rec['data'])))
+        _dict[KEY_COL] = rec[KEY_COL]
+        ret.append(_dict)
+    return pandas.DataFrame(ret)
+
+
+def columnar(records):
+    return ColumnarResult.from_records(records, KEY_COL,
+                                       VAL_COLS).to_pandas()
+
+
+def best_of(func, records, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(records)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(sizes):
+    print('%10s %14s %14s %8s' % ('rows', 'row-by-row (s)', 'columnar (s)',
+                                  'speedup'))
+    for n in sizes:
+        records = make_records(n)
+        repeat = 5 if n <= 100000 else 2
+        old = best_of(row_by_row, records, repeat)
+        new = best_of(columnar, records, repeat)
+        print('%10d %14.4f %14.4f %7.1fx' % (n, old, new, old / new))
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [10000, 1000000])
@@ -0,0 +1,57 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Measure the cost of loading the SCC service definitions in a fresh
+process, with an empty servicedef cache and with a populated one.
+
+    python benchmarks/servicedef_startup.py [runs]
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+CHILD = """
+import time
+start = time.perf_counter()
+from steelscript.scc.core.scc import SCCServiceManager
+svcmgr = SCCServiceManager()
+loading = time.perf_counter()
+for name in ('cmc.stats', 'cmc.appliance_inventory'):
+    svcmgr.servicedef_manager.find_by_name(name, '1.0', 'riverbed')
+end = time.perf_counter()
+print('%f %f' % (end - start, end - loading))
+"""
+
+
+def measure(cache_dir, clear):
+    if clear:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    env = dict(os.environ, STEELSCRIPT_SCC_SERVICEDEF_CACHE=cache_dir)
+    out = subprocess.check_output([sys.executable, '-c', CHILD], env=env)
+    return [float(v) for v in out.split()]
+
+
+def main(runs):
+    cache_dir = os.path.join(tempfile.mkdtemp(), 'servicedef_cache')
+    try:
+        cold = [measure(cache_dir, clear=True) for _ in range(runs)]
+        warm = [measure(cache_dir, clear=False) for _ in range(runs)]
+    finally:
+        shutil.rmtree(os.path.dirname(cache_dir), ignore_errors=True)
+
+    print('best of %d fresh processes    startup   servicedefs' % runs)
+    for label, times in (('no cache', cold), ('cached', warm)):
+        print('  %-26s %7.1f ms %8.1f ms'
+              % (label, min(t[0] for t in times) * 1000,
+                 min(t[1] for t in times) * 1000))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
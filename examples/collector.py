@@ -0,0 +1,178 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Collect time series from an SCC into a local HistoryStore.
+
+Every resource is polled for every device each interval, only new buckets
+are requested, and the results are appended to the store, which rolls them
+up to hourly and daily buckets. For example:
+
+    python collector.py https://scc.example.com $ACCESS_CODE \\
+        --resources throughput,cpu_utilization --devices S1,S2 \\
+        --traffic_type peak --store /var/lib/scc/history.sqlite
+"""
+
+import time
+import collections
+
+from steelscript.scc.core.app import SCCApp
+from steelscript.scc.core.report import get_scc_report_class, \
+    granularities
+from steelscript.scc.core.poller import ReportPoller
+from steelscript.scc.core.history import HistoryStore, DEFAULT_PATH
+
+
+class CollectorApp(SCCApp):
+
+    services = ['stats']
+
+    # Seconds between purges of expired points
+    purge_interval = 3600
+
+    def add_options(self, parser):
+        super(CollectorApp, self).add_options(parser)
+
+        parser.add_option(
+            '--resources', dest='resources',
+            default='throughput,cpu_utilization',
+            help='Comma separated time series resources to collect '
+            '(defaults to "throughput,cpu_utilization")')
+
+        parser.add_option(
+            '--devices', dest='devices', default=None,
+            help='Comma separated device IDs to collect')
+
+        parser.add_option(
+            '--traffic_type', dest='traffic_type', default=None,
+            help='Traffic type of the resources accepting one')
+
+        parser.add_option(
+            '--store', dest='store', default=DEFAULT_PATH,
+            help='SQLite file of the history store (defaults to %s)'
+            % DEFAULT_PATH)
+
+        parser.add_option(
+            '--interval', dest='interval', type='int', default=300,
+            help='Seconds between polls (defaults to 300)')
+
+        parser.add_option(
+            '--lookback', dest='lookback', type='int', default=3600,
+            help='Seconds of history fetched for a new series '
+            '(defaults to 3600)')
+
+        parser.add_option(
+            '--polls', dest='polls', type='int', default=None,
+            help='Number of polls before exiting, runs forever by default')
+
+        parser.add_option(
+            '--keep_5min', dest='keep_5min', type='int', default=14,
+            help='Days 5 minute points are kept (defaults to 14)')
+
+        parser.add_option(
+            '--keep_hourly', dest='keep_hourly', type='int', default=180,
+            help='Days hourly points are kept (defaults to 180)')
+
+        parser.add_option(
+            '--keep_daily', dest='keep_daily', type='int', default=1825,
+            help='Days daily points are kept (defaults to 1825)')
+
+    def validate_args(self):
+        super(CollectorApp, self).validate_args()
+
+        if not self.options.devices:
+            self.parser.error("Comma separated device IDs are required")
+
+        self.report_classes = collections.OrderedDict()
+        for resource in self.options.resources.split(','):
+            try:
+                cls = get_scc_report_class('stats', resource)
+            except KeyError:
+                self.parser.error("'%s' is not a valid resource" % resource)
+            if cls.key_field != 'timestamp':
+                self.parser.error("'%s' is not a time series resource"
+                                  % resource)
+            self.report_classes[resource] = cls
+
+    def criteria(self, report_class, device):
+        """Return the criteria collecting report_class for one device."""
+        fields = (report_class.required_fields +
+                  report_class.non_required_fields)
+        criteria = {}
+        if 'device' in fields:
+            criteria['device'] = device
+        elif 'devices' in fields:
+            criteria['devices'] = [device]
+        if self.options.traffic_type and 'traffic_type' in fields:
+            criteria['traffic_type'] = self.options.traffic_type
+        return criteria
+
+    def main(self):
+        store = HistoryStore(
+            self.options.store,
+            retention={300: self.options.keep_5min * 86400,
+                       3600: self.options.keep_hourly * 86400,
+                       86400: self.options.keep_daily * 86400})
+        poller = ReportPoller(self.scc, lookback=self.options.lookback)
+
+        series_ids = {}
+        for resource, cls in self.report_classes.items():
+            for device in self.options.devices.split(','):
+                criteria = self.criteria(cls, device)
+                series = poller.add(cls, **criteria)
+                series_ids[series] = store.series_id(
+                    self.scc.host, resource, criteria, columns=cls.columns)
+
+        polls = 0
+        last_purge = 0
+        try:
+            while self.options.polls is None or polls < self.options.polls:
+                started = time.time()
+
+                records = collections.defaultdict(list)
+                for point in poller.poll(started):
+                    records[point.series].append(
+                        {'timestamp': point.timestamp, 'data': point.data})
+                stored = stored_series = 0
+                for series, recs in records.items():
+                    # Points of responses without a granularity were
+                    # polled at the finest one, as the poller does
+                    granularity = series.granularity or min(granularities)
+                    try:
+                        store.add(series_ids[series], granularity, recs)
+                    except Exception as e:
+                        # The next poll requests the points again,
+                        # reported below until then
+                        poller.rewind(series,
+                                      min(r['timestamp'] for r in recs))
+                        series.error = e
+                    else:
+                        stored += len(recs)
+                        stored_series += 1
+
+                failed = [s for s in poller.series if s.error]
+                print('%s: stored %d points of %d series, %d failed' %
+                      (time.strftime('%Y-%m-%d %H:%M:%S'), stored,
+                       stored_series, len(failed)))
+                for series in failed:
+                    print('  %s %s: %s' % (series.name, series.criteria,
+                                           series.error))
+
+                if started - last_purge >= self.purge_interval:
+                    store.purge(started)
+                    last_purge = started
+
+                polls += 1
+                if self.options.polls is None or polls < self.options.polls:
+                    time.sleep(max(0, started + self.options.interval -
+                                   time.time()))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            store.close()
+
+if __name__ == '__main__':
+    CollectorApp().run()
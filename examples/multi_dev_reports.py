@@ -5,13 +5,16 @@
 # as set forth in the License.
 
 from steelscript.scc.core.app import SCCApp
-from steelscript.scc.core import report as report_module
+from steelscript.scc.core.batch import ReportBatch
 
 import pprint
 
 
 class MultiDevStatsReportApp(SCCApp):
 
+    resources = ['connection_pooling', 'connection_forwarding', 'dns_usage',
+                 'dns_cache_hits', 'http', 'nfs', 'ssl', 'disk_load']
+
     def add_options(self, parser):
         super(MultiDevStatsReportApp, self).add_options(parser)
 
@@ -27,53 +30,24 @@ class MultiDevStatsReportApp(SCCApp):
             'devices. If multiple devices are queried on, the data points '
             'are the sum across all the devices.')
 
-    def main(self):
-        with report_module.ConnectionPoolingStatsReport(self.scc) as report:
-            report.run(timefilter=self.options.timefilter,
-                       devices=self.options.devices)
-            pprint.pprint(report.data)
-            print('')
-
-        with report_module.ConnectionForwardingStatsReport(self.scc) as report:
-            report.run(timefilter=self.options.timefilter,
-                       devices=self.options.devices)
-            pprint.pprint(report.data)
-            print('')
-
-        with report_module.DNSUsageStatsReport(self.scc) as report:
-            report.run(timefilter=self.options.timefilter,
-                       devices=self.options.devices)
-            pprint.pprint(report.data)
-            print('')
-
-        with report_module.DNSCacheHitsStatsReport(self.scc) as report:
-            report.run(timefilter=self.options.timefilter,
-                       devices=self.options.devices)
-            pprint.pprint(report.data)
-            print('')
-
-        with report_module.HTTPStatsReport(self.scc) as report:
-            report.run(timefilter=self.options.timefilter,
-                       devices=self.options.devices)
-            pprint.pprint(report.data)
-            print('')
-
-        with report_module.NFSStatsReport(self.scc) as report:
-            report.run(timefilter=self.options.timefilter,
-                       devices=self.options.devices)
-            pprint.pprint(report.data)
-            print('')
-
-        with report_module.SSLStatsReport(self.scc) as report:
-            report.run(timefilter=self.options.timefilter,
-                       devices=self.options.devices)
-            pprint.pprint(report.data)
-            print('')
+        parser.add_option(
+            '--max_workers', dest='max_workers', type='int', default=4,
+            help='Number of reports to run concurrently (defaults to 4)')
 
-        with report_module.DiskLoadStatsReport(self.scc) as report:
-            report.run(timefilter=self.options.timefilter,
-                       devices=self.options.devices)
-            pprint.pprint(report.data)
+    def main(self):
+        batch = ReportBatch(
+            self.scc, max_workers=self.options.max_workers)
+
+        for resource in self.resources:
+            batch.add(resource, timefilter=self.options.timefilter,
+                      devices=self.options.devices)
+
+        for result in batch.run():
+            print('%s:' % result.name)
+            if result.ok:
+                pprint.pprint(result.data)
+            else:
+                print('  failed: %s' % result.error)
             print('')
 
 if __name__ == '__main__':
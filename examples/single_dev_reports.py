@@ -5,13 +5,15 @@
 # as set forth in the License.
 
 from steelscript.scc.core.app import SCCApp
-from steelscript.scc.core import report as report_module
+from steelscript.scc.core.batch import ReportBatch
 
 import pprint
 
 
 class SingleDevStatsReportApp(SCCApp):
 
+    resources = ['sdr_adaptive', 'memory_paging', 'cpu_utilization', 'pfs']
+
     def add_options(self, parser):
         super(SingleDevStatsReportApp, self).add_options(parser)
 
@@ -24,6 +26,10 @@ class SingleDevStatsReportApp(SCCApp):
         parser.add_option('--device', dest='device', default=None,
                           help='Device ID')
 
+        parser.add_option(
+            '--max_workers', dest='max_workers', type='int', default=4,
+            help='Number of reports to run concurrently (defaults to 4)')
+
     def validate_args(self):
         super(SingleDevStatsReportApp, self).validate_args()
 
@@ -31,28 +37,20 @@ class SingleDevStatsReportApp(SCCApp):
             self.parser.error("Device (serial ID) is required")
 
     def main(self):
-        with report_module.SDRAdaptiveStatsReport(self.scc) as report:
-            report.run(timefilter=self.options.timefilter,
-                       device=self.options.device)
-            pprint.pprint(report.data)
-            print('')
-
-        with report_module.MemoryPagingStatsReport(self.scc) as report:
-            report.run(timefilter=self.options.timefilter,
-                       device=self.options.device)
-            pprint.pprint(report.data)
-            print('')
-
-        with report_module.CpuUtilizationStatsReport(self.scc) as report:
-            report.run(timefilter=self.options.timefilter,
-                       device=self.options.device)
-            pprint.pprint(report.data)
+        batch = ReportBatch(
+            self.scc, max_workers=self.options.max_workers)
+
+        for resource in self.resources:
+            batch.add(resource, timefilter=self.options.timefilter,
+                      device=self.options.device)
+
+        for result in batch.run():
+            print('%s:' % result.name)
+            if result.ok:
+                pprint.pprint(result.data)
+            else:
+                print('  failed: %s' % result.error)
             print('')
 
-        with report_module.PFSStatsReport(self.scc) as report:
-            report.run(timefilter=self.options.timefilter,
-                       device=self.options.device)
-            pprint.pprint(report.data)
-
 if __name__ == '__main__':
     SingleDevStatsReportApp().run()
@@ -37,7 +37,8 @@ test = ['pytest', 'testfixtures', 'mock']
 doc = ['sphinx']
 install_requires = ['steelscript>=24.2.0',
                     'sleepwalker>=2.0',
-                    'reschema==2.0']
+                    'reschema==2.0',
+                    'numpy']
 setup_requires = ['pytest-runner']
 
 setup(
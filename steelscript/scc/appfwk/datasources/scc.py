@@ -17,6 +17,7 @@ from steelscript.appfwk.apps.devices.forms import fields_add_device_selection
 from steelscript.appfwk.apps.datasource.forms import fields_add_time_selection
 from steelscript.appfwk.apps.datasource.models import TableField
 from steelscript.scc.core.report import get_scc_report_class
+from steelscript.scc.core.result import ColumnarResult
 from steelscript.appfwk.apps.jobs import QueryComplete
 
 logger = logging.getLogger(__name__)
@@ -152,29 +153,25 @@ class BaseSCCQuery(TableQueryBase):
             [{ key: val, 'data': [v1, v2, v3, v4]}]
             val_cols: ['wan_in', 'wan_out', 'lan_in', 'lan_out']
 
-            it needs to be converted into :
+            it is converted in bulk into a dataframe with columns:
 
-            {key: val, 'wan_in': v1, 'wan_out': v2,
-            'lan_in': v3, 'lan_out': v4}
+            key, 'wan_in', 'wan_out', 'lan_in', 'lan_out'
+
+            where values are floats and timestamp keys are datetime64.
 
             or resp_data can be as below:
             [{k1: v1, k2: v2,...}...]
 
-            Last step is to convert the above into pandas dataframe
+            which is passed to pandas as is.
         """
 
         if not resp_data:
             return None
 
-        # check if records needs to be converted into dicts
+        # records with a data array are converted column-wise
         if self.val_cols and self.key_col:
-            ret = []
-            for rec in resp_data:
-                _dict = (dict((k, v)
-                         for k, v in zip(self.val_cols, rec['data'])))
-                _dict[self.key_col] = rec[self.key_col]
-                ret.append(_dict)
-            resp_data = ret
+            return ColumnarResult.from_records(
+                resp_data, self.key_col, self.val_cols).to_pandas()
 
         return pandas.DataFrame(resp_data)
 
@@ -11,3 +11,19 @@ a SteelCentral Controller appliance.
 """
 from steelscript.scc.core.report import *
 from steelscript.scc.core.scc import *
+from steelscript.scc.core.aio import *
+from steelscript.scc.core.batch import *
+from steelscript.scc.core.cache import *
+from steelscript.scc.core.segments import *
+from steelscript.scc.core.result import *
+from steelscript.scc.core.streaming import *
+from steelscript.scc.core.bootstrap import *
+from steelscript.scc.core.federation import *
+from steelscript.scc.core.singleflight import *
+from steelscript.scc.core.poller import *
+from steelscript.scc.core.history import *
+from steelscript.scc.core.rollups import *
+from steelscript.scc.core.pivot import *
+from steelscript.scc.core.inventory import *
+from steelscript.scc.core.sweep import *
+from steelscript.scc.core.limiter import *
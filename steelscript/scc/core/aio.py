@@ -0,0 +1,117 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Asyncio support for running SCC reports.
+
+The underlying REST calls are blocking, so :py:class:`AsyncSCC` runs them on
+a bounded thread pool and exposes coroutines that can be awaited from an
+event loop. Many reports can then be in flight at the same time, while
+``max_concurrent`` caps how many reports run at once. A report split into
+time windows or device chunks, or fanned out over several values, sends
+up to its ``max_workers`` requests at once, so up to max_concurrent x
+max_workers requests may reach the SCC. Pass a ``limiter`` to bound the
+requests themselves.
+
+.. code-block:: python
+
+    scc = AsyncSCC(host, auth=OAuth(access_code), max_concurrent=4)
+    reports = await scc.gather(
+        (CpuUtilizationStatsReport, dict(device=serial,
+                                         timefilter='last 1 hour')),
+        (MemoryPagingStatsReport, dict(device=serial,
+                                       timefilter='last 1 hour')))
+"""
+
+import asyncio
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+
+from steelscript.scc.core.scc import SCC
+from steelscript.scc.core.report import stats_report_class
+
+__all__ = ['AsyncSCC']
+
+logger = logging.getLogger(__name__)
+
+# Default number of reports allowed to run at once
+DEFAULT_MAX_CONCURRENT = 8
+
+
+class AsyncSCC(SCC):
+    """SCC object whose reports can be awaited from asyncio code.
+
+    Report objects accept an ``AsyncSCC`` in place of an ``SCC``, and
+    their :py:meth:`arun <steelscript.scc.core.report.BaseSCCReport.arun>`
+    coroutine executes on the thread pool owned by this object.
+    """
+
+    def __init__(self, host, port=None, auth=None, cache=None,
+                 segment_store=None, services=None, pool_size=None,
+                 max_concurrent=DEFAULT_MAX_CONCURRENT, inventory_ttl=None,
+                 limiter=None):
+        """Create an AsyncSCC object
+
+        :param pool_size: int, number of keep-alive HTTP connections kept
+            open to the SCC, defaults to max_concurrent
+        :param max_concurrent: int, maximum number of reports running
+            against the SCC at the same time, each of which may send
+            several requests at once
+        :param limiter: optional AdaptiveLimiter object, or True for the
+            one of host, bounding the requests sent at once across all
+            reports
+        """
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1, got %s"
+                             % max_concurrent)
+
+        super(AsyncSCC, self).__init__(host, port=port, auth=auth,
+                                       cache=cache,
+                                       segment_store=segment_store,
+                                       services=services,
+                                       pool_size=pool_size or max_concurrent,
+                                       inventory_ttl=inventory_ttl,
+                                       limiter=limiter)
+        self.max_concurrent = max_concurrent
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent,
+                                           thread_name_prefix='scc')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, type, value, traceback):
+        self.close()
+
+    def close(self):
+        """Shut down the thread pool once pending reports complete."""
+        self.executor.shutdown(wait=False)
+
+    async def run_report(self, report_class, **kwargs):
+        """Run a single report and return the report object.
+
+        :param report_class: report class, or the resource name of a
+            ``cmc.stats`` report such as 'throughput'
+        :param kwargs: criteria passed to the report's run method
+        """
+        report_class = stats_report_class(report_class)[1]
+        report = report_class(self)
+        await report.arun(**kwargs)
+        return report
+
+    async def gather(self, *requests, return_exceptions=False):
+        """Run several reports concurrently.
+
+        :param requests: tuples of (report_class, criteria dict)
+        :param return_exceptions: bool, if True a failed report yields its
+            exception in the result list instead of raising
+
+        Returns the report objects in the order requested.
+        """
+        coros = [self.run_report(report_class, **(criteria or {}))
+                 for report_class, criteria in requests]
+        return await asyncio.gather(*coros,
+                                    return_exceptions=return_exceptions)
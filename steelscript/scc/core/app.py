@@ -11,6 +11,11 @@ from steelscript.common.service import OAuth
 
 class SCCApp(Application):
     """Class to wrap common command line parsing"""
+
+    # Attribute names of the SCC services used by the application, None
+    # for all of them, see SCC.SERVICES
+    services = None
+
     def __init__(self, *args, **kwargs):
         super(SCCApp, self).__init__(*args, **kwargs)
         self.scc = None
@@ -34,4 +39,5 @@ class SCCApp(Application):
     def setup(self):
         super(SCCApp, self).setup()
         self.scc = SCC(host=self.options.host,
-                       auth=OAuth(self.options.access_code))
+                       auth=OAuth(self.options.access_code),
+                       services=self.services)
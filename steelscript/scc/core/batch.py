@@ -0,0 +1,129 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Run many SCC reports concurrently over a single SCC object.
+
+.. code-block:: python
+
+    batch = ReportBatch(scc, max_workers=4)
+    for resource in ['http', 'nfs', 'ssl', 'disk_load']:
+        batch.add(resource, timefilter='last 1 hour')
+
+    for result in batch.run():
+        if result.ok:
+            pprint.pprint(result.data)
+        else:
+            print('%s failed: %s' % (result.name, result.error))
+"""
+
+import logging
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from steelscript.scc.core.report import stats_report_class, run_report
+
+__all__ = ['BatchResult', 'ReportBatch']
+
+logger = logging.getLogger(__name__)
+
+# Default size of the thread pool used to run a batch
+DEFAULT_MAX_WORKERS = 8
+
+
+class BatchResult(object):
+    """Outcome of one report run as part of a :py:class:`ReportBatch`.
+
+    :param index: int, position of the request in the batch
+    :param name: string, resource name or report class name
+    :param report: the report object that was run
+    :param criteria: dict of criteria the report was run with
+    :param error: exception raised by the report, None on success
+    :param elapsed: float, seconds spent running the report
+    """
+
+    def __init__(self, index, name, report, criteria, error=None,
+                 elapsed=None):
+        self.index = index
+        self.name = name
+        self.report = report
+        self.criteria = criteria
+        self.error = error
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return '<BatchResult %s %s>' % (self.name,
+                                        'ok' if self.ok else 'failed')
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def data(self):
+        return self.report.data
+
+
+class ReportBatch(object):
+    """Run a list of reports on a bounded thread pool.
+
+    Reports are identified either by report class or by the resource
+    name used as key in ``scc_stats_reports``, e.g. 'throughput'.
+    """
+
+    def __init__(self, scc, requests=None, max_workers=DEFAULT_MAX_WORKERS):
+        """Create a ReportBatch object
+
+        :param scc: SCC object shared by all reports in the batch
+        :param requests: list of (report_class, criteria dict) pairs
+        :param max_workers: int, maximum number of reports run at once
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1, got %s"
+                             % max_workers)
+        self.scc = scc
+        self.max_workers = max_workers
+        self.requests = []
+        for report_class, criteria in (requests or []):
+            self.add(report_class, **(criteria or {}))
+
+    def __len__(self):
+        return len(self.requests)
+
+    def add(self, report_class, **criteria):
+        """Add a report to the batch.
+
+        :param report_class: report class, or resource name of the
+            report in ``scc_stats_reports``
+        :param criteria: keyword criteria passed to the report's run method
+        """
+        name, report_class = stats_report_class(report_class)
+        self.requests.append((name, report_class, criteria))
+
+    def _run_one(self, index, name, report_class, criteria):
+        report = report_class(self.scc)
+        error, elapsed = run_report(report, criteria, label=name)
+        return BatchResult(index, name, report, criteria, error=error,
+                           elapsed=elapsed)
+
+    def run(self):
+        """Run all reports, yielding a BatchResult as each one finishes.
+
+        A failing report does not stop the batch, its exception is
+        available as the ``error`` attribute of its result.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix='scc-batch') as executor:
+            futures = [executor.submit(self._run_one, i, name, cls, criteria)
+                       for i, (name, cls, criteria)
+                       in enumerate(self.requests)]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def run_all(self):
+        """Run all reports and return results in the order they were added.
+        """
+        return sorted(self.run(), key=lambda r: r.index)
@@ -0,0 +1,186 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Cache of the session bootstrap of SCC connections.
+
+Connecting to an SCC takes several round trips before the first report
+can run: the API version checks, the exchange of the OAuth access code for
+an access token and the ``/api/common/1.0/info`` software version check.
+A :py:class:`BootstrapCache` remembers the verified software version and
+the resulting ``Authorization`` header per host, so that later connections
+to the same host, in the same process or, with a path, in later runs of a
+script skip all of them:
+
+.. code-block:: python
+
+    SCCServerConnectionHook.bootstrap_cache = BootstrapCache(
+        path='~/.steelscript/scc_bootstrap.json', ttl=1800)
+
+The file holds access tokens, it is created readable by its owner only and
+ignored if it belongs to another user or its permissions are any wider.
+Access codes are never stored, entries are keyed by host and a hash of the
+access code.
+"""
+
+import os
+import json
+import stat
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+
+__all__ = ['BootstrapCache', 'make_bootstrap_key']
+
+logger = logging.getLogger(__name__)
+
+# Default number of seconds a bootstrap entry is trusted
+DEFAULT_TTL = 1800
+
+
+def make_bootstrap_key(host, auth):
+    """Return the cache key for a connection to host with auth.
+
+    Returns None when auth is not cacheable, only OAuth access codes and
+    unauthenticated connections are.
+    """
+    if auth is None:
+        secret = ''
+    else:
+        access_code = getattr(auth, 'access_code', None)
+        if not access_code:
+            return None
+        secret = hashlib.sha256(access_code.encode()).hexdigest()
+    return '%s|%s' % (host, secret)
+
+
+class BootstrapCache(object):
+    """Thread-safe store of bootstrapped sessions, optionally on disk."""
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL):
+        """Create a BootstrapCache object
+
+        :param path: string, JSON file the entries are persisted to, kept
+            in memory only if None
+        :param ttl: int, seconds an entry is trusted after the session was
+            bootstrapped
+        """
+        self.path = os.path.expanduser(path) if path else None
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def _load(self):
+        """Return the entries of the file, or an empty dict."""
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            return {}
+
+        with os.fdopen(fd) as f:
+            st = os.fstat(f.fileno())
+            if ((hasattr(os, 'getuid') and st.st_uid != os.getuid()) or
+                    st.st_mode & (stat.S_IRWXG | stat.S_IRWXO)):
+                logger.warning("Ignoring bootstrap cache %s, it must belong "
+                               "to the current user and only be accessible "
+                               "by them" % self.path)
+                return {}
+            try:
+                return json.load(f)
+            except ValueError:
+                logger.warning("Ignoring corrupt bootstrap cache %s"
+                               % self.path)
+                return {}
+
+    def _save(self):
+        dirname = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(dirname, mode=0o700, exist_ok=True)
+
+        # mkstemp creates the file with mode 0600
+        fd, tmp = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp, self.path)
+        except Exception:
+            os.unlink(tmp)
+            raise
+
+    def _purge(self, now):
+        for key in [k for k, v in self._entries.items()
+                    if v['expires'] <= now]:
+            del self._entries[key]
+
+    def get(self, host, auth):
+        """Return the unexpired entry for host and auth, or None.
+
+        Entries are dicts with 'sw_version', 'authorization' and
+        'expires' keys.
+        """
+        key = make_bootstrap_key(host, auth)
+        if key is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self.path:
+                # Another process may have bootstrapped the host since
+                self._entries.update(self._load())
+                entry = self._entries.get(key)
+
+            if entry is not None and entry['expires'] <= time.time():
+                del self._entries[key]
+                entry = None
+        return entry
+
+    def put(self, host, auth, sw_version, authorization):
+        """Store a freshly bootstrapped session.
+
+        :param sw_version: string, software version reported by the SCC
+        :param authorization: string, value of the Authorization header,
+            None for unauthenticated connections
+        """
+        key = make_bootstrap_key(host, auth)
+        if key is None:
+            return
+
+        now = time.time()
+        with self._lock:
+            if self.path:
+                self._entries.update(self._load())
+            self._entries[key] = {'sw_version': sw_version,
+                                  'authorization': authorization,
+                                  'expires': now + self.ttl}
+            self._purge(now)
+            if self.path:
+                try:
+                    self._save()
+                except OSError:
+                    logger.warning("Unable to write bootstrap cache %s"
+                                   % self.path, exc_info=True)
+
+    def invalidate(self, host, auth):
+        """Drop the entry for host and auth, e.g. once its token expired.
+        """
+        key = make_bootstrap_key(host, auth)
+        with self._lock:
+            if self.path:
+                self._entries.update(self._load())
+            if self._entries.pop(key, None) is not None and self.path:
+                try:
+                    self._save()
+                except OSError:
+                    logger.warning("Unable to write bootstrap cache %s"
+                                   % self.path, exc_info=True)
+
+    def clear(self):
+        """Drop all entries, removing the file if any."""
+        with self._lock:
+            self._entries.clear()
+            if self.path and os.path.exists(self.path):
+                os.unlink(self.path)
@@ -0,0 +1,173 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+In-memory cache of SCC report responses.
+
+A :py:class:`ReportCache` can be attached to an SCC object, in which case
+every report run through that object shares it, or given to a single
+report object:
+
+.. code-block:: python
+
+    scc = SCC(host, auth=OAuth(access_code), cache=ReportCache(ttl=120))
+
+    report = ThroughputStatsReport(scc)
+    report.run(device=serial, timefilter='last 1 hour')   # miss
+    report.run(device=serial, timefilter='last 1 hour')   # hit
+
+    scc.cache.stats()
+
+A cache may be shared by SCC objects of different hosts and credentials,
+entries are keyed by host and by a hash of the OAuth access code or
+username, so a report only gets responses fetched with its own
+credentials. Reports using other authentication objects are not cached.
+
+Entries expire ``ttl`` seconds after being stored and the least recently
+used entries are evicted once ``max_entries`` or ``max_bytes`` is exceeded.
+"""
+
+import json
+import time
+import hashlib
+import logging
+import threading
+import collections
+
+__all__ = ['ReportCache', 'make_cache_key', 'auth_identity']
+
+logger = logging.getLogger(__name__)
+
+
+def auth_identity(auth):
+    """Return a string identifying the credentials of auth, without the
+    secret itself, or None if auth can not be identified."""
+    if auth is None:
+        return ''
+    for attr in ('access_code', 'username'):
+        value = getattr(auth, attr, None)
+        if value:
+            return '%s:%s' % (attr,
+                              hashlib.sha256(value.encode()).hexdigest())
+    return None
+
+
+def make_cache_key(host, service, resource, link, criteria, auth=None,
+                   snap=None):
+    """Return a hashable key identifying a request to the SCC.
+
+    Returns None when auth can not be identified, such requests must not
+    be cached.
+
+    :param auth: authentication object the request is sent with, OAuth
+        access codes and usernames are part of the key, hashed
+    :param snap: int, seconds start_time and end_time are rounded down
+        to, None to use them as is
+    """
+    identity = auth_identity(auth)
+    if identity is None:
+        return None
+    if snap and criteria:
+        criteria = dict(criteria)
+        for name in ('start_time', 'end_time'):
+            if criteria.get(name):
+                criteria[name] -= criteria[name] % snap
+    return (host, identity, service, resource, link,
+            json.dumps(criteria, sort_keys=True))
+
+
+class ReportCache(object):
+    """Thread-safe TTL and LRU bounded cache of response payloads.
+
+    Payloads are kept serialized, which both bounds memory by size and
+    hands every caller its own copy of the data.
+    """
+
+    def __init__(self, ttl=60, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        """Create a ReportCache object
+
+        :param ttl: int, seconds an entry stays valid
+        :param max_entries: int, maximum number of entries held
+        :param max_bytes: int, maximum total size of the serialized
+            payloads held
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        expires, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def get(self, key):
+        """Return the cached payload for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+
+        return json.loads(value)
+
+    def put(self, key, payload):
+        """Store payload under key, evicting entries as needed."""
+        value = json.dumps(payload)
+        if len(value) > self.max_bytes:
+            logger.debug("Not caching %d byte payload, larger than cache"
+                         % len(value))
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._bytes += len(value)
+
+            while (len(self._entries) > self.max_entries or
+                   self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries, statistics are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return a dict of cache statistics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'hit_ratio': (float(self.hits) / lookups
+                                  if lookups else 0.0),
+                    'evictions': self.evictions,
+                    'expirations': self.expirations,
+                    'entries': len(self._entries),
+                    'bytes': self._bytes}
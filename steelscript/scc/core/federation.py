@@ -0,0 +1,236 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Run the same report on several SCCs and merge the results.
+
+.. code-block:: python
+
+    federation = FederatedSCC([SCC(host, auth=OAuth(code))
+                               for host, code in regions])
+    report = federation.run(ThroughputStatsReport, timefilter='last 1 hour',
+                            traffic_type='optimized')
+    report.data        # values summed per timestamp across all SCCs
+    report.failures    # {host: exception} of the SCCs that failed
+
+Reports of byte and packet counters, whose ``federation_merge`` is 'sum',
+have their values summed per timestamp or port, as the SCC itself does
+across devices. Records of other reports, such as percentages or per
+appliance values, are concatenated with the host of the SCC they came from
+stored in the ``scc`` field of each record.
+
+Reports run with fanned out criteria, such as a list of QoS classes, are
+merged the same way for each value, ``data`` is then a dict of the merged
+records by value.
+"""
+
+import logging
+import collections
+
+from concurrent.futures import ThreadPoolExecutor
+
+from steelscript.scc.core.report import stats_report_class, run_report, \
+    sum_records, SCCException
+from steelscript.scc.core.batch import BatchResult
+from steelscript.scc.core.result import ColumnarResult, SeriesMatrix
+
+__all__ = ['FederatedReport', 'FederatedSCC']
+
+logger = logging.getLogger(__name__)
+
+# Field added to concatenated records to identify their SCC
+HOST_FIELD = 'scc'
+
+
+class FederatedReport(object):
+    """Merged outcome of a report run on every SCC of a federation.
+
+    :param report_class: the report class that was run
+    :param results: list of BatchResult objects, one per SCC in the
+        order of the federation, whose name is the SCC host
+    """
+
+    def __init__(self, report_class, results):
+        self.report_class = report_class
+        self.results = results
+        self.granularity = None
+        self.data = self._merge()
+        self._result = None
+
+    def __repr__(self):
+        return '<FederatedReport %s %d/%d ok>' % (
+            self.report_class.__name__,
+            len(self.results) - len(self.failures), len(self.results))
+
+    @property
+    def ok(self):
+        """True if the report succeeded on every SCC."""
+        return not self.failures
+
+    @property
+    def failures(self):
+        """Dict of the exception raised by each failed SCC, by host."""
+        return dict((r.name, r.error) for r in self.results if not r.ok)
+
+    def _merge(self):
+        succeeded = [r for r in self.results if r.ok]
+        if not succeeded:
+            return None
+
+        granularities = set(r.report.granularity for r in succeeded)
+        if len(granularities) > 1:
+            logger.warning("SCCs returned %s data with different "
+                           "granularities %s" % (self.report_class.__name__,
+                                                 sorted(granularities)))
+        else:
+            self.granularity = granularities.pop()
+
+        # Fanned out reports hold a list of records per value
+        if any(r.report._fanout_field(r.report.criteria)
+               for r in succeeded):
+            values = collections.OrderedDict()
+            for r in succeeded:
+                for value in (r.data or {}):
+                    values.setdefault(value, None)
+            return collections.OrderedDict(
+                (value, self._merge_records(
+                    [(r.name, (r.data or {}).get(value)) for r in succeeded]))
+                for value in values)
+
+        return self._merge_records([(r.name, r.data) for r in succeeded])
+
+    def _merge_records(self, host_records):
+        """Merge the records of each SCC, listed as (host, records)."""
+        key_field = self.report_class.key_field
+        if key_field and self.report_class.federation_merge == 'sum':
+            return sum_records((records or []
+                                for _, records in host_records), key_field)
+
+        data = []
+        for host, records in host_records:
+            records = records or []
+            if isinstance(records, dict):
+                records = [records]
+            for rec in records:
+                rec = dict(rec)
+                rec[HOST_FIELD] = host
+                data.append(rec)
+        return data
+
+    @property
+    def result(self):
+        """Merged data, built on first use.
+
+        A :py:class:`ColumnarResult
+        <steelscript.scc.core.result.ColumnarResult>` of the records, or of
+        the values fanned out over, for summed reports. Concatenated time
+        series are returned as a :py:class:`SeriesMatrix
+        <steelscript.scc.core.result.SeriesMatrix>` of SCC x timestamp x
+        column.
+        """
+        if self._result is None and self.data is not None:
+            key_field = self.report_class.key_field
+            if not key_field:
+                raise SCCException("%s data can not be converted to "
+                                   "columns" % self.report_class.__name__)
+            succeeded = [r for r in self.results if r.ok]
+            report = succeeded[0].report
+            summed = self.report_class.federation_merge == 'sum'
+            field = report._fanout_field(report.criteria)
+
+            if field is None and (summed or key_field != 'timestamp'):
+                self._result = ColumnarResult.from_records(
+                    self.data, key_field, report.get_columns(),
+                    granularity=self.granularity)
+            elif field is None:
+                self._result = SeriesMatrix.from_results(
+                    HOST_FIELD, [(r.name, r.report.result)
+                                 for r in succeeded],
+                    columns=report.get_columns(),
+                    granularity=self.granularity)
+            elif not summed:
+                raise SCCException("Fanned out %s data of several SCCs can "
+                                   "not be converted to columns, use the "
+                                   "result of each SCC"
+                                   % self.report_class.__name__)
+            else:
+                results = [(value, ColumnarResult.from_records(
+                    records, key_field,
+                    report.get_columns(value if field == 'traffic_type'
+                                       else None),
+                    granularity=self.granularity))
+                    for value, records in self.data.items()]
+                if field == 'traffic_type':
+                    self._result = ColumnarResult.join(results)
+                else:
+                    self._result = SeriesMatrix.from_results(
+                        field, results, columns=report.get_columns(),
+                        granularity=self.granularity)
+        return self._result
+
+
+class FederatedSCC(object):
+    """Run reports concurrently on a group of SCCs, e.g. one per region.
+    """
+
+    def __init__(self, sccs, max_workers=None):
+        """Create a FederatedSCC object
+
+        :param sccs: list of SCC objects, hosts must be unique
+        :param max_workers: int, maximum number of SCCs queried at once,
+            defaults to all of them
+        """
+        self.sccs = list(sccs)
+        if not self.sccs:
+            raise ValueError("At least one SCC is required")
+
+        hosts = [scc.host for scc in self.sccs]
+        duplicates = set(h for h in hosts if hosts.count(h) > 1)
+        if duplicates:
+            raise ValueError("Duplicate SCC hosts %s" % sorted(duplicates))
+
+        self.max_workers = max_workers or len(self.sccs)
+        if self.max_workers < 1:
+            raise ValueError("max_workers must be at least 1, got %s"
+                             % self.max_workers)
+
+    def __len__(self):
+        return len(self.sccs)
+
+    @property
+    def hosts(self):
+        return [scc.host for scc in self.sccs]
+
+    def _run_one(self, index, scc, report_class, report_options, criteria):
+        report = report_class(scc, **report_options)
+        error, elapsed = run_report(report, criteria, label='%s on %s' % (
+            report_class.__name__, scc.host))
+        return BatchResult(index, scc.host, report, criteria, error=error,
+                           elapsed=elapsed)
+
+    def run(self, report_class, report_options=None, **criteria):
+        """Run a report on every SCC and return a FederatedReport.
+
+        A failing SCC does not fail the call, its exception is listed in
+        the ``failures`` of the returned report.
+
+        :param report_class: report class, or resource name of the
+            report in ``scc_stats_reports``
+        :param report_options: dict of keyword arguments used to create
+            each report object, such as shard_size
+        :param criteria: keyword criteria passed to each report's run
+            method
+        """
+        report_class = stats_report_class(report_class)[1]
+        report_options = report_options or {}
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix='scc-federation') as ex:
+            futures = [ex.submit(self._run_one, i, scc, report_class,
+                                 report_options, criteria)
+                       for i, scc in enumerate(self.sccs)]
+            results = [f.result() for f in futures]
+
+        return FederatedReport(report_class, results)
@@ -0,0 +1,282 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Local, downsampled history of time series collected from an SCC.
+
+A :py:class:`HistoryStore` keeps time series at three resolutions, 5
+minutes, 1 hour and 1 day, in a SQLite file. Points are appended at the
+resolution returned by the SCC and rolled up into the coarser resolutions
+as they arrive, each resolution having its own retention period:
+
+.. code-block:: python
+
+    store = HistoryStore('/var/lib/scc/history.sqlite')
+    series = store.series_id(host, 'throughput',
+                             {'device': serial, 'traffic_type': 'peak'},
+                             columns=ThroughputStatsReport.columns)
+    store.add(series, 300, report.data)
+
+    # months of hourly averages, without querying the SCC
+    result = store.query(series, start, end, resolution=3600)
+    result['wan_in']
+
+Each rolled up bucket holds the average and the peak of every value, along
+with the number of 5 minute samples it covers.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+import numpy
+
+from steelscript.scc.core.result import ColumnarResult
+from steelscript.scc.core.segments import series_key
+
+__all__ = ['HistoryStore']
+
+logger = logging.getLogger(__name__)
+
+# Default location of the store
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.steelscript',
+                            'scc_history.sqlite')
+
+# Resolutions held, in seconds, finest first
+RESOLUTIONS = [300, 3600, 86400]
+
+# Default seconds each resolution is kept
+DEFAULT_RETENTION = {300: 14 * 86400,
+                     3600: 180 * 86400,
+                     86400: 5 * 365 * 86400}
+
+# Statistics held for every bucket
+STATS = ['avg', 'peak']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    host TEXT NOT NULL,
+    resource TEXT NOT NULL,
+    criteria TEXT NOT NULL,
+    columns TEXT,
+    UNIQUE (host, resource, criteria)
+);
+CREATE TABLE IF NOT EXISTS points (
+    series_id INTEGER NOT NULL,
+    resolution INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    avg TEXT NOT NULL,
+    peak TEXT NOT NULL,
+    PRIMARY KEY (series_id, resolution, timestamp)
+);
+"""
+
+
+def _matrix(rows):
+    """Return a float64 matrix of rows of values, padded with NaN."""
+    width = max(len(r) for r in rows) if rows else 0
+    values = numpy.full((len(rows), width), numpy.nan)
+    for i, row in enumerate(rows):
+        values[i, :len(row)] = [numpy.nan if v is None else v for v in row]
+    return values
+
+
+def _values(matrix):
+    """Return a matrix row as a JSON friendly list, NaN as None."""
+    return [None if numpy.isnan(v) else float(v) for v in matrix]
+
+
+class HistoryStore(object):
+    """SQLite backed time series store with automatic rollups."""
+
+    def __init__(self, path=DEFAULT_PATH, retention=None):
+        """Create a HistoryStore object
+
+        :param path: string, SQLite file to use, created if missing
+        :param retention: dict of seconds each resolution is kept, by
+            resolution, merged with DEFAULT_RETENTION
+        """
+        if path != ':memory:':
+            dirname = os.path.dirname(os.path.abspath(path))
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+
+        self.path = path
+        self.retention = dict(DEFAULT_RETENTION)
+        self.retention.update(retention or {})
+        unknown = set(self.retention) - set(RESOLUTIONS)
+        if unknown:
+            raise ValueError("Unknown resolutions %s, valid resolutions "
+                             "are %s" % (sorted(unknown), RESOLUTIONS))
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def series_id(self, host, resource, criteria, columns=None, create=True):
+        """Return the id of the series matching criteria.
+
+        :param criteria: dict of criteria, start_time and end_time ignored
+        :param columns: list of value names, or a dict of such lists keyed
+            by traffic_type as in the report classes
+        :param create: bool, create the series if missing, otherwise
+            return None for an unknown series
+        """
+        key = series_key(criteria)
+        if isinstance(columns, dict):
+            columns = columns.get(criteria.get('traffic_type'),
+                                  next(iter(columns.values())))
+
+        with self._lock, self._conn:
+            if create:
+                self._conn.execute(
+                    'INSERT OR IGNORE INTO series '
+                    '(host, resource, criteria, columns) '
+                    'VALUES (?, ?, ?, ?)',
+                    (host or '', resource, key,
+                     json.dumps(columns) if columns else None))
+            row = self._conn.execute(
+                'SELECT id FROM series WHERE host = ? AND resource = ? '
+                'AND criteria = ?', (host or '', resource, key)).fetchone()
+        return row[0] if row else None
+
+    def series(self):
+        """Return the list of (id, host, resource, criteria dict) held."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, host, resource, criteria FROM series '
+                'ORDER BY id').fetchall()
+        return [(i, h, r, json.loads(c)) for i, h, r, c in rows]
+
+    def columns(self, series_id):
+        """Return the value names of a series, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT columns FROM series WHERE id = ?',
+                (series_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def _rollup(self, series_id, resolution, timestamps):
+        """Recompute the buckets of the resolution after the given one
+        holding timestamps, then the resolutions after that."""
+        index = RESOLUTIONS.index(resolution)
+        if index + 1 == len(RESOLUTIONS):
+            return
+        coarser = RESOLUTIONS[index + 1]
+
+        buckets = sorted(set(ts - ts % coarser for ts in timestamps))
+        rows = []
+        for bucket in buckets:
+            points = self._conn.execute(
+                'SELECT count, avg, peak FROM points WHERE series_id = ? '
+                'AND resolution = ? AND timestamp >= ? AND timestamp < ?',
+                (series_id, resolution, bucket, bucket + coarser)).fetchall()
+            if not points:
+                continue
+
+            counts = numpy.array([p[0] for p in points], dtype=numpy.float64)
+            avgs = _matrix([json.loads(p[1]) for p in points])
+            peaks = _matrix([json.loads(p[2]) for p in points])
+
+            # Average weighted by the samples behind each point, ignoring
+            # missing values
+            weights = numpy.where(numpy.isnan(avgs), 0, counts[:, None])
+            total = numpy.nansum(avgs * weights, axis=0)
+            with numpy.errstate(invalid='ignore', divide='ignore'):
+                avg = total / weights.sum(axis=0)
+            peak = numpy.fmax.reduce(peaks, axis=0)
+            rows.append((series_id, coarser, bucket, int(counts.sum()),
+                         json.dumps(_values(avg)), json.dumps(_values(peak))))
+
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO points '
+            '(series_id, resolution, timestamp, count, avg, peak) '
+            'VALUES (?, ?, ?, ?, ?, ?)', rows)
+        self._rollup(series_id, coarser, buckets)
+
+    def add(self, series_id, resolution, records):
+        """Store records of a series and update its rollups.
+
+        Records already held for the same timestamps are replaced, so
+        revised or late buckets can be added again.
+
+        :param resolution: int, seconds per record, one of RESOLUTIONS
+        :param records: list of {timestamp, data} dicts
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError("Unknown resolution %s, valid resolutions "
+                             "are %s" % (resolution, RESOLUTIONS))
+        if not records:
+            return
+
+        count = resolution // RESOLUTIONS[0]
+        rows = [(series_id, resolution, rec['timestamp'], count,
+                 json.dumps(rec['data']), json.dumps(rec['data']))
+                for rec in records]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO points '
+                '(series_id, resolution, timestamp, count, avg, peak) '
+                'VALUES (?, ?, ?, ?, ?, ?)', rows)
+            self._rollup(series_id, resolution,
+                         [rec['timestamp'] for rec in records])
+
+    def resolution_for(self, start, now=None):
+        """Return the finest resolution still holding data from start."""
+        now = time.time() if now is None else now
+        for resolution in RESOLUTIONS:
+            if start >= now - self.retention[resolution]:
+                return resolution
+        return RESOLUTIONS[-1]
+
+    def query(self, series_id, start, end, resolution=None, stat='avg'):
+        """Return the points of a series within [start, end).
+
+        :param start: int, epoch seconds
+        :param end: int, epoch seconds
+        :param resolution: int, one of RESOLUTIONS, defaults to the finest
+            one retained as far back as start
+        :param stat: string, 'avg' or 'peak' values of each bucket
+        :return: ColumnarResult keyed by timestamp
+        """
+        if stat not in STATS:
+            raise ValueError("Unknown stat '%s', valid stats are %s"
+                             % (stat, STATS))
+        if resolution is None:
+            resolution = self.resolution_for(start)
+
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT timestamp, %s FROM points WHERE series_id = ? '
+                'AND resolution = ? AND timestamp >= ? AND timestamp < ? '
+                'ORDER BY timestamp' % stat,
+                (series_id, resolution, start, end)).fetchall()
+
+        records = [{'timestamp': t,
+                    'data': [numpy.nan if v is None else v
+                             for v in json.loads(d)]}
+                   for t, d in rows]
+        return ColumnarResult.from_records(records, 'timestamp',
+                                           self.columns(series_id),
+                                           granularity=resolution)
+
+    def purge(self, now=None):
+        """Drop the points older than the retention of their resolution."""
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            for resolution, seconds in self.retention.items():
+                self._conn.execute(
+                    'DELETE FROM points WHERE resolution = ? '
+                    'AND timestamp < ?', (resolution, now - seconds))
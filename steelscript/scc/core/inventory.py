@@ -0,0 +1,276 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Indexed, incrementally refreshed view of the appliances managed by an SCC.
+
+An :py:class:`ApplianceInventory` loads the ``cmc.appliance_inventory``
+appliances once and indexes them by serial, hostname, address and model.
+Lookups are dictionary lookups, and the inventory refreshes itself when
+older than ``ttl`` seconds:
+
+.. code-block:: python
+
+    inventory = ApplianceInventory(scc, ttl=300)
+    inventory.by_hostname('branch-12-sh')['serial']
+    inventory.by_address('10.1.12.5')
+    inventory.by_model('CX770')            # list of appliances
+
+A refresh lists ``brief_appliances``, which is much smaller than the full
+``appliances`` collection, and only fetches the full record of the
+appliances that were added or whose brief fields changed. Fields outside
+the brief listing, such as the software version, are updated along with
+them, or on a full refresh with ``refresh(full=True)``.
+
+An SCC created with ``inventory_ttl`` keeps an inventory as
+``scc.inventory``, and stats reports run against it accept hostnames and
+addresses wherever they take device serials:
+
+.. code-block:: python
+
+    scc = SCC(host, auth=OAuth(code), inventory_ttl=300)
+    report = CpuUtilizationStatsReport(scc)
+    report.run(device='branch-12-sh', timefilter='last 1 hour')
+"""
+
+import time
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from steelscript.scc.core.report import SCCException, _limited
+
+__all__ = ['ApplianceInventory']
+
+logger = logging.getLogger(__name__)
+
+# Default seconds before the inventory is refreshed
+DEFAULT_TTL = 300
+
+# Default number of appliance records fetched at once on refresh
+DEFAULT_MAX_WORKERS = 4
+
+# Fields of the brief_appliances listing compared to detect changes
+BRIEF_FIELDS = ['serial', 'uuid', 'model', 'product_code', 'hostname',
+                'address', 'health']
+
+# Fraction of changed appliances above which the whole collection is
+# fetched rather than each changed record
+FULL_FETCH_RATIO = 0.5
+
+
+class _Index(object):
+    """Immutable lookup tables of a set of appliance records."""
+
+    def __init__(self, records):
+        self.records = records
+        self.serial = {}
+        self.hostname = {}
+        self.address = {}
+        self.model = {}
+        for id_ in sorted(records):
+            rec = records[id_]
+            if rec.get('serial'):
+                self.serial[rec['serial']] = rec
+            if rec.get('hostname'):
+                self.hostname[rec['hostname'].lower()] = rec
+            for address in self._addresses(rec):
+                self.address.setdefault(address, rec)
+            if rec.get('model'):
+                self.model.setdefault(rec['model'], []).append(rec)
+
+    @staticmethod
+    def _addresses(rec):
+        addresses = [rec.get('address'), rec.get('auto_detected_address'),
+                     rec.get('override_address')]
+        addresses.extend(iface.get('ip_addr')
+                         for iface in rec.get('interfaces') or [])
+        return [a for a in addresses if a]
+
+
+class ApplianceInventory(object):
+    """Appliances of an SCC indexed by serial, hostname, address and model.
+
+    Records are the appliance dicts of ``cmc.appliance_inventory`` and
+    must be treated as read-only. An inventory can be shared by threads.
+    """
+
+    def __init__(self, scc, ttl=DEFAULT_TTL,
+                 max_workers=DEFAULT_MAX_WORKERS):
+        """Create an ApplianceInventory object
+
+        The appliances are loaded on first use.
+
+        :param scc: SCC object providing the appliance_inventory service
+        :param ttl: int, seconds after which a lookup refreshes the
+            inventory first, None to only refresh on demand
+        :param max_workers: int, maximum number of appliance records
+            fetched at once on refresh
+        """
+        self.scc = scc
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.refreshed = None
+        self._index = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        count = len(self._index.records) if self._index else 0
+        return '<ApplianceInventory %s %d appliances>' % (
+            getattr(self.scc, 'host', None), count)
+
+    def _get(self, resource, **variables):
+        svc = self.scc.appliance_inventory
+        with _limited(self.scc, 'appliance_inventory', resource):
+            return svc.bind(resource, **variables).execute('get').data
+
+    def _fetch_all(self):
+        return dict((rec['id'], rec) for rec in self._get('appliances'))
+
+    def _fetch_items(self, ids):
+        def fetch(id_):
+            return self._get('appliance', id=id_)
+
+        if len(ids) <= 1 or self.max_workers <= 1:
+            return [fetch(id_) for id_ in ids]
+        workers = min(self.max_workers, len(ids))
+        with ThreadPoolExecutor(max_workers=workers,
+                                thread_name_prefix='scc-inventory') as ex:
+            return list(ex.map(fetch, ids))
+
+    def refresh(self, full=False):
+        """Bring the inventory up to date and return refresh statistics.
+
+        :param full: bool, fetch the whole appliances collection rather
+            than the records changed since the last refresh
+        :return: dict with the number of appliance records 'fetched' and
+            'removed', and whether the refresh was 'full'
+        """
+        with self._lock:
+            return self._refresh(full)
+
+    def _refresh(self, full):
+        started = time.time()
+        old = self._index.records if self._index else None
+
+        if full or old is None:
+            records = self._fetch_all()
+            stats = {'fetched': len(records), 'full': True,
+                     'removed': len(set(old) - set(records)) if old else 0}
+        else:
+            brief = dict((rec['id'], rec)
+                         for rec in self._get('brief_appliances'))
+            changed = [id_ for id_, rec in brief.items()
+                       if id_ not in old or
+                       any(rec.get(f) != old[id_].get(f)
+                           for f in BRIEF_FIELDS)]
+            removed = [id_ for id_ in old if id_ not in brief]
+
+            if len(changed) > FULL_FETCH_RATIO * len(brief):
+                records = self._fetch_all()
+                stats = {'fetched': len(records), 'full': True,
+                         'removed': len(removed)}
+            else:
+                unchanged = set(brief).difference(changed)
+                records = dict((id_, old[id_]) for id_ in unchanged)
+                for rec in self._fetch_items(changed):
+                    records[rec['id']] = rec
+                stats = {'fetched': len(changed), 'full': False,
+                         'removed': len(removed)}
+
+        if old is None or stats['fetched'] or stats['removed']:
+            self._index = _Index(records)
+        self.refreshed = started
+        logger.debug("Refreshed inventory of %s in %.2fs: %s"
+                     % (getattr(self.scc, 'host', None),
+                        time.time() - started, stats))
+        return stats
+
+    def _current(self):
+        """Return the index, refreshing it first if missing or expired."""
+        index, refreshed = self._index, self.refreshed
+        expired = (index is None or
+                   (self.ttl is not None and
+                    time.time() - refreshed >= self.ttl))
+        if not expired:
+            return index
+
+        with self._lock:
+            # Another thread may have refreshed while this one waited
+            if self._index is not None and self.refreshed != refreshed:
+                return self._index
+            try:
+                self._refresh(full=False)
+            except Exception:
+                if self._index is None:
+                    raise
+                # Keep answering from the last known inventory, try
+                # again once the ttl elapses
+                logger.exception("Unable to refresh inventory of %s"
+                                 % getattr(self.scc, 'host', None))
+                self.refreshed = time.time()
+            return self._index
+
+    def __len__(self):
+        return len(self._current().records)
+
+    def __iter__(self):
+        index = self._current()
+        return iter([index.records[id_] for id_ in sorted(index.records)])
+
+    def __contains__(self, name):
+        return self.find(name) is not None
+
+    @property
+    def appliances(self):
+        """List of the appliance records, ordered by id."""
+        return list(self)
+
+    def by_id(self, id_):
+        """Return the appliance with the internal id, or None."""
+        return self._current().records.get(id_)
+
+    def by_serial(self, serial):
+        """Return the appliance with the serial, or None."""
+        return self._current().serial.get(serial)
+
+    def by_hostname(self, hostname):
+        """Return the appliance with the hostname, ignoring case, or None.
+        """
+        return self._current().hostname.get(hostname.lower())
+
+    def by_address(self, address):
+        """Return the appliance reachable at, or having an interface with,
+        the address, or None."""
+        return self._current().address.get(address)
+
+    def by_model(self, model):
+        """Return the list of appliances of a model."""
+        return list(self._current().model.get(model, []))
+
+    def find(self, name):
+        """Return the appliance with a serial, hostname or address, or
+        None."""
+        index = self._current()
+        return (index.serial.get(name) or
+                index.hostname.get(name.lower()) or
+                index.address.get(name))
+
+    def resolve(self, device):
+        """Return the serial of the appliance with a serial, hostname or
+        address. Unknown names are returned unchanged."""
+        rec = self.find(device)
+        return rec['serial'] if rec else device
+
+    def serial(self, name):
+        """Return the serial of the appliance with a serial, hostname or
+        address, raising SCCException for unknown names."""
+        rec = self.find(name)
+        if rec is None:
+            raise SCCException("No appliance '%s' in the inventory of %s"
+                               % (name, getattr(self.scc, 'host', None)))
+        return rec['serial']
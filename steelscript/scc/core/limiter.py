@@ -0,0 +1,297 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Adaptive limit on the requests sent to an SCC at once.
+
+Reports split, fanned out or run from many threads can send more requests
+than an SCC also serving its own UI should take. An SCC object given an
+:py:class:`AdaptiveLimiter` sends all report requests through it. It
+follows AIMD, as TCP congestion control does:
+
+* each successful request answered in a normal time raises the limit by
+  about one request per limit's worth of requests,
+* a request timing out or failing with a server error or a 429 status,
+  or the average latency of a kind of request growing much above the
+  lowest seen for that kind, halves the limit,
+* the limit never exceeds ``max_limit``, and an optional token bucket caps
+  the rate at ``rate`` requests per second.
+
+Latencies are tracked per request class, the service and resource of
+the request, so that quick inventory requests and slow stats reports do
+not skew each other's normal latency.
+
+.. code-block:: python
+
+    scc = SCC(host, auth=OAuth(code),
+              limiter=AdaptiveLimiter(max_limit=8, rate=20))
+    ...
+    scc.limiter.stats()
+    # {'limit': 6.4, 'in_flight': 3, 'classes': {...}, ...}
+
+Pass ``limiter=True`` to share the limiter of the host, see
+:py:func:`host_limiter`. SCC objects send requests without limit by
+default.
+"""
+
+import time
+import logging
+import threading
+import contextlib
+
+import requests
+
+__all__ = ['AdaptiveLimiter', 'TokenBucket', 'host_limiter', 'is_overload']
+
+logger = logging.getLogger(__name__)
+
+# Defaults of the limiter of each host
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MAX_LIMIT = 16
+
+# Seconds below which latency changes are taken as noise, such as
+# delayed acknowledgements, rather than load
+MIN_BASELINE = 0.05
+
+# HTTP statuses meaning the SCC is overloaded
+OVERLOAD_STATUSES = (429, 500, 502, 503, 504)
+
+# Limiters shared by the SCC objects of each host
+_host_limiters = {}
+_host_limiters_lock = threading.Lock()
+
+
+def is_overload(error):
+    """Return True if a request error is a sign of an overloaded server
+    rather than of a bad request."""
+    if isinstance(error, (requests.exceptions.Timeout,
+                          requests.exceptions.ConnectionError)):
+        return True
+    status = getattr(error, 'status', None)
+    if status is None:
+        status = getattr(error, 'status_code', None)
+    return status in OVERLOAD_STATUSES
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket allowing rate requests per second on
+    average, in bursts of at most burst requests."""
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive, got %s" % rate)
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, self.rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, timeout=None):
+        """Wait for a token and take it, return False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens +
+                                   (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+
+class _LatencyClass(object):
+    """Latencies of one class of requests."""
+
+    def __init__(self):
+        self.count = 0
+        self.baseline = None
+        self.latency = None
+
+    def record(self, latency):
+        # The fastest request ever answered approximates the latency of
+        # the SCC without load. It is not taken from recent requests
+        # only, under sustained load those are all slow alike.
+        self.count += 1
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += 0.2 * (latency - self.latency)
+
+
+class AdaptiveLimiter(object):
+    """AIMD limit on the number of requests in flight to one host."""
+
+    def __init__(self, initial=DEFAULT_INITIAL_LIMIT, min_limit=1,
+                 max_limit=DEFAULT_MAX_LIMIT, rate=None, burst=None,
+                 latency_factor=2.0, latency_target=None, backoff=0.5,
+                 warmup=10):
+        """Create an AdaptiveLimiter object
+
+        :param initial: int, number of requests allowed at once at first
+        :param min_limit: int, lowest limit backing off can reach
+        :param max_limit: int, hard ceiling of the limit
+        :param rate: float, maximum requests per second, unlimited if None
+        :param burst: int, requests that may be sent at once within the
+            rate, defaults to one second worth of requests
+        :param latency_factor: float, an average latency of a request
+            class this many times the fastest one seen for the class is
+            taken as a sign of overload, None to ignore latency
+        :param latency_target: float, average latency in seconds above
+            which the SCC is taken as overloaded, instead of
+            latency_factor
+        :param backoff: float, factor applied to the limit on overload
+        :param warmup: int, number of requests of a class answered
+            before its latency is compared to its fastest one
+        """
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError("Limits must verify 1 <= min_limit <= "
+                             "initial <= max_limit")
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1, got %s"
+                             % backoff)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_factor = latency_factor
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.warmup = warmup
+        self.bucket = TokenBucket(rate, burst) if rate else None
+
+        self.limit = float(initial)
+        self.in_flight = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.decreases = 0
+        self._classes = {}
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def __repr__(self):
+        return '<AdaptiveLimiter limit %.1f, %d in flight>' % (
+            self.limit, self.in_flight)
+
+    def acquire(self, timeout=None):
+        """Wait until a request may be sent, return False on timeout.
+
+        Every successful acquire must be followed by a call to release.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                remaining = (None if deadline is None
+                             else deadline - time.monotonic())
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self.in_flight += 1
+
+        if self.bucket is not None:
+            remaining = (None if deadline is None
+                         else max(0, deadline - time.monotonic()))
+            if not self.bucket.take(remaining):
+                with self._cond:
+                    self.in_flight -= 1
+                    self._cond.notify()
+                return False
+        return True
+
+    def _slow(self, latencies):
+        # Compare the moving average rather than single requests, one
+        # slow answer does not mean the SCC is overloaded
+        if self.latency_target is not None:
+            return latencies.latency > self.latency_target
+        if self.latency_factor is None or latencies.count < self.warmup:
+            return False
+        baseline = max(latencies.baseline, MIN_BASELINE)
+        return latencies.latency > self.latency_factor * baseline
+
+    def release(self, started, error=None, key=None):
+        """Record the outcome of a request and free its slot.
+
+        :param started: float, time.monotonic() when the request was sent
+        :param error: exception raised by the request, None on success
+        :param key: hashable class of the request, requests of one class
+            are expected to take about the same time
+        """
+        now = time.monotonic()
+        with self._cond:
+            busy = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+
+            if error is None:
+                self.succeeded += 1
+                latencies = self._classes.get(key)
+                if latencies is None:
+                    latencies = self._classes[key] = _LatencyClass()
+                latencies.record(now - started)
+                overload = self._slow(latencies)
+            else:
+                # Requests rejected as invalid say nothing of the load
+                self.failed += 1
+                overload = is_overload(error)
+
+            if overload:
+                # Back off once per round of requests, the requests sent
+                # before the last decrease are answered as slowly
+                if started >= self._last_decrease:
+                    self.limit = max(self.min_limit,
+                                     self.limit * self.backoff)
+                    self._last_decrease = now
+                    self.decreases += 1
+                    logger.debug("Backing off to %.1f requests at once"
+                                 % self.limit)
+            elif error is None and busy:
+                # Only grow a limit that is actually reached
+                self.limit = min(self.max_limit,
+                                 self.limit + 1.0 / self.limit)
+            self._cond.notify()
+
+    @contextlib.contextmanager
+    def slot(self, key=None):
+        """Context manager holding a slot while sending one request.
+
+        :param key: hashable class of the request, see release
+        """
+        self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self.release(started, error=e, key=key)
+            raise
+        else:
+            self.release(started, key=key)
+
+    def stats(self):
+        """Return a dict of the state of the limiter."""
+        with self._cond:
+            return {'limit': round(self.limit, 2),
+                    'in_flight': self.in_flight,
+                    'succeeded': self.succeeded,
+                    'failed': self.failed,
+                    'decreases': self.decreases,
+                    'classes': dict((key, {'latency': c.latency,
+                                           'baseline': c.baseline})
+                                    for key, c in self._classes.items())}
+
+
+def host_limiter(host):
+    """Return the AdaptiveLimiter shared by the SCC objects of host
+    given ``limiter=True``, created with the default settings on first
+    use."""
+    with _host_limiters_lock:
+        limiter = _host_limiters.get(host)
+        if limiter is None:
+            limiter = _host_limiters[host] = AdaptiveLimiter()
+        return limiter
@@ -0,0 +1,425 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Devices by time matrices of per appliance reports.
+
+:py:class:`BWPerApplStatsReport
+<steelscript.scc.core.report.BWPerApplStatsReport>` and
+:py:class:`ThroughputPerApplStatsReport
+<steelscript.scc.core.report.ThroughputPerApplStatsReport>` return one
+``{device, data}`` record per appliance, totalled over the requested time
+range. :py:func:`device_matrix` runs them once per time window and pivots
+the records into a devices x windows x columns array, as used for
+heatmaps:
+
+.. code-block:: python
+
+    matrix = device_matrix(scc, ThroughputPerApplStatsReport, serials,
+                           timefilter='last 1 day', window=3600,
+                           traffic_type='peak')
+    matrix.values                      # devices x windows x columns
+    matrix.column('wan_out')           # devices x windows
+    matrix.loc(serial, timestamp)      # columns of one cell
+
+    # fleets where most appliances only report part of the time
+    sparse = device_matrix(scc, ThroughputPerApplStatsReport, serials,
+                           timefilter='last 1 week', sparse=True)
+
+Results already fetched per window are pivoted with :py:func:`pivot`.
+"""
+
+import datetime
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+
+from steelscript.netprofiler.core.filters import TimeFilter
+from steelscript.common.timeutils import datetime_to_seconds
+from steelscript.scc.core.report import granularities, SCCException, \
+    _to_datetime
+from steelscript.scc.core.result import ColumnarResult
+
+__all__ = ['DeviceMatrix', 'SparseDeviceMatrix', 'pivot', 'device_matrix']
+
+logger = logging.getLogger(__name__)
+
+# Default number of windows requested at once
+DEFAULT_MAX_WORKERS = 4
+
+
+def _to_seconds(value):
+    if isinstance(value, datetime.datetime):
+        return datetime_to_seconds(value)
+    return int(value)
+
+
+class _DeviceTimeIndex(object):
+    """Device and time axes shared by the dense and sparse matrices."""
+
+    def __init__(self, devices, timestamps, columns, window):
+        self.devices = list(devices)
+        self.timestamps = numpy.asarray(timestamps, dtype=numpy.int64)
+        self.columns = list(columns)
+        self.window = window
+        self.device_index = dict((d, i) for i, d in enumerate(self.devices))
+        self.time_index = dict((t, i) for i, t in
+                               enumerate(self.timestamps.tolist()))
+
+    @property
+    def shape(self):
+        return (len(self.devices), len(self.timestamps), len(self.columns))
+
+    def device_position(self, device):
+        """Return the row of a device."""
+        try:
+            return self.device_index[device]
+        except KeyError:
+            raise KeyError("No device '%s'" % device)
+
+    def time_position(self, timestamp):
+        """Return the position of the window starting at timestamp, given
+        as epoch seconds or a datetime."""
+        try:
+            return self.time_index[_to_seconds(timestamp)]
+        except KeyError:
+            raise KeyError("No window starting at %s" % timestamp)
+
+    def column_position(self, name):
+        """Return the position of a value column."""
+        try:
+            return self.columns.index(name)
+        except ValueError:
+            raise KeyError("No column '%s', columns are %s"
+                           % (name, self.columns))
+
+
+class DeviceMatrix(_DeviceTimeIndex):
+    """Per appliance values as a dense devices x windows x columns array.
+
+    Cells of devices that did not report during a window are NaN.
+
+    :param devices: list of device labels, one per row
+    :param timestamps: int64 array of the start of each window
+    :param columns: list of value column names
+    :param values: float64 array of devices x windows x columns
+    :param window: int, seconds per window
+    """
+
+    def __init__(self, devices, timestamps, columns, values, window=None):
+        super(DeviceMatrix, self).__init__(devices, timestamps, columns,
+                                           window)
+        values = numpy.asarray(values, dtype=numpy.float64)
+        if values.shape != self.shape:
+            raise ValueError("values of shape %s do not match %s"
+                             % (values.shape, self.shape))
+        self.values = values
+
+    def __repr__(self):
+        return '<DeviceMatrix %d devices x %d windows x %s>' % (
+            len(self.devices), len(self.timestamps), self.columns)
+
+    def column(self, name):
+        """Return the devices x windows array of a value column."""
+        return self.values[:, :, self.column_position(name)]
+
+    def device(self, device):
+        """Return the windows x columns array of a device."""
+        return self.values[self.device_position(device)]
+
+    def at(self, timestamp):
+        """Return the devices x columns array of a window."""
+        return self.values[:, self.time_position(timestamp)]
+
+    def loc(self, device, timestamp):
+        """Return the values of one device during one window."""
+        return self.values[self.device_position(device),
+                           self.time_position(timestamp)]
+
+    def to_sparse(self):
+        """Return the SparseDeviceMatrix of the cells holding a value."""
+        present = ~numpy.isnan(self.values).all(axis=2)
+        device_ids, time_ids = numpy.nonzero(present)
+        return SparseDeviceMatrix(self.devices, self.timestamps,
+                                  self.columns, device_ids, time_ids,
+                                  self.values[device_ids, time_ids],
+                                  self.window)
+
+    def to_pandas(self, column=None):
+        """Return a DataFrame of the matrix.
+
+        :param column: string, when set return the values of this column
+            with one row per device and one column per window, as used
+            for heatmaps, otherwise one row per device and window with
+            one column per value column
+        """
+        import pandas
+
+        times = pandas.to_datetime(self.timestamps, unit='s', utc=True)
+        if column is not None:
+            return pandas.DataFrame(self.column(column), columns=times,
+                                    index=pandas.Index(self.devices,
+                                                       name='device'))
+
+        n_devices, n_times = len(self.devices), len(self.timestamps)
+        data = {'device': numpy.repeat(numpy.array(self.devices,
+                                                   dtype=object), n_times),
+                'timestamp': numpy.tile(times, n_devices)}
+        flat = self.values.reshape(n_devices * n_times, len(self.columns))
+        for i, name in enumerate(self.columns):
+            data[name] = flat[:, i]
+        return pandas.DataFrame(data, columns=['device', 'timestamp'] +
+                                self.columns)
+
+
+class SparseDeviceMatrix(_DeviceTimeIndex):
+    """Per appliance values of the cells holding a value only.
+
+    Cells are stored as coordinate arrays in window order, so memory grows
+    with the number of reports rather than with devices times windows.
+
+    :param devices: list of device labels
+    :param timestamps: int64 array of the start of each window
+    :param columns: list of value column names
+    :param device_ids: int array, device position of each cell
+    :param time_ids: int array, window position of each cell
+    :param values: float64 array of cells x columns
+    :param window: int, seconds per window
+    """
+
+    def __init__(self, devices, timestamps, columns, device_ids, time_ids,
+                 values, window=None):
+        super(SparseDeviceMatrix, self).__init__(devices, timestamps,
+                                                 columns, window)
+        self.device_ids = numpy.asarray(device_ids, dtype=numpy.intp)
+        self.time_ids = numpy.asarray(time_ids, dtype=numpy.intp)
+        self.values = numpy.asarray(values, dtype=numpy.float64).reshape(
+            len(self.device_ids), len(self.columns))
+
+    def __repr__(self):
+        return '<SparseDeviceMatrix %d of %d x %d cells x %s>' % (
+            len(self), len(self.devices), len(self.timestamps),
+            self.columns)
+
+    def __len__(self):
+        return len(self.device_ids)
+
+    @property
+    def density(self):
+        """Fraction of the devices x windows cells holding a value."""
+        cells = len(self.devices) * len(self.timestamps)
+        return float(len(self)) / cells if cells else 0.0
+
+    def column(self, name):
+        """Return the values of a column, one per cell."""
+        return self.values[:, self.column_position(name)]
+
+    def device(self, device):
+        """Return the ColumnarResult of the windows a device reported in.
+        """
+        mask = self.device_ids == self.device_position(device)
+        return ColumnarResult('timestamp',
+                              self.timestamps[self.time_ids[mask]],
+                              self.values[mask], self.columns,
+                              granularity=self.window)
+
+    def at(self, timestamp):
+        """Return the ColumnarResult of the devices reporting in a window.
+        """
+        mask = self.time_ids == self.time_position(timestamp)
+        devices = numpy.array(self.devices, dtype=object)
+        return ColumnarResult('device', devices[self.device_ids[mask]],
+                              self.values[mask], self.columns)
+
+    def loc(self, device, timestamp):
+        """Return the values of one device during one window, NaN if the
+        device did not report."""
+        mask = ((self.device_ids == self.device_position(device)) &
+                (self.time_ids == self.time_position(timestamp)))
+        found = numpy.flatnonzero(mask)
+        if not len(found):
+            return numpy.full(len(self.columns), numpy.nan)
+        return self.values[found[-1]]
+
+    def to_dense(self):
+        """Return the DeviceMatrix holding the same values."""
+        values = numpy.full(self.shape, numpy.nan)
+        values[self.device_ids, self.time_ids] = self.values
+        return DeviceMatrix(self.devices, self.timestamps, self.columns,
+                            values, self.window)
+
+    def to_pandas(self):
+        """Return a DataFrame with one row per cell holding a value."""
+        import pandas
+
+        devices = numpy.array(self.devices, dtype=object)
+        data = {'device': devices[self.device_ids],
+                'timestamp': pandas.to_datetime(
+                    self.timestamps[self.time_ids], unit='s', utc=True)}
+        for i, name in enumerate(self.columns):
+            data[name] = self.values[:, i]
+        return pandas.DataFrame(data, columns=['device', 'timestamp'] +
+                                self.columns)
+
+
+def pivot(windows, columns=None, devices=None, sparse=False, window=None):
+    """Pivot per appliance results of successive windows into a matrix.
+
+    :param windows: dict of per appliance results by window start in
+        epoch seconds, or list of (start, result) pairs. Each result is a
+        ColumnarResult keyed by device or a list of {device, data} records.
+    :param columns: list of value column names, defaults to the columns
+        of the results
+    :param devices: list of devices giving the rows of the matrix, records
+        of other devices are dropped. Defaults to every device reporting,
+        sorted.
+    :param sparse: bool, return a SparseDeviceMatrix instead of a
+        DeviceMatrix
+    :param window: int, seconds per window, kept on the matrix
+    :return: DeviceMatrix or SparseDeviceMatrix
+    """
+    items = sorted(windows.items() if isinstance(windows, dict)
+                   else windows, key=lambda item: item[0])
+    results = []
+    for _, result in items:
+        if not isinstance(result, ColumnarResult):
+            result = ColumnarResult.from_records(result, 'device', columns)
+        results.append(result)
+
+    timestamps = numpy.array([start for start, _ in items],
+                             dtype=numpy.int64)
+    width = max([r.values.shape[1] for r in results] or
+                [len(columns or [])])
+    if columns is None:
+        columns = next((r.columns for r in results
+                        if r.values.shape[1] == width), [])
+    if len(columns) != width:
+        raise ValueError("got %d columns for values of width %d"
+                         % (len(columns), width))
+
+    # Flatten every record into one array of labels and one of values,
+    # the window of each record given by its position
+    lengths = numpy.array([len(r) for r in results], dtype=numpy.intp)
+    time_ids = numpy.repeat(numpy.arange(len(results)), lengths)
+    values = numpy.full((int(lengths.sum()), width), numpy.nan)
+    labels = numpy.empty(len(values), dtype=object)
+    offset = 0
+    for r in results:
+        values[offset:offset + len(r), :r.values.shape[1]] = r.values
+        labels[offset:offset + len(r)] = r.keys
+        offset += len(r)
+    labels = labels.astype(str)
+
+    if devices is None:
+        names, device_ids = numpy.unique(labels, return_inverse=True)
+        devices = names.tolist()
+    else:
+        devices = [str(d) for d in devices]
+        names = numpy.array(devices + [''], dtype=str)
+        order = numpy.argsort(names, kind='stable')
+        pos = numpy.searchsorted(names, labels, sorter=order)
+        pos = order[pos.clip(max=len(names) - 1)]
+        known = (names[pos] == labels) & (pos < len(devices))
+        if not known.all():
+            logger.debug("Dropping %d records of unlisted devices"
+                         % (~known).sum())
+        device_ids, time_ids, values = pos[known], time_ids[known], \
+            values[known]
+
+    if sparse:
+        return SparseDeviceMatrix(devices, timestamps, columns, device_ids,
+                                  time_ids, values, window)
+
+    dense = numpy.full((len(devices), len(timestamps), width), numpy.nan)
+    dense[device_ids, time_ids] = values
+    return DeviceMatrix(devices, timestamps, columns, dense, window)
+
+
+def device_matrix(scc, report_class, devices, start_time=None,
+                  end_time=None, timefilter=None, window=3600, sparse=False,
+                  max_workers=DEFAULT_MAX_WORKERS, report_options=None,
+                  **criteria):
+    """Run a per appliance report per time window and pivot the results.
+
+    The time range is extended to whole windows, aligned to multiples of
+    the window size, and each window is requested concurrently.
+
+    :param scc: SCC object used to run the reports
+    :param report_class: BWPerApplStatsReport, ThroughputPerApplStatsReport
+        or another report keyed by device
+    :param devices: list of device serials, the rows of the matrix
+    :param start_time: datetime or epoch seconds, start of the range
+    :param end_time: datetime or epoch seconds, end of the range
+    :param timefilter: string such as 'last 1 day', instead of start_time
+        and end_time
+    :param window: int, seconds per column of the matrix, a multiple of
+        the finest granularity of 300 seconds
+    :param sparse: bool, return a SparseDeviceMatrix instead of a
+        DeviceMatrix
+    :param max_workers: int, maximum number of windows requested at once
+    :param report_options: dict of keyword arguments used to create the
+        report objects, such as device_chunk_size
+    :param criteria: other criteria of the report, such as traffic_type
+    :return: DeviceMatrix or SparseDeviceMatrix
+    """
+    if report_class.key_field != 'device':
+        raise SCCException("%s is not a per appliance report"
+                           % report_class.__name__)
+    if not window or window % min(granularities):
+        raise SCCException("window must be a positive multiple of %s "
+                           "seconds" % min(granularities))
+    if isinstance(devices, str):
+        devices = devices.split(',')
+    if not devices:
+        raise SCCException("Devices are required to run %s"
+                           % report_class.__name__)
+    inventory = getattr(scc, 'inventory', None)
+    if inventory is not None:
+        # Rows are labelled with the serials found in the responses
+        devices = [inventory.resolve(d) for d in devices]
+
+    if timefilter is not None:
+        timefilter = TimeFilter.parse_range(timefilter)
+        start_time, end_time = timefilter.start, timefilter.end
+    if start_time is None or end_time is None:
+        raise SCCException("A time range is required to run %s"
+                           % report_class.__name__)
+    start = _to_seconds(start_time)
+    end = _to_seconds(end_time)
+    start -= start % window
+    end += -end % window
+    starts = list(range(start, max(end, start + window), window))
+
+    report_options = report_options or {}
+
+    def run(window_start):
+        report = report_class(scc, **report_options)
+        report.run(devices=devices,
+                   start_time=_to_datetime(window_start),
+                   end_time=_to_datetime(window_start + window),
+                   **criteria)
+        return report.result
+
+    logger.debug("%s: requesting %d windows of %d devices"
+                 % (report_class.__name__, len(starts), len(devices)))
+    if len(starts) == 1 or max_workers <= 1:
+        results = [run(s) for s in starts]
+    else:
+        workers = min(max_workers, len(starts))
+        with ThreadPoolExecutor(max_workers=workers,
+                                thread_name_prefix='scc-pivot') as ex:
+            results = list(ex.map(run, starts))
+
+    columns = report_class.columns
+    if isinstance(columns, dict):
+        columns = columns.get(criteria.get('traffic_type'),
+                              next(iter(columns.values())))
+    if results and any(len(r.columns) != len(columns) for r in results):
+        columns = None
+    return pivot(list(zip(starts, results)), columns=columns,
+                 devices=devices, sparse=sparse, window=window)
@@ -0,0 +1,256 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Incremental polling of time series reports.
+
+A :py:class:`ReportPoller` remembers, for each report and criteria it
+follows, the last complete bucket it returned. Each poll only requests the
+buckets after it, plus a short ``late_window`` re-checked for buckets that
+appliances reported late:
+
+.. code-block:: python
+
+    poller = ReportPoller(scc, lookback=3600)
+    poller.add(ThroughputStatsReport, device=serial, traffic_type='peak')
+    poller.add('cpu_utilization', device=serial)
+
+    for point in poller.run(interval=300):
+        print(point.series.name, point.timestamp, point.data,
+              'revised' if point.revised else '')
+
+A bucket is complete, and returned, once ``settle_time`` seconds have passed
+since it closed. Buckets of the late window that were missing are returned
+when they show up, and buckets whose values changed are returned again with
+``revised`` set.
+"""
+
+import time
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+
+from steelscript.scc.core.report import stats_report_class, granularities, \
+    SCCException, _to_datetime
+
+__all__ = ['ReportPoller', 'TailSeries', 'TailPoint']
+
+logger = logging.getLogger(__name__)
+
+# Default number of series polled at once
+DEFAULT_MAX_WORKERS = 4
+
+
+class TailSeries(object):
+    """State of one report and criteria followed by a ReportPoller.
+
+    :param name: string, resource name or report class name
+    :param report_class: time series report class
+    :param criteria: dict of criteria other than the time range
+    :param last: int, timestamp of the last bucket returned, None until
+        the first successful poll
+    :param granularity: int, seconds per bucket of the series
+    :param error: exception raised by the last poll, None on success
+    """
+
+    def __init__(self, name, report_class, criteria):
+        self.name = name
+        self.report_class = report_class
+        self.criteria = criteria
+        self.last = None
+        self.granularity = None
+        self.error = None
+        self._recent = {}
+
+    def __repr__(self):
+        return '<TailSeries %s %s>' % (self.name, self.criteria)
+
+
+class TailPoint(object):
+    """A bucket of a series returned by a ReportPoller.
+
+    :param series: the TailSeries the bucket belongs to
+    :param timestamp: int, start of the bucket in epoch seconds
+    :param data: list of values of the bucket
+    :param revised: bool, True if the bucket was returned before with
+        different values
+    """
+
+    def __init__(self, series, timestamp, data, revised=False):
+        self.series = series
+        self.timestamp = timestamp
+        self.data = data
+        self.revised = revised
+
+    def __repr__(self):
+        return '<TailPoint %s %s%s>' % (self.series.name, self.timestamp,
+                                        ' revised' if self.revised else '')
+
+
+class ReportPoller(object):
+    """Follow time series reports, requesting only new buckets."""
+
+    def __init__(self, scc, lookback=3600, late_window=900, settle_time=60,
+                 max_workers=DEFAULT_MAX_WORKERS, report_options=None):
+        """Create a ReportPoller object
+
+        :param scc: SCC object used to run the reports
+        :param lookback: int, seconds of history returned by the first poll
+            of a series
+        :param late_window: int, seconds before the last bucket returned
+            that are requested again to catch late buckets
+        :param settle_time: int, seconds after a bucket closes before it is
+            considered complete
+        :param max_workers: int, maximum number of series polled at once
+        :param report_options: dict of keyword arguments used to create
+            the report objects
+        """
+        self.scc = scc
+        self.lookback = lookback
+        self.late_window = late_window
+        self.settle_time = settle_time
+        self.max_workers = max_workers
+        self.report_options = report_options or {}
+        self.series = []
+
+    def add(self, report_class, **criteria):
+        """Follow a time series report and return its TailSeries.
+
+        :param report_class: report class keyed by timestamp, or resource
+            name of the report in ``scc_stats_reports``
+        :param criteria: keyword criteria of the report, other than
+            start_time, end_time and timefilter
+        """
+        name, report_class = stats_report_class(report_class)
+        if report_class.key_field != 'timestamp':
+            raise SCCException("%s is not a time series report"
+                               % report_class.__name__)
+        for field in ('start_time', 'end_time', 'timefilter'):
+            if field in criteria:
+                raise SCCException("'%s' is set by the poller" % field)
+        # A series follows a single list of buckets
+        report = report_class(self.scc, **self.report_options)
+        fields = report.fanout_criteria(criteria)
+        if fields:
+            raise SCCException("%s can not be polled with several values "
+                               "of %s, add one series per value"
+                               % (report_class.__name__, fields))
+
+        series = TailSeries(name, report_class, criteria)
+        self.series.append(series)
+        return series
+
+    def _closed_until(self, granularity, now):
+        return int((now - self.settle_time) // granularity * granularity)
+
+    def _poll_one(self, series, now):
+        """Request the new buckets of a series, return its new points."""
+        granularity = series.granularity or min(granularities)
+        end = self._closed_until(granularity, now)
+        if series.last is None:
+            start = end - self.lookback
+        else:
+            start = series.last + granularity - self.late_window
+        if start >= end:
+            return []
+
+        report = series.report_class(self.scc, **self.report_options)
+        report.run(start_time=_to_datetime(start), end_time=_to_datetime(end),
+                   **series.criteria)
+        if report.granularity:
+            granularity = series.granularity = report.granularity
+            end = self._closed_until(granularity, now)
+
+        points = []
+        for rec in report.data or []:
+            ts = rec['timestamp']
+            if ts < start or ts + granularity > end:
+                continue
+            previous = series._recent.get(ts)
+            if previous is None:
+                # New bucket, or a bucket of the late window that was
+                # missing until now
+                if series.last is not None and ts <= series.last:
+                    logger.debug("Late bucket %s of %s" % (ts, series))
+                points.append(TailPoint(series, ts, rec['data']))
+            elif previous != rec['data']:
+                points.append(TailPoint(series, ts, rec['data'],
+                                        revised=True))
+            else:
+                continue
+            series._recent[ts] = rec['data']
+
+        if points:
+            series.last = max([series.last or 0] +
+                              [p.timestamp for p in points])
+        if series.last is not None:
+            oldest = series.last - self.late_window
+            for ts in [t for t in series._recent if t <= oldest]:
+                del series._recent[ts]
+        return sorted(points, key=lambda p: p.timestamp)
+
+    def _poll_safe(self, series, now):
+        try:
+            points = self._poll_one(series, now)
+        except Exception as e:
+            logger.exception("Exception in polling %s" % series)
+            series.error = e
+            return []
+        series.error = None
+        return points
+
+    def poll(self, now=None):
+        """Poll every series once and return the list of new TailPoints.
+
+        A series failing to poll is retried on the next call, its
+        exception is kept as the ``error`` attribute of the series.
+
+        :param now: epoch seconds to poll as of, defaults to current time
+        """
+        now = time.time() if now is None else now
+        if len(self.series) <= 1 or self.max_workers <= 1:
+            results = [self._poll_safe(s, now) for s in self.series]
+        else:
+            workers = min(self.max_workers, len(self.series))
+            with ThreadPoolExecutor(max_workers=workers,
+                                    thread_name_prefix='scc-poller') as ex:
+                results = list(ex.map(lambda s: self._poll_safe(s, now),
+                                      self.series))
+        return [p for points in results for p in points]
+
+    def rewind(self, series, timestamp):
+        """Return the buckets of series from timestamp on again.
+
+        Used when the points returned by a poll could not be processed,
+        the next poll requests them again and returns them as new points.
+
+        :param series: TailSeries the points belong to
+        :param timestamp: int, earliest bucket to return again
+        """
+        for ts in [t for t in series._recent if t >= timestamp]:
+            del series._recent[ts]
+        if series.last is not None and series.last >= timestamp:
+            granularity = series.granularity or min(granularities)
+            # Start the next poll at the bucket at the latest, buckets
+            # before it were returned already
+            series.last = min(series.last,
+                              timestamp - granularity + self.late_window)
+
+    def run(self, interval=300, count=None):
+        """Poll every interval seconds, yielding new points as they come.
+
+        :param interval: int, seconds between the start of two polls
+        :param count: int, number of polls before returning, runs forever
+            if None
+        """
+        polls = 0
+        while count is None or polls < count:
+            started = time.time()
+            for point in self.poll(started):
+                yield point
+            polls += 1
+            if count is None or polls < count:
+                time.sleep(max(0, started + interval - time.time()))
@@ -4,10 +4,45 @@
 # accompanying the software ("License").  This software is distributed "AS IS"
 # as set forth in the License.
 
+import json
+import time
+import asyncio
 import logging
+import threading
+import datetime
+import functools
+import contextlib
+import itertools
+import collections
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
 
 from steelscript.netprofiler.core.filters import TimeFilter # [mzetea] - shouldn't netprofiler be added as a dependency?
 from steelscript.common.timeutils import datetime_to_seconds
+from steelscript.scc.core.cache import make_cache_key
+from steelscript.scc.core.result import ColumnarResult, SeriesMatrix
+from steelscript.scc.core.streaming import JSONArrayStream, \
+    DEFAULT_CHUNK_SIZE
+
+__all__ = ['scc_stats_reports', 'scc_appl_reports', 'scc_reports',
+           'granularities', 'get_scc_report_class', 'stats_report_class',
+           'run_report', 'sum_records', 'SubclassRegistry', 'SCCException',
+           'BaseSCCReport', 'BaseStatsReport', 'BWUsageStatsReport',
+           'BWTimeSeriesStatsReport', 'BWPerApplStatsReport',
+           'ThroughputStatsReport', 'ThroughputPerApplStatsReport',
+           'ConnectionHistoryStatsReport', 'SRDFStatsReport',
+           'TCPMemoryPressureReport', 'MultiDevStatsReport',
+           'ConnectionPoolingStatsReport', 'ConnectionForwardingStatsReport',
+           'DNSUsageStatsReport', 'DNSCacheHitsStatsReport', 'HTTPStatsReport',
+           'NFSStatsReport', 'SSLStatsReport', 'DiskLoadStatsReport',
+           'SingleDevStatsReport', 'SDRAdaptiveStatsReport',
+           'MemoryPagingStatsReport', 'CpuUtilizationStatsReport',
+           'PFSStatsReport', 'QoSStatsReport', 'SnapMirrorStatsReport',
+           'SteelFusionLUNIOReport', 'SteelFusionInitiatorIOReport',
+           'SteelFusionNetworkIOReport', 'SteelFusionBlockstoreReport',
+           'BaseApplInvtReport', 'AppliancesReport']
 
 # Below are mappings from resource to report class
 scc_stats_reports = {
@@ -49,12 +84,128 @@ scc_reports = {'stats': scc_stats_reports,
 
 logger = logging.getLogger(__name__)
 
+# Granularities (in seconds) of the time series returned by cmc.stats
+granularities = [300, 3600]
+
+# Default number of sub-requests of one report that run concurrently
+DEFAULT_MAX_WORKERS = 4
+
+
+def _to_datetime(seconds):
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc)
+
+
+def _fans_out(value):
+    """Return True if a criteria value requests several values."""
+    return value == 'all' or isinstance(value, (list, tuple, set, range))
+
+
+def _limited(scc, service, resource):
+    """Return a context manager holding a slot of the limiter of scc
+    while sending one request to resource of service."""
+    limiter = getattr(scc, 'limiter', None)
+    if limiter is None:
+        return contextlib.nullcontext()
+    return limiter.slot(key='%s.%s' % (service, resource))
+
 
 def get_scc_report_class(service, resource):
     """Return report class based on service name and resource name."""
     return eval(scc_reports[service][resource])
 
 
+def stats_report_class(report_class):
+    """Return the name and class of a stats report.
+
+    :param report_class: report class, or resource name of the report in
+        ``scc_stats_reports``
+    :return: tuple of the resource name, or class name, and the class
+    :raises SCCException: if report_class is an unknown resource name
+    """
+    if not isinstance(report_class, str):
+        return report_class.__name__, report_class
+    try:
+        return report_class, get_scc_report_class('stats', report_class)
+    except KeyError:
+        raise SCCException("'%s' is not a valid stats report name"
+                           % report_class)
+
+
+def run_report(report, criteria, label=None):
+    """Run a report, returning its exception rather than raising it.
+
+    Used by the classes running many reports, where one failing report
+    must not stop the others. The exception is logged with its traceback.
+
+    :param report: report object to run
+    :param criteria: dict of criteria passed to the report's run method
+    :param label: string naming the run in the log, defaults to the
+        report class name
+    :return: tuple of the exception raised, None on success, and the
+        seconds spent running the report
+    """
+    start = time.time()
+    error = None
+    try:
+        report.run(**criteria)
+    except Exception as e:
+        logger.exception("Exception in running %s"
+                         % (label or report.__class__.__name__))
+        error = e
+    return error, time.time() - start
+
+
+def sum_records(record_lists, key_field):
+    """Sum the values of records sharing a key across lists of records.
+
+    :param record_lists: iterable of lists of {key_field, data} dicts
+    :param key_field: string, field identifying each record
+    :return: list of records sorted by key, data arrays of different
+        lengths are summed as if padded with zeros
+    """
+    records = {}
+    for record_list in record_lists:
+        for rec in record_list:
+            key = rec[key_field]
+            if key in records:
+                total = records[key]['data']
+                records[key]['data'] = [
+                    a + b for a, b in
+                    itertools.zip_longest(total, rec['data'], fillvalue=0)]
+            else:
+                records[key] = dict(rec)
+    return [records[k] for k in sorted(records)]
+
+
+class SubclassRegistry(object):
+    """Subclass ids known to hold data, such as the QoS classes of an
+    appliance, by host, resource and device.
+
+    ``cmc.stats`` has no listing of these ids, so reports fanned out over
+    'all' subclasses query the ids seen returning data before, which may
+    also be added by hand.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = {}
+
+    def add(self, host, resource, device, ids):
+        """Record subclass ids of a resource of a device."""
+        with self._lock:
+            self._ids.setdefault((host, resource, device), set()).update(
+                int(i) for i in ids)
+
+    def get(self, host, resource, device):
+        """Return the sorted list of known subclass ids."""
+        with self._lock:
+            return sorted(self._ids.get((host, resource, device), ()))
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+
 class SCCException(Exception):
     pass
 
@@ -72,6 +223,15 @@ class BaseSCCReport(object):
         excluding start_time and end_time.
     :param non_required_fields: list of fields available to use but not
         required by the sub-report
+    :param key_field: string, field identifying each record of the data,
+        such as 'timestamp' for time series, None if records are not keyed
+    :param columns: list of names of the values in the 'data' array of
+        each record, or a dict of such lists keyed by traffic_type whose
+        first key is the default traffic type of the resource
+    :param federation_merge: string, how a FederatedSCC combines the
+        records of several SCCs, 'sum' to add values of records with the
+        same key_field, only meaningful for byte and packet counters, or
+        'concat' to append the records tagged with their SCC
     """
     service = None
     resource = None
@@ -79,13 +239,29 @@ class BaseSCCReport(object):
     data_key = None
     required_fields = []
     non_required_fields = []
-
-    def __init__(self, scc):
+    key_field = None
+    columns = None
+    federation_merge = 'concat'
+
+    def __init__(self, scc, max_workers=DEFAULT_MAX_WORKERS, cache=None):
+        """Create a report object
+
+        :param scc: SCC object used to run the report
+        :param max_workers: int, maximum number of sub-requests run at once
+            when the report is split into several requests
+        :param cache: ReportCache object used to answer repeated requests,
+            defaults to the cache of the SCC object if it has one
+        """
         self.scc = scc
+        self.max_workers = max_workers
+        self._cache = cache
         self.datarep = None
         self.response = None
         self.data = None
         self.criteria = None
+        self.granularity = None
+        self._result = None
+        self._sent = threading.local()
 
     def __enter__(self):
         return self
@@ -115,29 +291,695 @@ class BaseSCCReport(object):
                 temp[field] = kwargs[field]
         self.criteria = temp if temp else None
 
+    @property
+    def cache(self):
+        if self._cache is not None:
+            return self._cache
+        return getattr(self.scc, 'cache', None)
+
+    def _request(self, criteria):
+        """Send a single request to the SCC and return the response payload.
+        """
+        svc_obj = getattr(self.scc, self.service)
+        datarep = svc_obj.bind(self.resource)
+        limited = _limited(self.scc, self.service, self.resource)
+        with limited:
+            response = datarep.execute(self.link, criteria)
+        # Requests may be sent by worker threads, each keeps its own and
+        # run() only publishes those of the thread running the report
+        self._sent.datarep = datarep
+        self._sent.response = response
+        return response.data
+
+    def _fetch(self, key, criteria):
+        payload = self._request(criteria)
+        cache = self.cache
+        if cache is not None and key is not None:
+            cache.put(key, payload)
+        return payload
+
+    def _execute(self, criteria):
+        """Return the response payload for a single request.
+
+        Identical requests already in flight on the same SCC object are
+        not sent again, their payload is shared once received.
+
+        :param criteria: dict of request fields, as built by _fill_criteria
+        """
+        host = getattr(self.scc, 'host', None)
+        key = None
+        cache = self.cache
+        if cache is not None:
+            # Time ranges are snapped to the finest granularity so that
+            # relative ranges run moments apart share an entry, and
+            # entries are only shared by the same credentials
+            key = make_cache_key(host, self.service, self.resource,
+                                 self.link, criteria,
+                                 auth=getattr(self.scc, 'auth', None),
+                                 snap=min(granularities))
+            if key is not None:
+                payload = cache.get(key)
+                if payload is not None:
+                    return payload
+
+        inflight = getattr(self.scc, 'inflight', None)
+        if inflight is None:
+            return self._fetch(key, criteria)
+        # All requests of one SCC object use the same credentials
+        flight_key = make_cache_key(host, self.service, self.resource,
+                                    self.link, criteria)
+        return inflight.do(flight_key, self._fetch, key, criteria)
+
+    def _extract_data(self, payload):
+        """Return the portion of the response payload keyed by data_key."""
+        if (self.data_key and isinstance(payload, dict) and
+                self.data_key in payload):
+            return payload[self.data_key]
+        elif not self.data_key:
+            return payload
+        else:
+            raise SCCException('data_key %s is invalid for %s'
+                               % (self.data_key, self.__class__.__name__))
+
+    def _execute_many(self, criteria_list):
+        """Execute several requests concurrently, return payloads in order.
+        """
+        if len(criteria_list) == 1:
+            return [self._execute(criteria_list[0])]
+
+        workers = min(self.max_workers, len(criteria_list))
+        with ThreadPoolExecutor(max_workers=workers,
+                                thread_name_prefix='scc-report') as executor:
+            return list(executor.map(self._execute, criteria_list))
+
+    def fanout_criteria(self, criteria):
+        """Return the fields of criteria that fan the report out."""
+        return []
+
+    def _fanout_field(self, criteria):
+        """Return the field of criteria given a list of values to request
+        separately, or None."""
+        return None
+
+    def _split_criteria(self, criteria):
+        """Return the list of request criteria needed to answer criteria.
+
+        Sub-classes override this along with _merge_payloads to break a
+        large request into smaller requests run concurrently.
+        """
+        return [criteria]
+
+    def _merge_payloads(self, criteria, criteria_list, payloads):
+        """Combine the payloads of the requests from _split_criteria.
+
+        :param criteria: dict, criteria of the whole report
+        :param criteria_list: list of criteria returned by _split_criteria
+        :param payloads: list of response payloads, one per criteria_list
+        """
+        return payloads[0]
+
+    def get_columns(self, traffic_type=None):
+        """Return the names of the values in each record's data array.
+
+        :param traffic_type: string, traffic type to return the columns
+            of, defaults to the one the report was last run with
+        """
+        if not isinstance(self.columns, dict):
+            return self.columns
+
+        if traffic_type is None and self.criteria:
+            traffic_type = self.criteria.get('traffic_type')
+        if traffic_type is None:
+            traffic_type = next(iter(self.columns))
+        return self.columns.get(traffic_type)
+
+    @property
+    def result(self):
+        """Report data as a :py:class:`ColumnarResult
+        <steelscript.scc.core.result.ColumnarResult>`, built on first use.
+        """
+        if self._result is None and self.data is not None:
+            if not self.key_field:
+                raise SCCException("%s data can not be converted to "
+                                   "columns" % self.__class__.__name__)
+            self._result = ColumnarResult.from_records(
+                self.data, self.key_field, self.get_columns(),
+                granularity=self.granularity)
+        return self._result
+
     def run(self, **kwargs):
         """Run report to fetch data from the SCC device"""
+        self._result = None
+        self.granularity = None
+        self._sent = threading.local()
         self._fill_criteria(**kwargs)
+        criteria_list = self._split_criteria(self.criteria)
+        payloads = self._execute_many(criteria_list)
+        payload = self._merge_payloads(self.criteria, criteria_list,
+                                       payloads)
+        # Set only for a single request sent by this thread, None when
+        # the report was split or answered by the cache or a coalesced
+        # request
+        self.datarep = getattr(self._sent, 'datarep', None)
+        self.response = getattr(self._sent, 'response', None)
+        if isinstance(payload, dict):
+            self.granularity = payload.get('granularity')
+        self.data = self._extract_data(payload)
+
+    def _open_stream(self, criteria):
+        """Send a single request and return the unread HTTP response."""
         svc_obj = getattr(self.scc, self.service)
         self.datarep = svc_obj.bind(self.resource)
-        self.response = self.datarep.execute(self.link, self.criteria)
-        if (self.data_key and isinstance(self.response.data, dict) and
-                self.data_key in self.response.data):
-            self.data = self.response.data[self.data_key]
-        elif not self.data_key:
-            self.data = self.response.data
+        link = self.datarep.jsonschema.links[self.link]
+        uri = self.datarep._resolve_path(link.path)
+
+        if svc_obj.connection is None:
+            svc_obj.connection = svc_obj.connection_manager.find(
+                svc_obj.host, svc_obj.auth)
+
+        headers = dict(svc_obj.headers)
+        headers['Content-Type'] = 'application/json'
+        headers['Accept'] = 'application/json'
+
+        if link.method == 'GET':
+            body, params = None, criteria
         else:
-            raise SCCException('data_key %s is invalid for %s'
-                               % (self.data_key, self.__class__.__name__))
+            body, params = json.dumps(criteria or {}), None
+
+        # The slot is freed once the response headers are received, the
+        # body is read by the caller at its own pace
+        limited = _limited(self.scc, self.service, self.resource)
+        with limited:
+            return svc_obj.connection.request(link.method, uri, body=body,
+                                              params=params,
+                                              extra_headers=headers,
+                                              stream=True)
+
+    def stream(self, chunk_size=DEFAULT_CHUNK_SIZE, **kwargs):
+        """Run report and yield data records as the response is read.
+
+        The response body is decoded incrementally, so memory use is
+        bounded by chunk_size and the size of one record rather than by
+        the size of the response. ``self.data`` is left unset. Streamed
+        requests are sent as is, without caching or request splitting.
+
+        :param chunk_size: int, bytes read from the response at a time
+        """
+        self._result = None
+        self.granularity = None
+        self._fill_criteria(**kwargs)
+
+        if self.fanout_criteria(self.criteria):
+            raise SCCException("Reports run over a list of values can not "
+                               "be streamed")
+
+        response = self._open_stream(self.criteria)
+        try:
+            stream = JSONArrayStream(response.iter_content(chunk_size),
+                                     self.data_key)
+            for rec in stream:
+                # members sent ahead of the data are already decoded
+                if self.granularity is None:
+                    self.granularity = stream.header.get('granularity')
+                yield rec
+            self.granularity = stream.header.get('granularity')
+        finally:
+            response.close()
+
+    def stream_batches(self, batch_size=10000, chunk_size=DEFAULT_CHUNK_SIZE,
+                       **kwargs):
+        """Run report and yield the data as ColumnarResult batches.
+
+        :param batch_size: int, maximum number of records per batch
+        :param chunk_size: int, bytes read from the response at a time
+        """
+        batch = []
+        for rec in self.stream(chunk_size=chunk_size, **kwargs):
+            batch.append(rec)
+            if len(batch) == batch_size:
+                yield ColumnarResult.from_records(
+                    batch, self.key_field, self.get_columns(),
+                    granularity=self.granularity)
+                batch = []
+        if batch:
+            yield ColumnarResult.from_records(batch, self.key_field,
+                                              self.get_columns(),
+                                              granularity=self.granularity)
+
+    async def arun(self, **kwargs):
+        """Run report from a coroutine without blocking the event loop.
+
+        The blocking request is handed to the executor of the SCC object
+        if it provides one (see :py:class:`AsyncSCC
+        <steelscript.scc.core.aio.AsyncSCC>`), otherwise to the default
+        executor of the running loop. Returns the report data, which is
+        also stored in ``self.data`` as with :py:meth:`run`.
+        """
+        loop = asyncio.get_running_loop()
+        executor = getattr(self.scc, 'executor', None)
+        await loop.run_in_executor(executor,
+                                   functools.partial(self.run, **kwargs))
+        return self.data
 
 
 class BaseStatsReport(BaseSCCReport):
     """Base class for reports generated by scc.stats api, not directly
     used for creating reports objects. All report instances are derived based
     on sub-classes inheriting from this class.
+
+    :param devices_merge: string, how results of requests split by
+        device_chunk_size are combined, 'sum' to add values of records
+        with the same key_field or 'concat' to append the records
+    :param subclass_field: string, criteria selecting a subclass of the
+        resource, such as a QoS class, None if the resource has none
+    :param default_subclass_id: int, subclass the SCC reports on when
+        subclass_field is not set
+    :param subclass_registry: SubclassRegistry shared by all reports,
+        listing the subclass ids queried when subclass_field is 'all'
+
+    Fields listed in fanout_fields may be given a list of values, the
+    report then requests each value concurrently. ``self.data`` is a dict
+    of the records of each value and ``self.result`` a
+    :py:class:`SeriesMatrix <steelscript.scc.core.result.SeriesMatrix>` of
+    value x timestamp x column:
+
+    .. code-block:: python
+
+        report = QoSStatsReport(scc)
+        report.run(device=serial, qos_class_id=range(1, 31),
+                   timefilter='last 1 hour')
+        report.result['bits_sent']     # 30 classes x timestamps
+
+    Time series reports taking a port fan out over a list of ports the
+    same way, or over every port with traffic when port is 'all', see
+    :py:meth:`BWUsageStatsReport.top_ports`.
+
+    A traffic_type of 'all' requests every traffic type of the resource.
+    As their values differ, ``self.result`` is then a single
+    ColumnarResult whose columns are named after the traffic type and the
+    value, aligned on the key:
+
+    .. code-block:: python
+
+        report = ThroughputStatsReport(scc)
+        report.run(device=serial, traffic_type='all',
+                   timefilter='last 1 hour')
+        report.result['p95.wan_out']
     """
 
     service = 'stats'
+    key_field = 'timestamp'
+    devices_merge = 'sum'
+    subclass_field = None
+    default_subclass_id = 0
+    subclass_registry = SubclassRegistry()
+
+    def __init__(self, scc, shard_size=None, device_chunk_size=None,
+                 segment_store=None, **kwargs):
+        """Create a stats report object
+
+        :param shard_size: int seconds or timedelta, when set a time range
+            longer than this is fetched as several windows of this size
+            requested concurrently, and the time series stitched back
+            together. Windows are aligned to the coarsest granularity.
+        :param device_chunk_size: int, when set a ``devices`` list longer
+            than this is sent as several requests of at most this many
+            devices each, run concurrently. Results are summed per
+            timestamp (or port), or concatenated for per appliance reports.
+        :param segment_store: SegmentStore object holding closed buckets of
+            time series, only the ranges it does not hold are requested.
+            Defaults to the segment store of the SCC object if it has one.
+
+        Other keyword arguments are passed to :py:class:`BaseSCCReport`.
+        """
+        super(BaseStatsReport, self).__init__(scc, **kwargs)
+
+        if isinstance(shard_size, datetime.timedelta):
+            shard_size = int(shard_size.total_seconds())
+
+        if shard_size:
+            if self.key_field != 'timestamp':
+                raise SCCException("%s does not return a time series and "
+                                   "can not be sharded"
+                                   % self.__class__.__name__)
+            if shard_size <= 0 or shard_size % max(granularities):
+                raise SCCException("shard_size must be a positive multiple "
+                                   "of %s seconds" % max(granularities))
+        self.shard_size = shard_size
+
+        if device_chunk_size:
+            if 'devices' not in (self.required_fields +
+                                 self.non_required_fields):
+                raise SCCException("%s does not take a devices list"
+                                   % self.__class__.__name__)
+            if device_chunk_size < 1:
+                raise SCCException("device_chunk_size must be at least 1")
+        self.device_chunk_size = device_chunk_size
+        self._segment_store = segment_store
+
+    @property
+    def segment_store(self):
+        if self._segment_store is not None:
+            return self._segment_store
+        return getattr(self.scc, 'segment_store', None)
+
+    @property
+    def fanout_fields(self):
+        """Criteria fields that may be given a list of values."""
+        fields = [self.subclass_field] if self.subclass_field else []
+        if 'traffic_type' in self.non_required_fields:
+            fields.append('traffic_type')
+        # Bandwidth usage already returns every port
+        if 'port' in self.non_required_fields and \
+                self.key_field == 'timestamp':
+            fields.append('port')
+        return fields
+
+    def fanout_criteria(self, criteria):
+        """Return the fields of criteria, as given to run, that fan the
+        report out, making its data a dict of records per value."""
+        return [f for f in self.fanout_fields
+                if _fans_out((criteria or {}).get(f))]
+
+    def _fanout_field(self, criteria):
+        fields = [f for f in self.fanout_fields
+                  if isinstance((criteria or {}).get(f), list)]
+        if len(fields) > 1:
+            raise SCCException("Only one of %s can be given a list of "
+                               "values" % fields)
+        return fields[0] if fields else None
+
+    def known_subclass_ids(self, device):
+        """Return the subclass ids queried when subclass_field is 'all':
+        the default subclass and those seen returning data for device."""
+        ids = self.subclass_registry.get(getattr(self.scc, 'host', None),
+                                         self.resource, device)
+        return sorted(set(ids) | set([self.default_subclass_id]))
+
+    def traffic_types(self):
+        """Return the traffic types the resource accepts, as listed in
+        its service definition."""
+        svc_obj = getattr(self.scc, self.service)
+        resource = svc_obj.servicedef.find_resource(self.resource)
+        request = resource.links[self.link].request
+        schema = request.properties.get('traffic_type')
+        enum = getattr(schema, 'enum', None) if schema is not None else None
+        if not enum:
+            raise SCCException("%s does not list its traffic types"
+                               % self.__class__.__name__)
+        return list(enum)
+
+    def _fanout_values(self, field, value, criteria):
+        """Return the list of values requested for a fanout field."""
+        if field == 'traffic_type':
+            valid = self.traffic_types()
+            if value == 'all':
+                return valid
+            unknown = [v for v in value if v not in valid]
+            if unknown:
+                raise SCCException("Unknown traffic types %s for %s, valid "
+                                   "traffic types are %s"
+                                   % (unknown, self.__class__.__name__,
+                                      valid))
+            return list(collections.OrderedDict.fromkeys(value))
+
+        if field == 'port':
+            if value == 'all':
+                return self.usage_ports(criteria)
+            return list(collections.OrderedDict.fromkeys(int(v)
+                                                         for v in value))
+
+        if value == 'all':
+            value = self.known_subclass_ids(criteria.get('device'))
+        return sorted(set(int(v) for v in value))
+
+    def usage_ports(self, criteria):
+        """Return the ports with traffic over the time range and devices
+        of criteria, busiest first, as returned by a BWUsageStatsReport.
+        """
+        for field in ['start_time', 'end_time']:
+            if not criteria.get(field):
+                raise SCCException("Field '%s' is required to run %s" %
+                                   (field, self.__class__.__name__))
+
+        usage = BWUsageStatsReport(self.scc, cache=self._cache)
+        devices = criteria.get('devices')
+        if criteria.get('device'):
+            devices = [criteria['device']]
+        # Throughput traffic types are not bandwidth traffic types
+        traffic_type = criteria.get('traffic_type')
+        if not isinstance(traffic_type, str) or \
+                traffic_type not in usage.columns:
+            traffic_type = None
+        usage.run(start_time=_to_datetime(criteria['start_time']),
+                  end_time=_to_datetime(criteria['end_time']),
+                  devices=devices, traffic_type=traffic_type)
+        ports = usage.top_ports()
+        if not ports:
+            raise SCCException("No port with traffic to run %s over"
+                               % self.__class__.__name__)
+        return ports
+
+    @property
+    def result(self):
+        field = self._fanout_field(self.criteria)
+        if field is None or self.data is None:
+            return super(BaseStatsReport, self).result
+
+        if self._result is None and field == 'traffic_type':
+            self._result = ColumnarResult.join(
+                [(value, ColumnarResult.from_records(
+                    records, self.key_field, self.get_columns(value),
+                    granularity=self.granularity))
+                 for value, records in self.data.items()])
+        elif self._result is None:
+            columns = self.get_columns()
+            self._result = SeriesMatrix.from_results(
+                field, [(value, ColumnarResult.from_records(
+                    records, self.key_field, columns,
+                    granularity=self.granularity))
+                    for value, records in self.data.items()],
+                columns=columns, granularity=self.granularity)
+        return self._result
+
+    def _execute(self, criteria):
+        store = self.segment_store
+        if store is None or self.key_field != 'timestamp':
+            return super(BaseStatsReport, self)._execute(criteria)
+
+        # Serve closed buckets from the segment store, request the rest
+        host = getattr(self.scc, 'host', None)
+        start, end = criteria['start_time'], criteria['end_time']
+
+        # The SCC picks the granularity from the range, buckets held are
+        # only used once it is known for ranges of this length
+        granularity = store.span_granularity(host, self.resource,
+                                             end - start)
+        series = store.series(host, self.resource,
+                              criteria).get(granularity)
+        if series is None:
+            return self._execute_unsegmented(store, host, criteria)
+
+        payload = None
+        fetched = {}
+        for gap_start, gap_end in store.missing(series, start, end):
+            if granularity != min(granularities):
+                # A short gap would be answered at a finer granularity
+                # than the buckets held, widen it to the shortest range
+                # known to be answered at theirs
+                span = store.shortest_span(host, self.resource,
+                                           granularity, gap_end - gap_start)
+                gap_start = gap_end - (span or end - start)
+            c = dict(criteria)
+            c['start_time'] = gap_start
+            c['end_time'] = gap_end
+            payload = super(BaseStatsReport, self)._execute(c)
+            found = payload.get('granularity') or min(granularities)
+            store.set_span_granularity(host, self.resource,
+                                       gap_end - gap_start, found)
+            if found != granularity:
+                # The SCC also picks the granularity from the age of the
+                # data, request the whole range instead
+                logger.debug("%s: gap of %s returned at %ss instead of "
+                             "%ss" % (self.__class__.__name__, series,
+                                      found, granularity))
+                return self._execute_unsegmented(store, host, criteria)
+            data = payload[self.data_key]
+            store.add(series, gap_start, gap_end, data)
+            for rec in data:
+                fetched[rec['timestamp']] = rec
+
+        # Held ranges are half-open, the bucket at end is not held
+        records = dict((rec['timestamp'], rec)
+                       for rec in store.records(series, start, end)
+                       if rec['timestamp'] < end)
+        records.update(fetched)
+
+        merged = dict(payload or {})
+        merged['granularity'] = granularity
+        merged['query_criteria'] = criteria
+        merged[self.data_key] = [records[t] for t in sorted(records)
+                                 if start <= t <= end]
+        return merged
+
+    def _execute_unsegmented(self, store, host, criteria):
+        """Request the whole range of criteria and store its buckets."""
+        payload = super(BaseStatsReport, self)._execute(criteria)
+        start, end = criteria['start_time'], criteria['end_time']
+        granularity = payload.get('granularity') or min(granularities)
+        store.set_span_granularity(host, self.resource, end - start,
+                                   granularity)
+        series = store.series_id(host, self.resource, criteria, granularity)
+        store.add(series, start, end, payload[self.data_key])
+        return payload
+
+    def _shard_windows(self, start, end):
+        """Split [start, end] into windows aligned to shard_size."""
+        if not self.shard_size or end - start <= self.shard_size:
+            return [(start, end)]
+
+        windows = []
+        lo = start
+        hi = (start // self.shard_size + 1) * self.shard_size
+        while hi < end:
+            windows.append((lo, hi))
+            lo, hi = hi, hi + self.shard_size
+        windows.append((lo, end))
+        return windows
+
+    def _device_chunks(self, devices):
+        """Split a devices list into chunks of device_chunk_size."""
+        if (not devices or not self.device_chunk_size or
+                len(devices) <= self.device_chunk_size):
+            return [devices]
+
+        size = self.device_chunk_size
+        return [devices[i:i + size] for i in range(0, len(devices), size)]
+
+    def _split_criteria(self, criteria):
+        if criteria.get('port') == 'all':
+            # Replaced in place so that the data and result of the report
+            # are keyed by the ports found
+            criteria['port'] = self._fanout_values('port', 'all', criteria)
+
+        field = self._fanout_field(criteria)
+        windows = self._shard_windows(criteria['start_time'],
+                                      criteria['end_time'])
+        chunks = self._device_chunks(criteria.get('devices'))
+
+        if field is None and len(windows) == 1 and len(chunks) == 1:
+            return [criteria]
+
+        if field is None:
+            variants = [criteria]
+        else:
+            variants = [dict(criteria, **{field: value})
+                        for value in criteria[field]]
+
+        logger.debug("%s: splitting request into %d values of %d windows "
+                     "of %d device chunks" % (self.__class__.__name__,
+                                              len(variants), len(windows),
+                                              len(chunks)))
+        ret = []
+        for variant in variants:
+            for start, end in windows:
+                for devices in chunks:
+                    c = dict(variant)
+                    c['start_time'] = start
+                    c['end_time'] = end
+                    if devices:
+                        c['devices'] = devices
+                    ret.append(c)
+        return ret
+
+    def _merge_devices(self, payloads):
+        """Merge payloads of the same time window for each device chunk."""
+        if len(payloads) == 1:
+            return payloads[0]
+
+        if self.devices_merge == 'concat':
+            data = []
+            for payload in payloads:
+                data.extend(payload[self.data_key])
+        else:
+            # Values of each record are summed across device chunks,
+            # as the SCC does across the devices of a single request
+            data = sum_records((p[self.data_key] for p in payloads),
+                               self.key_field)
+
+        merged = dict(payloads[0])
+        merged[self.data_key] = data
+        return merged
+
+    def _stitch_windows(self, payloads):
+        """Stitch payloads of consecutive time windows together."""
+        if len(payloads) == 1:
+            return payloads[0]
+
+        # The SCC picks the granularity of each window from its length
+        # and age, windows of different granularities can not be stitched
+        found = sorted(set(p.get('granularity') for p in payloads
+                           if p.get('granularity')))
+        if len(found) > 1:
+            raise SCCException("%s windows were returned with different "
+                               "granularities %s, use a larger shard_size "
+                               "or none" % (self.__class__.__name__, found))
+
+        # Points on the boundary of two windows may be returned by both
+        records = {}
+        for payload in payloads:
+            for rec in payload[self.data_key]:
+                records.setdefault(rec['timestamp'], rec)
+
+        merged = dict(payloads[0])
+        merged[self.data_key] = [records[t] for t in sorted(records)]
+        if found:
+            merged['granularity'] = found[0]
+        return merged
+
+    def _merge_payloads(self, criteria, criteria_list, payloads):
+        field = self._fanout_field(criteria)
+        if field is None:
+            return self._merge_split(criteria, criteria_list, payloads)
+
+        groups = collections.OrderedDict((value, ([], []))
+                                         for value in criteria[field])
+        for c, payload in zip(criteria_list, payloads):
+            groups[c[field]][0].append(c)
+            groups[c[field]][1].append(payload)
+
+        data = collections.OrderedDict()
+        for value, (values_criteria, values_payloads) in groups.items():
+            merged = self._merge_split(dict(criteria, **{field: value}),
+                                       values_criteria, values_payloads)
+            data[value] = self._extract_data(merged)
+
+        if field == self.subclass_field and criteria.get('device'):
+            self.subclass_registry.add(
+                getattr(self.scc, 'host', None), self.resource,
+                criteria['device'], [v for v, recs in data.items() if recs])
+
+        payload = dict(merged)
+        payload['query_criteria'] = criteria
+        payload[self.data_key] = data
+        return payload
+
+    def _merge_split(self, criteria, criteria_list, payloads):
+        """Merge the payloads of the windows and device chunks of one
+        request."""
+        if len(payloads) == 1:
+            return payloads[0]
+
+        windows = collections.OrderedDict()
+        for c, payload in zip(criteria_list, payloads):
+            key = (c['start_time'], c['end_time'])
+            windows.setdefault(key, []).append(payload)
+
+        merged = self._stitch_windows([self._merge_devices(p)
+                                       for p in windows.values()])
+        if 'query_criteria' in merged:
+            merged['query_criteria'] = criteria
+        return merged
 
     def _fill_criteria(self, **kwargs):
 
@@ -156,9 +998,36 @@ class BaseStatsReport(BaseSCCReport):
                 kwargs[name] = datetime_to_seconds(kwargs[name])
 
         if 'devices' in kwargs and kwargs['devices']:
-            kwargs['devices'] = kwargs['devices'].split(',')
+            if isinstance(kwargs['devices'], str):
+                kwargs['devices'] = kwargs['devices'].split(',')
+            else:
+                kwargs['devices'] = list(kwargs['devices'])
+
+        # Appliances may be given by hostname or address when the SCC
+        # keeps an inventory
+        inventory = getattr(self.scc, 'inventory', None)
+        if inventory is not None:
+            if kwargs.get('device'):
+                kwargs['device'] = inventory.resolve(kwargs['device'])
+            if kwargs.get('devices'):
+                kwargs['devices'] = [inventory.resolve(d)
+                                     for d in kwargs['devices']]
+
+        fields = self.fanout_criteria(kwargs)
+        if len(fields) > 1:
+            raise SCCException("Only one of %s can be given a list of "
+                               "values" % fields)
+        for field in fields:
+            if not kwargs[field]:
+                raise SCCException("No %s given to run %s"
+                                   % (field, self.__class__.__name__))
+            if field == 'port' and kwargs[field] == 'all':
+                # Ports with traffic are only looked up once the criteria
+                # are validated, see _split_criteria
+                continue
+            kwargs[field] = self._fanout_values(field, kwargs[field], kwargs)
 
-        if 'port' in kwargs and kwargs['port']:
+        if kwargs.get('port') and not _fans_out(kwargs['port']):
             kwargs['port'] = int(kwargs['port'])
 
         super(BaseStatsReport, self)._fill_criteria(**kwargs)
@@ -173,8 +1042,40 @@ class BWUsageStatsReport(BaseStatsReport):
     resource = 'bw_usage'
     link = 'report'
     data_key = 'response_data'
+    columns = {'optimized': ['wan_in', 'wan_out', 'lan_in', 'lan_out'],
+               'passthrough': ['bytes_in', 'bytes_out']}
+    key_field = 'port'
     required_fields = ['start_time', 'end_time']
     non_required_fields = ['traffic_type', 'port', 'devices']
+    federation_merge = 'sum'
+
+    def top_ports(self, n=None, column=None):
+        """Return the ports of the report data, busiest first.
+
+        Useful to fan a time series report out over the busiest ports:
+
+        .. code-block:: python
+
+            usage = BWUsageStatsReport(scc)
+            usage.run(devices=[serial], timefilter='last 1 day')
+            report = BWTimeSeriesStatsReport(scc)
+            report.run(devices=[serial], port=usage.top_ports(50),
+                       timefilter='last 1 day')
+            report.result          # 50 ports x timestamps x columns
+
+        :param n: int, maximum number of ports returned
+        :param column: string, value ranking the ports, defaults to the
+            sum of all values
+        """
+        result = self.result
+        if result is None or not len(result):
+            return []
+        if column is None:
+            totals = numpy.nansum(result.values, axis=1)
+        else:
+            totals = numpy.nan_to_num(result.column(column))
+        order = numpy.argsort(-totals, kind='stable')
+        return result.keys[order[:n]].tolist()
 
 
 class BWTimeSeriesStatsReport(BaseStatsReport):
@@ -182,8 +1083,11 @@ class BWTimeSeriesStatsReport(BaseStatsReport):
     resource = 'bw_timeseries'
     link = 'report'
     data_key = 'response_data'
+    columns = {'optimized': ['wan_in', 'wan_out', 'lan_in', 'lan_out'],
+               'passthrough': ['bytes_in', 'bytes_out']}
     required_fields = ['start_time', 'end_time']
     non_required_fields = ['traffic_type', 'port', 'devices']
+    federation_merge = 'sum'
 
 
 class BWPerApplStatsReport(BaseStatsReport):
@@ -191,6 +1095,10 @@ class BWPerApplStatsReport(BaseStatsReport):
     resource = 'bw_per_appliance'
     link = 'report'
     data_key = 'response_data'
+    columns = {'optimized': ['wan_in', 'wan_out', 'lan_in', 'lan_out'],
+               'passthrough': ['bytes_in', 'bytes_out']}
+    key_field = 'device'
+    devices_merge = 'concat'
     required_fields = ['devices', 'start_time', 'end_time']
     non_required_fields = ['traffic_type']
 
@@ -204,6 +1112,7 @@ class ThroughputStatsReport(BaseStatsReport):
     resource = 'throughput'
     link = 'report'
     data_key = 'response_data'
+    columns = ['wan_in', 'wan_out', 'lan_in', 'lan_out']
     required_fields = ['device', 'start_time', 'end_time']
     non_required_fields = ['traffic_type', 'port']
 
@@ -213,6 +1122,9 @@ class ThroughputPerApplStatsReport(BaseStatsReport):
     resource = 'throughput_per_appliance'
     link = 'report'
     data_key = 'response_data'
+    columns = ['wan_in', 'wan_out', 'lan_in', 'lan_out']
+    key_field = 'device'
+    devices_merge = 'concat'
     required_fields = ['devices', 'start_time', 'end_time']
     non_required_fields = ['traffic_type']
 
@@ -226,6 +1138,10 @@ class ConnectionHistoryStatsReport(BaseStatsReport):
     resource = 'connection_history'
     link = 'report'
     data_key = 'response_data'
+    columns = ['optimized_connections', 'passthrough_connections',
+               'active_connections', 'forwarded_connections',
+               'half_open_connections', 'half_closed_connections',
+               'flowing_connections']
     required_fields = ['device', 'start_time', 'end_time']
     non_required_fields = ['traffic_type']
 
@@ -235,6 +1151,7 @@ class SRDFStatsReport(BaseStatsReport):
     resource = 'srdf'
     link = 'report'
     data_key = 'response_data'
+    columns = ['lan_bytes', 'wan_bytes']
     required_fields = ['device', 'start_time', 'end_time']
     non_required_fields = ['traffic_type']
 
@@ -244,6 +1161,10 @@ class TCPMemoryPressureReport(BaseStatsReport):
     resource = 'tcp_memory_pressure'
     link = 'report'
     data_key = 'response_data'
+    columns = {'regular': ['num_of_pages_used',
+                           'pct_time_spent_under_pressure'],
+               'peak': ['enable_threshold', 'cutoff_threshold',
+                        'max_threshold']}
     required_fields = ['device', 'start_time', 'end_time']
     non_required_fields = ['traffic_type']
 
@@ -262,6 +1183,7 @@ class ConnectionPoolingStatsReport(MultiDevStatsReport):
     resource = 'connection_pooling'
     link = 'report'
     data_key = 'response_data'
+    columns = ['total_connection_requests', 'reused_connections']
 
 
 class ConnectionForwardingStatsReport(MultiDevStatsReport):
@@ -269,6 +1191,8 @@ class ConnectionForwardingStatsReport(MultiDevStatsReport):
     resource = 'connection_forwarding'
     link = 'report'
     data_key = 'response_data'
+    columns = ['packets_sent', 'bytes_sent']
+    federation_merge = 'sum'
 
 
 class DNSUsageStatsReport(MultiDevStatsReport):
@@ -276,6 +1200,7 @@ class DNSUsageStatsReport(MultiDevStatsReport):
     resource = 'dns_usage'
     link = 'report'
     data_key = 'response_data'
+    columns = ['num_of_entries_in_cache', 'bytes_of_used_memory_in_cache']
 
 
 class DNSCacheHitsStatsReport(MultiDevStatsReport):
@@ -283,6 +1208,8 @@ class DNSCacheHitsStatsReport(MultiDevStatsReport):
     resource = 'dns_cache_hits'
     link = 'report'
     data_key = 'response_data'
+    columns = ['success', 'referral', 'nxrrset', 'nxdomain', 'recursion',
+               'failure', 'miss']
 
 
 class HTTPStatsReport(MultiDevStatsReport):
@@ -290,6 +1217,8 @@ class HTTPStatsReport(MultiDevStatsReport):
     resource = 'http'
     link = 'report'
     data_key = 'response_data'
+    columns = ['parse_and_prefetch_hits', 'misses', 'metadata_cache_hits',
+               'url_learning_hits']
 
 
 class NFSStatsReport(MultiDevStatsReport):
@@ -297,6 +1226,8 @@ class NFSStatsReport(MultiDevStatsReport):
     resource = 'nfs'
     link = 'report'
     data_key = 'response_data'
+    columns = ['local_responses', 'delayed_responses', 'remote_responses',
+               'total_calls']
 
 
 class SSLStatsReport(MultiDevStatsReport):
@@ -304,6 +1235,8 @@ class SSLStatsReport(MultiDevStatsReport):
     resource = 'ssl'
     link = 'report'
     data_key = 'response_data'
+    columns = ['total_session_requests', 'established_sessions',
+               'blacklist_table_overflows']
 
 
 class DiskLoadStatsReport(MultiDevStatsReport):
@@ -311,6 +1244,7 @@ class DiskLoadStatsReport(MultiDevStatsReport):
     resource = 'disk_load'
     link = 'report'
     data_key = 'response_data'
+    columns = ['load']
 
 #
 # Single Device Reports
@@ -327,6 +1261,10 @@ class SDRAdaptiveStatsReport(SingleDevStatsReport):
     resource = 'sdr_adaptive'
     link = 'report'
     data_key = 'response_data'
+    columns = ['disk_pressure_only_compression',
+               'in_path_rule_only_compression',
+               'disk_pressure_only_in_mem_sdr',
+               'in_path_rule_only_in_mem_sdr']
 
 
 class MemoryPagingStatsReport(SingleDevStatsReport):
@@ -334,6 +1272,7 @@ class MemoryPagingStatsReport(SingleDevStatsReport):
     resource = 'memory_paging'
     link = 'report'
     data_key = 'response_data'
+    columns = ['num_of_pages_swapped_out']
 
 
 class CpuUtilizationStatsReport(SingleDevStatsReport):
@@ -341,6 +1280,7 @@ class CpuUtilizationStatsReport(SingleDevStatsReport):
     resource = 'cpu_utilization'
     link = 'report'
     data_key = 'response_data'
+    columns = ['cpu_utilization_percentage']
 
 
 class PFSStatsReport(SingleDevStatsReport):
@@ -348,6 +1288,7 @@ class PFSStatsReport(SingleDevStatsReport):
     resource = 'pfs'
     link = 'report'
     data_key = 'response_data'
+    columns = ['share_size', 'bytes_received', 'bytes_sent']
 
 
 #
@@ -360,8 +1301,11 @@ class QoSStatsReport(BaseStatsReport):
     resource = 'qos'
     link = 'report'
     data_key = 'response_data'
+    columns = ['packets_sent', 'packets_dropped', 'bits_sent', 'bits_dropped']
     required_fields = ['device', 'start_time', 'end_time']
     non_required_fields = ['qos_class_id', 'traffic_type']
+    subclass_field = 'qos_class_id'
+    default_subclass_id = 3
 
 #
 # Snapmirror Reports
@@ -373,8 +1317,10 @@ class SnapMirrorStatsReport(BaseStatsReport):
     resource = 'snapmirror'
     link = 'report'
     data_key = 'response_data'
+    columns = ['lan_bytes', 'wan_bytes']
     required_fields = ['device', 'start_time', 'end_time']
     non_required_fields = ['filer_id', 'traffic_type']
+    subclass_field = 'filer_id'
 
 
 #
@@ -387,8 +1333,10 @@ class SteelFusionLUNIOReport(BaseStatsReport):
     resource = 'granite_lun_io'
     link = 'report'
     data_key = 'response_data'
+    columns = ['num_of_reads', 'num_of_writes']
     required_fields = ['device', 'start_time', 'end_time']
     non_required_fields = ['traffic_type', 'lun_subclass_id']
+    subclass_field = 'lun_subclass_id'
 
 
 class SteelFusionInitiatorIOReport(BaseStatsReport):
@@ -396,8 +1344,10 @@ class SteelFusionInitiatorIOReport(BaseStatsReport):
     resource = 'granite_initiator_io'
     link = 'report'
     data_key = 'response_data'
+    columns = ['num_of_reads', 'num_of_writes']
     required_fields = ['device', 'start_time', 'end_time']
     non_required_fields = ['traffic_type', 'initiator_subclass_id']
+    subclass_field = 'initiator_subclass_id'
 
 
 class SteelFusionNetworkIOReport(BaseStatsReport):
@@ -405,6 +1355,8 @@ class SteelFusionNetworkIOReport(BaseStatsReport):
     resource = 'granite_network_io'
     link = 'report'
     data_key = 'response_data'
+    columns = {'throughput': ['num_of_reads', 'num_of_writes'],
+               'prefetch': ['num_of_bytes_read']}
     required_fields = ['start_time', 'end_time', 'device']
     non_required_fields = ['traffic_type']
 
@@ -414,8 +1366,14 @@ class SteelFusionBlockstoreReport(BaseStatsReport):
     resource = 'granite_blockstore'
     link = 'report'
     data_key = 'response_data'
+    columns = {'commit_throughput': ['num_of_writes', 'num_of_commits'],
+               'hit_miss': ['num_of_hits', 'num_of_misses'],
+               'uncmtd_first_classid': ['num_of_writes', 'num_of_commits'],
+               'uncmtd_last_classid': ['num_of_writes', 'num_of_commits'],
+               'commit_delay': ['sec_of_delay']}
     required_fields = ['device', 'start_time', 'end_time']
     non_required_fields = ['traffic_type', 'lun_subclass_id']
+    subclass_field = 'lun_subclass_id'
 
 
 #
@@ -0,0 +1,345 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Columnar representation of ``cmc.stats`` response data.
+
+Stats responses are lists of ``{key, data: [v1, v2, ...]}`` records, where
+key is a timestamp for time series, a port for bandwidth usage, or a
+device for per appliance reports. :py:class:`ColumnarResult` holds the same
+data as a key array and a 2-D float64 value matrix with named columns:
+
+.. code-block:: python
+
+    report = ThroughputStatsReport(scc)
+    report.run(device=serial, timefilter='last 1 day')
+    result = report.result
+    result.timestamps          # int64 array of epoch seconds
+    result['wan_in']           # float64 array
+    df = result.to_pandas()
+
+Time series fetched for several values of one criteria, such as the
+classes of a QoS report, are held by :py:class:`SeriesMatrix` as a labels
+x timestamps x columns array aligned on timestamp.
+"""
+
+import itertools
+
+import numpy
+
+__all__ = ['ColumnarResult', 'SeriesMatrix']
+
+# Column names used when a resource does not name its values
+GENERIC_COLUMN = 'value_%d'
+
+
+class ColumnarResult(object):
+    """Stats data as a key array and a 2-D value matrix.
+
+    :param key_field: string, name of the record key, e.g. 'timestamp'
+    :param keys: 1-D array of record keys
+    :param values: 2-D float64 array, one row per key and one column
+        per name in columns
+    :param columns: list of value column names
+    :param granularity: int, seconds between successive time series
+        points if known
+    """
+
+    def __init__(self, key_field, keys, values, columns, granularity=None):
+        values = numpy.asarray(values, dtype=numpy.float64)
+        if values.ndim != 2 or values.shape[1] != len(columns):
+            raise ValueError("values must be a 2-D array with %d columns"
+                             % len(columns))
+        if len(keys) != values.shape[0]:
+            raise ValueError("got %d keys for %d rows of values"
+                             % (len(keys), values.shape[0]))
+
+        self.key_field = key_field
+        self.keys = keys
+        self.values = values
+        self.columns = list(columns)
+        self.granularity = granularity
+
+    @classmethod
+    def from_records(cls, records, key_field, columns=None,
+                     granularity=None):
+        """Build a ColumnarResult from a list of response records.
+
+        :param records: list of {key_field: key, 'data': [...]} dicts
+        :param key_field: string, name of the key of each record
+        :param columns: list of names for the data values, generic names
+            are used if None or if it does not match the data width
+        """
+        records = records or []
+        n = len(records)
+
+        if key_field == 'timestamp' or key_field == 'port':
+            keys = numpy.fromiter((r[key_field] for r in records),
+                                  dtype=numpy.int64, count=n)
+        else:
+            keys = numpy.array([r[key_field] for r in records],
+                               dtype=object)
+
+        rows = [r['data'] for r in records]
+        lengths = numpy.fromiter(map(len, rows), dtype=numpy.int64, count=n)
+        width = int(lengths.max()) if n else len(columns or [])
+        if n == 0 or lengths.min() == width:
+            values = numpy.fromiter(
+                itertools.chain.from_iterable(rows), dtype=numpy.float64,
+                count=n * width).reshape(n, width)
+        else:
+            # Pad short records with NaN
+            values = numpy.full((n, width), numpy.nan)
+            for i, row in enumerate(rows):
+                values[i, :len(row)] = row
+
+        if not columns or len(columns) != width:
+            columns = [GENERIC_COLUMN % i for i in range(width)]
+
+        return cls(key_field, keys, values, columns, granularity=granularity)
+
+    @classmethod
+    def join(cls, results, separator='.'):
+        """Join results side by side, aligned on their keys.
+
+        Keys missing from some of the results have NaN values in their
+        columns.
+
+        :param results: list of (label, ColumnarResult) pairs, or dict of
+            results by label, all with the same key_field
+        :param separator: string, joining each label to the names of its
+            columns, e.g. 'peak.wan_in'
+        """
+        items = list(results.items() if isinstance(results, dict)
+                     else results)
+        if not items:
+            raise ValueError("No results to join")
+        key_field = items[0][1].key_field
+        for label, result in items:
+            if result.key_field != key_field:
+                raise ValueError("%s result of %s can not be joined to %s "
+                                 "results" % (result.key_field, label,
+                                              key_field))
+
+        all_keys = numpy.concatenate([r.keys for _, r in items])
+        keys, inverse = numpy.unique(all_keys, return_inverse=True)
+
+        width = sum(len(r.columns) for _, r in items)
+        values = numpy.full((len(keys), width), numpy.nan)
+        columns = []
+        row = col = 0
+        for label, result in items:
+            rows = inverse[row:row + len(result)]
+            values[rows, col:col + len(result.columns)] = result.values
+            columns.extend('%s%s%s' % (label, separator, name)
+                           for name in result.columns)
+            row += len(result)
+            col += len(result.columns)
+
+        granularity = next((r.granularity for _, r in items
+                            if r.granularity), None)
+        return cls(key_field, keys, values, columns, granularity=granularity)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __repr__(self):
+        return '<ColumnarResult %d x %s>' % (len(self), self.columns)
+
+    def __getitem__(self, name):
+        return self.column(name)
+
+    @property
+    def timestamps(self):
+        """int64 array of epoch seconds, for time series data."""
+        if self.key_field != 'timestamp':
+            raise AttributeError("%s keyed data has no timestamps"
+                                 % self.key_field)
+        return self.keys
+
+    def column(self, name):
+        """Return the float64 values of the named column."""
+        try:
+            return self.values[:, self.columns.index(name)]
+        except ValueError:
+            raise KeyError("No column '%s', columns are %s"
+                           % (name, self.columns))
+
+    def to_records(self):
+        """Convert back to the list of dicts form of response data."""
+        keys = self.keys.tolist()
+        return [{self.key_field: k, 'data': v}
+                for k, v in zip(keys, self.values.tolist())]
+
+    def to_pandas(self):
+        """Return a pandas DataFrame with one column per value column.
+
+        Timestamps are converted to a timezone aware datetime64 column.
+        """
+        import pandas
+
+        data = {}
+        if self.key_field == 'timestamp':
+            data['timestamp'] = pandas.to_datetime(self.keys, unit='s',
+                                                   utc=True)
+        else:
+            data[self.key_field] = self.keys
+        for i, name in enumerate(self.columns):
+            data[name] = self.values[:, i]
+        return pandas.DataFrame(data, columns=[self.key_field] +
+                                self.columns)
+
+    def to_arrow(self):
+        """Return a pyarrow Table with one column per value column."""
+        import pyarrow
+
+        if self.key_field == 'timestamp':
+            keys = pyarrow.array(self.keys,
+                                 type=pyarrow.timestamp('s', tz='UTC'))
+        else:
+            keys = pyarrow.array(self.keys.tolist())
+
+        arrays = [keys] + [pyarrow.array(self.values[:, i])
+                           for i in range(len(self.columns))]
+        return pyarrow.Table.from_arrays(arrays,
+                                         names=[self.key_field] +
+                                         self.columns)
+
+
+class SeriesMatrix(object):
+    """Time series of several labels as a 3-D value array.
+
+    Series are aligned on the union of their timestamps, points a series
+    does not have are NaN.
+
+    :param dimension: string, name of the labels, e.g. 'qos_class_id'
+    :param labels: list of labels, one per series
+    :param timestamps: int64 array of epoch seconds
+    :param columns: list of value column names
+    :param values: float64 array of labels x timestamps x columns
+    :param granularity: int, seconds between successive points if known
+    """
+
+    def __init__(self, dimension, labels, timestamps, columns, values,
+                 granularity=None):
+        self.dimension = dimension
+        self.labels = list(labels)
+        self.timestamps = numpy.asarray(timestamps, dtype=numpy.int64)
+        self.columns = list(columns)
+        self.granularity = granularity
+
+        values = numpy.asarray(values, dtype=numpy.float64)
+        shape = (len(self.labels), len(self.timestamps), len(self.columns))
+        if values.shape != shape:
+            raise ValueError("values of shape %s do not match %s"
+                             % (values.shape, shape))
+        self.values = values
+        self.label_index = dict((l, i) for i, l in enumerate(self.labels))
+        self.time_index = dict((t, i) for i, t in
+                               enumerate(self.timestamps.tolist()))
+
+    @classmethod
+    def from_results(cls, dimension, results, columns=None,
+                     granularity=None):
+        """Align time series results into a SeriesMatrix.
+
+        :param dimension: string, name of the labels
+        :param results: list of (label, result) pairs, or dict of results
+            by label. Results are ColumnarResult objects keyed by
+            timestamp or lists of {timestamp, data} records.
+        :param columns: list of value column names, defaults to the
+            columns of the results
+        """
+        items = list(results.items() if isinstance(results, dict)
+                     else results)
+        series = []
+        for label, result in items:
+            if not isinstance(result, ColumnarResult):
+                result = ColumnarResult.from_records(result, 'timestamp',
+                                                     columns)
+            series.append(result)
+
+        width = max([r.values.shape[1] for r in series] or
+                    [len(columns or [])])
+        if columns is None or len(columns) != width:
+            columns = next((r.columns for r in series
+                            if r.values.shape[1] == width),
+                           [GENERIC_COLUMN % i for i in range(width)])
+        if granularity is None:
+            granularity = next((r.granularity for r in series
+                                if r.granularity), None)
+
+        keys = numpy.concatenate([r.keys for r in series] or
+                                 [numpy.zeros(0, dtype=numpy.int64)])
+        timestamps, time_ids = numpy.unique(keys, return_inverse=True)
+        label_ids = numpy.repeat(numpy.arange(len(series)),
+                                 [len(r) for r in series])
+
+        values = numpy.full((len(series), len(timestamps), width),
+                            numpy.nan)
+        flat = numpy.full((len(keys), width), numpy.nan)
+        offset = 0
+        for r in series:
+            flat[offset:offset + len(r), :r.values.shape[1]] = r.values
+            offset += len(r)
+        values[label_ids, time_ids] = flat
+
+        return cls(dimension, [label for label, _ in items], timestamps,
+                   columns, values, granularity=granularity)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __repr__(self):
+        return '<SeriesMatrix %d %s x %d timestamps x %s>' % (
+            len(self.labels), self.dimension, len(self.timestamps),
+            self.columns)
+
+    def __getitem__(self, name):
+        return self.column(name)
+
+    def column(self, name):
+        """Return the labels x timestamps array of a value column."""
+        try:
+            return self.values[:, :, self.columns.index(name)]
+        except ValueError:
+            raise KeyError("No column '%s', columns are %s"
+                           % (name, self.columns))
+
+    def series(self, label):
+        """Return the ColumnarResult of one label, on the shared
+        timestamps."""
+        try:
+            index = self.label_index[label]
+        except KeyError:
+            raise KeyError("No %s %s, %s are %s" % (
+                self.dimension, label, self.dimension, self.labels))
+        return ColumnarResult('timestamp', self.timestamps,
+                              self.values[index], self.columns,
+                              granularity=self.granularity)
+
+    def at(self, timestamp):
+        """Return the labels x columns array of one timestamp."""
+        try:
+            return self.values[:, self.time_index[timestamp]]
+        except KeyError:
+            raise KeyError("No point at %s" % timestamp)
+
+    def to_pandas(self):
+        """Return a DataFrame with one row per label and timestamp, and
+        one column per value column."""
+        import pandas
+
+        n_labels, n_times = len(self.labels), len(self.timestamps)
+        times = pandas.to_datetime(self.timestamps, unit='s', utc=True)
+        data = {self.dimension: numpy.repeat(
+                    numpy.array(self.labels, dtype=object), n_times),
+                'timestamp': numpy.tile(times, n_labels)}
+        flat = self.values.reshape(n_labels * n_times, len(self.columns))
+        for i, name in enumerate(self.columns):
+            data[name] = flat[:, i]
+        return pandas.DataFrame(data, columns=[self.dimension, 'timestamp'] +
+                                self.columns)
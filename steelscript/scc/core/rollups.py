@@ -0,0 +1,246 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Client side aggregation of time series fetched for many devices.
+
+The SCC computes peak and p95 values for one device, or for the sum of a
+list of devices, per request. :py:func:`rollup` computes them locally from
+series already fetched, such as the 5 minute throughput of every appliance,
+for any grouping of devices and any window, in a few vectorized passes:
+
+.. code-block:: python
+
+    results = {}
+    for serial in serials:
+        report = ThroughputStatsReport(scc)
+        report.run(device=serial, timefilter='last 1 week')
+        results[serial] = report.result
+
+    # daily peak and p95 of the traffic of each site
+    daily = rollup(results, window=86400, group_by=site_of_serial)
+    daily['p95']                      # array of groups x windows x columns
+    daily.column('peak', 'wan_out')   # array of groups x windows
+    daily.to_pandas()
+
+Series of the same group are summed per timestamp before the statistics
+are computed, so the p95 of a group is the p95 of its total traffic.
+Missing points are ignored rather than counted as zero.
+"""
+
+import logging
+import warnings
+
+import numpy
+
+from steelscript.scc.core.report import granularities
+
+__all__ = ['Rollup', 'rollup']
+
+logger = logging.getLogger(__name__)
+
+# Statistics computed by default
+STATS = ['peak', 'p95', 'mean', 'sum']
+
+
+def _valid_stat(name):
+    return (name in ('peak', 'mean', 'sum', 'min') or
+            (name.startswith('p') and name[1:].isdigit() and
+             int(name[1:]) <= 100))
+
+
+def _nanpercentile(values, q, axis):
+    """Linearly interpolated percentile ignoring NaN, as
+    numpy.nanpercentile, without its slow path for small slices."""
+    ordered = numpy.sort(values, axis=axis)     # NaN sorted last
+    valid = (~numpy.isnan(values)).sum(axis=axis, keepdims=True)
+    rank = (valid - 1).clip(min=0) * (q / 100.0)
+    lower = numpy.floor(rank).astype(numpy.intp)
+    upper = numpy.ceil(rank).astype(numpy.intp)
+    low = numpy.take_along_axis(ordered, lower, axis=axis)
+    high = numpy.take_along_axis(ordered, upper, axis=axis)
+    result = low + (high - low) * (rank - lower)
+    result[valid == 0] = numpy.nan
+    return result.squeeze(axis)
+
+
+def _stat(name, values, axis):
+    """Compute a named statistic ignoring NaN along axis."""
+    if name == 'peak':
+        return numpy.nanmax(values, axis=axis)
+    elif name == 'mean':
+        return numpy.nanmean(values, axis=axis)
+    elif name == 'sum':
+        total = numpy.nansum(values, axis=axis)
+        # nansum returns 0 for windows without any point
+        total[numpy.isnan(values).all(axis=axis)] = numpy.nan
+        return total
+    elif name == 'min':
+        return numpy.nanmin(values, axis=axis)
+    return _nanpercentile(values, int(name[1:]), axis=axis)
+
+
+class Rollup(object):
+    """Statistics of grouped series per time window.
+
+    :param groups: list of group labels
+    :param windows: int64 array of the start of each window, epoch seconds
+    :param columns: list of value column names
+    :param stats: dict of groups x windows x columns arrays by statistic
+    :param window: int, seconds per window
+    """
+
+    def __init__(self, groups, windows, columns, stats, window):
+        self.groups = groups
+        self.windows = windows
+        self.columns = columns
+        self.stats = stats
+        self.window = window
+
+    def __repr__(self):
+        return '<Rollup %d groups x %d windows x %s>' % (
+            len(self.groups), len(self.windows), self.columns)
+
+    def __getitem__(self, stat):
+        return self.stats[stat]
+
+    def column(self, stat, name):
+        """Return the groups x windows array of one statistic and column.
+        """
+        try:
+            return self.stats[stat][:, :, self.columns.index(name)]
+        except ValueError:
+            raise KeyError("No column '%s', columns are %s"
+                           % (name, self.columns))
+
+    def to_pandas(self):
+        """Return a DataFrame with one row per group and window, and one
+        column per statistic and value column, e.g. 'p95_wan_in'."""
+        import pandas
+
+        n_groups, n_windows = len(self.groups), len(self.windows)
+        data = {'group': numpy.repeat(numpy.array(self.groups, dtype=object),
+                                      n_windows),
+                'timestamp': pandas.to_datetime(
+                    numpy.tile(self.windows, n_groups), unit='s', utc=True)}
+        names = ['group', 'timestamp']
+        for stat, values in self.stats.items():
+            for i, column in enumerate(self.columns):
+                name = '%s_%s' % (stat, column)
+                data[name] = values[:, :, i].reshape(-1)
+                names.append(name)
+        return pandas.DataFrame(data, columns=names)
+
+
+def rollup(results, window=3600, stats=None, group_by=None,
+           granularity=None):
+    """Compute statistics of series per group of series and time window.
+
+    :param results: dict of timestamp keyed ColumnarResult objects by
+        label, e.g. device serial, or list of (label, result) pairs.
+        All results must share the same columns.
+    :param window: int, seconds per window, a multiple of granularity, or
+        None for a single window covering all points
+    :param stats: list of statistics to compute among 'peak', 'mean',
+        'sum', 'min' and percentiles such as 'p95', defaults to STATS
+    :param group_by: None to keep each series apart, 'all' to combine all
+        series, or a dict or function mapping a label to its group
+    :param granularity: int, seconds between points, defaults to the
+        granularity of the results
+    :return: Rollup object
+    """
+    items = list(results.items() if isinstance(results, dict) else results)
+    if not items:
+        raise ValueError("No results to roll up")
+    stats = list(stats or STATS)
+    for stat in stats:
+        if not _valid_stat(stat):
+            raise ValueError("Unknown statistic '%s'" % stat)
+
+    labels = [label for label, _ in items]
+    columns = items[0][1].columns
+    for label, result in items:
+        if result.key_field != 'timestamp':
+            raise ValueError("%s result of %s is not a time series"
+                             % (result.key_field, label))
+        if result.columns != columns:
+            raise ValueError("Columns %s of %s differ from %s"
+                             % (result.columns, label, columns))
+
+    if granularity is None:
+        found = [r.granularity for _, r in items if r.granularity]
+        granularity = min(found) if found else min(granularities)
+
+    # Map each label to the index of its group
+    if group_by is None:
+        groups = labels
+        group_of = numpy.arange(len(labels))
+    else:
+        if group_by == 'all':
+            keys = ['all'] * len(labels)
+        elif callable(group_by):
+            keys = [group_by(label) for label in labels]
+        else:
+            keys = [group_by.get(label, label) for label in labels]
+        index = {}
+        for key in keys:
+            index.setdefault(key, len(index))
+        groups = list(index)
+        group_of = numpy.array([index[k] for k in keys])
+
+    timestamps = [r.keys for _, r in items if len(r)]
+    n_columns = len(columns)
+    if not timestamps:
+        return Rollup(groups, numpy.zeros(0, dtype=numpy.int64), columns,
+                      dict((s, numpy.zeros((len(groups), 0, n_columns)))
+                           for s in stats), window)
+
+    first = min(int(t.min()) for t in timestamps)
+    last = max(int(t.max()) for t in timestamps) + granularity
+    if window is None:
+        span = last - first
+        span += -span % granularity
+        start, end, step = first, first + span, span
+    else:
+        if window % granularity:
+            raise ValueError("window %s is not a multiple of the "
+                             "granularity %s" % (window, granularity))
+        start = first - first % window
+        end = last + (-last % window)
+        step = window
+    n_points = (end - start) // granularity
+
+    # Sum the series of each group on a regular grid, NaN where no
+    # series of the group has a point
+    totals = numpy.zeros((len(groups), n_points, n_columns))
+    counts = numpy.zeros((len(groups), n_points, n_columns))
+    for (label, result), group in zip(items, group_of):
+        if not len(result):
+            continue
+        index = (result.keys - start) // granularity
+        present = ~numpy.isnan(result.values)
+        values = numpy.where(present, result.values, 0)
+        if (numpy.diff(index) > 0).all():
+            totals[group, index] += values
+            counts[group, index] += present
+        else:
+            # Several points fall in the same slot of the grid
+            numpy.add.at(totals[group], index, values)
+            numpy.add.at(counts[group], index, present)
+    totals[counts == 0] = numpy.nan
+
+    # One row per window, each holding the points of the window
+    per_window = step // granularity
+    n_windows = n_points // per_window
+    values = totals.reshape(len(groups), n_windows, per_window, n_columns)
+
+    with warnings.catch_warnings():
+        # Windows without any point give NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        computed = dict((stat, _stat(stat, values, 2)) for stat in stats)
+
+    windows = start + step * numpy.arange(n_windows, dtype=numpy.int64)
+    return Rollup(groups, windows, columns, computed, step)
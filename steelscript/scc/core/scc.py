@@ -5,28 +5,151 @@
 # as set forth in the License.
 
 import os
+import sys
+import pickle
+import stat
+import hashlib
+import importlib.metadata
 import logging
+import tempfile
+import threading
 
+from requests.adapters import HTTPAdapter
 from sleepwalker.service import ServiceManager
 from sleepwalker.connection import ConnectionManager
 from steelscript.common.datastructures import Singleton
 from steelscript.common.service import Service
+from steelscript.common.connection import Connection
+from steelscript.scc.core.bootstrap import BootstrapCache
+from steelscript.scc.core.singleflight import SingleFlight
+from steelscript.scc.core.inventory import ApplianceInventory
+from steelscript.scc.core.limiter import host_limiter
 
 
 import reschema.servicedef as ServiceDef
 import sleepwalker
 
+__all__ = ['SCC', 'SCCException', 'SCCServerConnectionHook',
+           'SCCServiceManager', 'SCCConnectionPool', 'ServiceDefLoader']
+
 logger = logging.getLogger(__name__)
 
 SERVICE_ID = 'https://support.riverbed.com/apis/{0}/{1}'
 
+# File persisting bootstrapped sessions across runs, kept in memory only
+# unless the environment variable is set
+BOOTSTRAP_CACHE_PATH = os.environ.get('STEELSCRIPT_SCC_BOOTSTRAP_CACHE')
+
+# Default number of keep-alive HTTP connections kept open to an SCC
+DEFAULT_POOL_SIZE = 10
+
+# Serializes connection establishment, ConnectionManager is not thread-safe
+_connect_lock = threading.Lock()
+
+# Directory of compiled service definitions, not cached unless the
+# environment variable is set
+SERVICEDEF_CACHE_DIR = os.environ.get('STEELSCRIPT_SCC_SERVICEDEF_CACHE')
+
 
 class SCCException(Exception):
     pass
 
 
+def _is_private(st, mask):
+    """Return True if st, an os.stat result, belongs to the current user
+    and has none of the permission bits of mask."""
+    if hasattr(os, 'getuid') and st.st_uid != os.getuid():
+        return False
+    return not st.st_mode & mask
+
+
 class ServiceDefLoader(ServiceDef.ServiceDefLoadHook):
-    """This class serves as the custom hook for service manager."""
+    """This class serves as the custom hook for service manager.
+
+    Parsed service definitions are pickled into cache_dir, keyed by the
+    hash of the definition file, so later processes skip the YAML parse.
+    As loading a pickle can run arbitrary code, cached files are only used
+    when they and cache_dir belong to the current user and no one else
+    can write to them.
+
+    Like the bootstrap cache, the cache is opt-in: definitions are parsed
+    on every load unless cache_dir is given or the
+    ``STEELSCRIPT_SCC_SERVICEDEF_CACHE`` environment variable names a
+    directory. A cache_dir that can not be created or written to is
+    logged and the definitions are parsed as without a cache.
+    """
+
+    def __init__(self, cache_dir=None):
+        """Create a ServiceDefLoader object
+
+        :param cache_dir: directory of compiled service definitions,
+            defaults to SERVICEDEF_CACHE_DIR, no caching if None or empty
+        """
+        self.cache_dir = (SERVICEDEF_CACHE_DIR if cache_dir is None
+                          else cache_dir)
+
+    def _cache_file(self, filename, content):
+        # Pickles depend on the reschema classes, so its version is part
+        # of the key along with the definition content
+        try:
+            version = importlib.metadata.version('reschema')
+        except importlib.metadata.PackageNotFoundError:
+            version = ''
+        digest = hashlib.sha256(content + version.encode()).hexdigest()[:16]
+        name = '%s-%s-py%d%d.pickle' % (os.path.basename(filename), digest,
+                                        sys.version_info[0],
+                                        sys.version_info[1])
+        return os.path.join(self.cache_dir, name)
+
+    def load(self, filename):
+        """Return the ServiceDef of a file, from the cache if possible."""
+        if not self.cache_dir:
+            return ServiceDef.ServiceDef.create_from_file(filename)
+
+        with open(filename, 'rb') as f:
+            content = f.read()
+        cache_file = self._cache_file(filename, content)
+
+        try:
+            with open(cache_file, 'rb') as f:
+                if (_is_private(os.stat(self.cache_dir),
+                                stat.S_IWGRP | stat.S_IWOTH) and
+                        _is_private(os.fstat(f.fileno()),
+                                    stat.S_IRWXG | stat.S_IRWXO)):
+                    return pickle.load(f)
+                logger.warning("Ignoring servicedef cache %s, it and its "
+                               "directory must be private to their owner"
+                               % cache_file)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logger.warning("Ignoring unreadable servicedef cache %s"
+                           % cache_file, exc_info=True)
+
+        servicedef = ServiceDef.ServiceDef.create_from_file(filename)
+
+        # Write to a temporary file first so concurrent processes never
+        # read a partial pickle
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            if not _is_private(os.stat(self.cache_dir),
+                               stat.S_IWGRP | stat.S_IWOTH):
+                logger.warning("Not caching servicedefs in %s, writable "
+                               "by other users" % self.cache_dir)
+                return servicedef
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(servicedef, f, pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, cache_file)
+            except Exception:
+                os.unlink(tmp)
+                raise
+        except Exception:
+            logger.warning("Unable to write servicedef cache %s"
+                           % cache_file, exc_info=True)
+
+        return servicedef
 
     def find_by_id(self, id_):
         """
@@ -43,7 +166,7 @@ class ServiceDefLoader(ServiceDef.ServiceDefLoadHook):
                                 'servicedef/{0}.yml'.format(service))
 
         if os.path.isfile(filename):
-            return ServiceDef.ServiceDef.create_from_file(filename)
+            return self.load(filename)
         else:
             raise ValueError("Invalid id_: %s" % id_)
 
@@ -62,9 +185,16 @@ class ServiceDefLoader(ServiceDef.ServiceDefLoadHook):
 
 
 class SCCServerConnectionHook(sleepwalker.connection.ConnectionHook):
+    """Connect to an SCC, reusing bootstrapped sessions when possible.
 
-    def connect(self, host, auth):
-        """Create a connection to the server"""
+    The software version check and the OAuth token exchange are skipped
+    for hosts found in bootstrap_cache, set it to None to disable caching.
+    """
+
+    bootstrap_cache = BootstrapCache(path=BOOTSTRAP_CACHE_PATH)
+
+    def _bootstrap(self, host, auth):
+        """Connect, authenticate and check the software version."""
         svc = Service("scc", host=host, auth=auth)
 
         # check software version, needs to be equal or bigger than 9.0
@@ -76,8 +206,38 @@ class SCCServerConnectionHook(sleepwalker.connection.ConnectionHook):
                    "but you are running %s." % sw_version)
             raise SCCException(msg)
 
+        if self.bootstrap_cache is not None:
+            self.bootstrap_cache.put(
+                host, auth, sw_version,
+                svc.conn.conn.headers.get('Authorization'))
         return svc.conn
 
+    def _reauthenticate(self, host, auth, conn):
+        """Refresh the token of a connection built from the cache."""
+        logger.info("Cached session for %s rejected, bootstrapping again"
+                    % host)
+        self.bootstrap_cache.invalidate(host, auth)
+        fresh = self._bootstrap(host, auth)
+        conn.add_headers({'Authorization':
+                          fresh.conn.headers.get('Authorization')})
+
+    def connect(self, host, auth):
+        """Create a connection to the server"""
+        cache = self.bootstrap_cache
+        entry = cache.get(host, auth) if cache is not None else None
+        if entry is None:
+            return self._bootstrap(host, auth)
+
+        logger.debug("Reusing bootstrapped session for %s, SCC version %s"
+                     % (host, entry['sw_version']))
+        conn = Connection(
+            host, verify=False,
+            reauthenticate_handler=lambda: self._reauthenticate(host, auth,
+                                                                conn))
+        if entry['authorization']:
+            conn.add_headers({'Authorization': entry['authorization']})
+        return conn
+
 
 class SCCServiceManager(ServiceManager, metaclass=Singleton):
     """This class encapsulates the storage of SCC services
@@ -103,16 +263,160 @@ class SCCServiceManager(ServiceManager, metaclass=Singleton):
                               connection_manager=conn_manager)
 
 
+class SCCConnectionPool(object):
+    """Thread-safe access to the connection of one SCC object.
+
+    Services of an SCC look their connection up here rather than in the
+    process wide ConnectionManager, so the connection is established once
+    even when the first requests are sent from several threads. Its HTTP
+    session keeps up to pool_size keep-alive connections open, requests
+    beyond that are sent on short-lived connections.
+    """
+
+    def __init__(self, connection_manager, pool_size=DEFAULT_POOL_SIZE):
+        """Create a SCCConnectionPool object
+
+        :param connection_manager: ConnectionManager used to establish
+            the connection
+        :param pool_size: int, number of keep-alive connections kept open
+        """
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1, got %s"
+                             % pool_size)
+        self.connection_manager = connection_manager
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _mount(self, conn):
+        session = conn.conn
+        adapter = session.get_adapter(conn.hostname)
+        # Connections may be shared by SCC objects with the same host and
+        # auth, never shrink a pool sized by another one
+        if getattr(adapter, 'scc_pool_size', 0) >= self.pool_size:
+            return
+        adapter = HTTPAdapter(pool_maxsize=self.pool_size)
+        adapter.scc_pool_size = self.pool_size
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+    def find(self, host, auth):
+        """Return the connection to host, establishing it on first use.
+
+        Same signature as ConnectionManager.find, for use as the
+        connection_manager of sleepwalker services.
+        """
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    with _connect_lock:
+                        conn = self.connection_manager.find(host, auth)
+                    self._mount(conn)
+                    self._conn = conn
+        return self._conn
+
+
 class SCC(object):
     """This class is the main interface to interact with a SteelCentral
     Controller.
+
+    Services are exposed as attributes named after the keys of SERVICES,
+    e.g. ``scc.stats``. Each is resolved on first use, so a script only
+    loads the service definitions it actually needs.
+
+    An SCC object can be shared by threads, for example to run reports
+    concurrently. All its services use one connection, established once
+    and backed by a pool of pool_size keep-alive HTTP connections. When
+    given a ``limiter``, the requests of all its reports go through that
+    AdaptiveLimiter, including those run by a ReportBatch, ReportPoller,
+    FleetSweep or FederatedSCC using it. Without one, which is the
+    default, requests are not limited.
     """
 
-    def __init__(self, host, port=None, auth=None):
-        """Create an SCC object"""
-        svcmgr = SCCServiceManager()
-        self.stats = svcmgr.find_by_name(host=host, name='cmc.stats',
-                                         version='1.0', auth=auth)
-        self.appliance_inventory = svcmgr.find_by_name(
-            host=host, name='cmc.appliance_inventory', version='1.0',
-            auth=auth)
+    # Attribute name to service name of the services supported
+    SERVICES = {'stats': 'cmc.stats',
+                'appliance_inventory': 'cmc.appliance_inventory'}
+
+    def __init__(self, host, port=None, auth=None, cache=None,
+                 segment_store=None, services=None,
+                 pool_size=DEFAULT_POOL_SIZE, inventory_ttl=None,
+                 limiter=None):
+        """Create an SCC object
+
+        :param cache: optional ReportCache object shared by all reports
+            run against this SCC
+        :param segment_store: optional SegmentStore object holding closed
+            time series buckets for stats reports run against this SCC
+        :param services: optional list of the attribute names of the
+            services needed, e.g. ['appliance_inventory']. These are
+            resolved immediately and all others are unavailable. By
+            default every service is available and resolved on first use.
+        :param pool_size: int, number of keep-alive HTTP connections kept
+            open to the SCC, usually the number of threads using it
+        :param inventory_ttl: int, when set an ApplianceInventory
+            refreshed after this many seconds is kept as ``inventory``,
+            and stats reports accept appliance hostnames and addresses
+            in place of serials
+        :param limiter: optional AdaptiveLimiter object bounding the
+            requests sent at once, or True to use the one shared by the
+            SCC objects of host. Requests are sent without limit by
+            default.
+        """
+        self.host = host
+        self.port = port
+        self.auth = auth
+        self.cache = cache
+        self.segment_store = segment_store
+        self._services_lock = threading.Lock()
+        self.connections = SCCConnectionPool(
+            SCCServiceManager().connection_manager, pool_size=pool_size)
+        self.inflight = SingleFlight()
+        if limiter is True:
+            limiter = host_limiter(host)
+        self.limiter = limiter or None
+
+        if services is None:
+            self.services = list(self.SERVICES)
+        else:
+            unknown = [name for name in services if name not in self.SERVICES]
+            if unknown:
+                raise SCCException("Unknown services %s, valid services "
+                                   "are %s" % (unknown, list(self.SERVICES)))
+            self.services = list(services)
+            for name in self.services:
+                getattr(self, name)
+
+        self.inventory = None
+        if inventory_ttl is not None:
+            if 'appliance_inventory' not in self.services:
+                raise SCCException("inventory_ttl requires the "
+                                   "appliance_inventory service")
+            self.inventory = ApplianceInventory(self, ttl=inventory_ttl)
+
+    def __getattr__(self, name):
+        # Only called when the attribute is not set yet, i.e. the first
+        # time a service is used
+        if name not in self.SERVICES:
+            raise AttributeError("'%s' object has no attribute '%s'"
+                                 % (self.__class__.__name__, name))
+        if name not in self.services:
+            raise SCCException("Service '%s' was not requested when "
+                               "creating this SCC object, requested "
+                               "services are %s" % (name, self.services))
+
+        with self._services_lock:
+            if name not in self.__dict__:
+                logger.debug("Resolving service %s for %s"
+                             % (self.SERVICES[name], self.host))
+                svc = SCCServiceManager().find_by_name(
+                    host=self.host, name=self.SERVICES[name], version='1.0',
+                    auth=self.auth)
+                svc.connection_manager = self.connections
+                self.__dict__[name] = svc
+        return self.__dict__[name]
+
+    @property
+    def connection(self):
+        """The connection shared by all services, established on first use.
+        """
+        return self.connections.find(self.host, self.auth)
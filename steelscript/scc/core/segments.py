@@ -0,0 +1,284 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Persistent store of closed time series buckets.
+
+Historical 5 minute and hourly buckets returned by ``cmc.stats`` do not
+change once closed. A :py:class:`SegmentStore` keeps them in a SQLite file
+along with the time ranges already fetched for each series, so that a stats
+report only requests the ranges it does not hold yet:
+
+.. code-block:: python
+
+    store = SegmentStore('/var/tmp/scc_segments.sqlite')
+    report = ThroughputStatsReport(scc, segment_store=store)
+    report.run(device=serial, timefilter='last 4 weeks')   # full fetch
+    report.run(device=serial, timefilter='last 4 weeks')   # only new data
+
+A series is identified by the SCC host, the resource, every criteria
+field other than the time range, such as device, port and traffic_type,
+and the granularity of its buckets. The SCC picks the granularity of a
+response from the length and age of the range requested, so the same
+criteria may be held at both 300 and 3600 seconds. The store remembers
+the granularity the SCC answered for each length of range, and a report
+only uses the buckets held at the granularity expected for its range.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+__all__ = ['SegmentStore', 'series_key']
+
+logger = logging.getLogger(__name__)
+
+# Version of the schema, stores of older versions are emptied on open
+SCHEMA_VERSION = 2
+
+# Default location of the store
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.steelscript',
+                            'scc_segments.sqlite')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    host TEXT NOT NULL,
+    resource TEXT NOT NULL,
+    criteria TEXT NOT NULL,
+    granularity INTEGER NOT NULL,
+    UNIQUE (host, resource, criteria, granularity)
+);
+CREATE TABLE IF NOT EXISTS ranges (
+    series_id INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ranges_series ON ranges (series_id);
+CREATE TABLE IF NOT EXISTS spans (
+    host TEXT NOT NULL,
+    resource TEXT NOT NULL,
+    span INTEGER NOT NULL,
+    granularity INTEGER NOT NULL,
+    PRIMARY KEY (host, resource, span)
+);
+CREATE TABLE IF NOT EXISTS points (
+    series_id INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (series_id, timestamp)
+);
+"""
+
+
+def series_key(criteria):
+    """Return the string identifying the series of a request's criteria.
+
+    :param criteria: dict of criteria, start_time, end_time and timefilter
+        are ignored
+    """
+    key = dict((k, v) for k, v in criteria.items()
+               if k not in ('start_time', 'end_time', 'timefilter'))
+    if isinstance(key.get('devices'), list):
+        key['devices'] = sorted(key['devices'])
+    return json.dumps(key, sort_keys=True)
+
+
+class SegmentStore(object):
+    """SQLite backed store of time series buckets and fetched ranges.
+
+    Ranges are half-open, [start, end) holds every point with
+    ``start <= timestamp < end``.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, settle_time=600):
+        """Create a SegmentStore object
+
+        :param path: string, SQLite file to use, created if missing
+        :param settle_time: int, seconds after a bucket closes before it
+            is considered final, allowing for appliances reporting late
+        """
+        if path != ':memory:':
+            dirname = os.path.dirname(os.path.abspath(path))
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+
+        self.path = path
+        self.settle_time = settle_time
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+            if version < SCHEMA_VERSION:
+                # Earlier stores mixed granularities within a series,
+                # their buckets can not be trusted
+                self._conn.executescript(
+                    'DROP TABLE IF EXISTS series; '
+                    'DROP TABLE IF EXISTS ranges; '
+                    'DROP TABLE IF EXISTS points; '
+                    'DROP TABLE IF EXISTS spans;')
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute('PRAGMA user_version = %d' % SCHEMA_VERSION)
+
+    def close(self):
+        self._conn.close()
+
+    def series_id(self, host, resource, criteria, granularity):
+        """Return the id of the series matching criteria, creating it.
+
+        :param criteria: dict of criteria, start_time and end_time ignored
+        :param granularity: int, seconds per bucket of the series
+        """
+        key = series_key(criteria)
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR IGNORE INTO series '
+                '(host, resource, criteria, granularity) '
+                'VALUES (?, ?, ?, ?)', (host or '', resource, key,
+                                        granularity))
+            row = self._conn.execute(
+                'SELECT id FROM series WHERE host = ? AND resource = ? '
+                'AND criteria = ? AND granularity = ?',
+                (host or '', resource, key, granularity)).fetchone()
+        return row[0]
+
+    def series(self, host, resource, criteria):
+        """Return a dict of the ids of the series held for criteria, by
+        granularity."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT granularity, id FROM series WHERE host = ? '
+                'AND resource = ? AND criteria = ?',
+                (host or '', resource, series_key(criteria))).fetchall()
+        return dict(rows)
+
+    def granularity(self, series_id):
+        """Return the granularity of the series, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT granularity FROM series WHERE id = ?',
+                (series_id,)).fetchone()
+        return row[0] if row else None
+
+    def span_granularity(self, host, resource, span):
+        """Return the granularity the SCC last answered for a range of
+        span seconds of the resource, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT granularity FROM spans WHERE host = ? AND '
+                'resource = ? AND span = ?',
+                (host or '', resource, span)).fetchone()
+        return row[0] if row else None
+
+    def set_span_granularity(self, host, resource, span, granularity):
+        """Record the granularity the SCC answered for a range of span
+        seconds of the resource."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO spans '
+                '(host, resource, span, granularity) VALUES (?, ?, ?, ?)',
+                (host or '', resource, span, granularity))
+
+    def shortest_span(self, host, resource, granularity, minimum=0):
+        """Return the shortest span of at least minimum seconds the SCC
+        answered at granularity for the resource, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT MIN(span) FROM spans WHERE host = ? AND '
+                'resource = ? AND granularity = ? AND span >= ?',
+                (host or '', resource, granularity, minimum)).fetchone()
+        return row[0] if row else None
+
+    def _ranges(self, series_id):
+        return self._conn.execute(
+            'SELECT start, end FROM ranges WHERE series_id = ? '
+            'ORDER BY start', (series_id,)).fetchall()
+
+    def missing(self, series_id, start, end):
+        """Return the list of (start, end) ranges not held for the series.
+        """
+        with self._lock:
+            ranges = self._ranges(series_id)
+
+        gaps = []
+        lo = start
+        for r_start, r_end in ranges:
+            if r_end <= lo:
+                continue
+            if r_start >= end:
+                break
+            if r_start > lo:
+                gaps.append((lo, r_start))
+            lo = max(lo, r_end)
+        if lo < end:
+            gaps.append((lo, end))
+        return gaps
+
+    def closed_until(self, granularity, now=None):
+        """Return the end of the range of buckets that can be stored."""
+        now = time.time() if now is None else now
+        return int((now - self.settle_time) // granularity * granularity)
+
+    def add(self, series_id, start, end, records):
+        """Store the records fetched for [start, end) of the series.
+
+        Only the closed part of the range is stored and marked as held.
+
+        :param records: list of {timestamp, data} dicts, of the
+            granularity of the series
+        """
+        granularity = self.granularity(series_id)
+        if granularity is None:
+            raise ValueError("Unknown series %s" % series_id)
+        end = min(end, self.closed_until(granularity))
+        if end <= start:
+            return
+
+        rows = [(series_id, rec['timestamp'], json.dumps(rec['data']))
+                for rec in records if start <= rec['timestamp'] < end]
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO points (series_id, timestamp, data) '
+                'VALUES (?, ?, ?)', rows)
+
+            # Merge the new range with the ranges already held
+            merged = []
+            for r_start, r_end in sorted(self._ranges(series_id) +
+                                         [(start, end)]):
+                if merged and r_start <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], r_end)
+                else:
+                    merged.append([r_start, r_end])
+            self._conn.execute('DELETE FROM ranges WHERE series_id = ?',
+                               (series_id,))
+            self._conn.executemany(
+                'INSERT INTO ranges (series_id, start, end) '
+                'VALUES (?, ?, ?)',
+                [(series_id, s, e) for s, e in merged])
+
+    def records(self, series_id, start, end):
+        """Return the stored records of the series within [start, end]."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT timestamp, data FROM points WHERE series_id = ? '
+                'AND timestamp >= ? AND timestamp <= ? ORDER BY timestamp',
+                (series_id, start, end)).fetchall()
+        return [{'timestamp': t, 'data': json.loads(d)} for t, d in rows]
+
+    def purge(self, before):
+        """Drop all points and ranges older than the before timestamp."""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM points WHERE timestamp < ?',
+                               (before,))
+            self._conn.execute('DELETE FROM ranges WHERE end <= ?',
+                               (before,))
+            self._conn.execute('UPDATE ranges SET start = ? '
+                               'WHERE start < ?', (before, before))
@@ -0,0 +1,88 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Coalescing of identical concurrent requests.
+
+When several reports ask the same SCC for the same data at the same time,
+for instance dashboards opened together, a :py:class:`SingleFlight` lets
+the first caller send the request while the others wait for, and share,
+its result. Every SCC object owns one as ``scc.inflight``, used by all
+reports run against it:
+
+.. code-block:: python
+
+    scc.inflight.stats()
+    # {'executed': 1, 'coalesced': 9, 'in_flight': 0}
+
+Requests are only coalesced while in flight, once a request completes the
+next identical one is sent again. A :py:class:`ReportCache
+<steelscript.scc.core.cache.ReportCache>` keeps results for longer.
+"""
+
+import logging
+import threading
+
+from concurrent.futures import Future
+
+__all__ = ['SingleFlight']
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight(object):
+    """Run at most one call per key at a time, sharing its outcome.
+
+    Results are handed to every waiting caller as is, so they must be
+    treated as read-only.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Return fn(*args, **kwargs), or the result of the identical call
+        already in flight for key.
+
+        Exceptions raised by the call are raised in every caller sharing
+        it.
+
+        :param key: hashable identifying the call
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            logger.debug("Waiting for in-flight request %s" % (key,))
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        """Return a dict of coalescing statistics."""
+        with self._lock:
+            return {'executed': self.executed,
+                    'coalesced': self.coalesced,
+                    'in_flight': len(self._calls)}
@@ -0,0 +1,142 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Incremental decoding of large JSON responses.
+
+:py:class:`JSONArrayStream` reads a JSON object from an iterable of byte
+chunks, such as the body of a streamed HTTP response, and yields the
+elements of one of its array members as soon as each is complete. Only
+the current chunk and the element being decoded are held in memory, the
+other members of the object are collected in ``header``.
+
+.. code-block:: python
+
+    stream = JSONArrayStream(response.iter_content(65536), 'response_data')
+    for record in stream:
+        ...
+    stream.header['granularity']
+"""
+
+import json
+import codecs
+
+__all__ = ['JSONArrayStream']
+
+# Default size of the chunks read from a streamed response
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+
+
+class JSONArrayStream(object):
+    """Iterate over the elements of an array member of a streamed object.
+
+    :param chunks: iterable of bytes (or str) making up a JSON object
+    :param key: string, name of the top level member holding the array,
+        or None if the document itself is the array
+    """
+
+    def __init__(self, chunks, key):
+        self.key = key
+        self.header = {}
+        self._chunks = iter(chunks)
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _read(self):
+        """Append the next chunk to the buffer, return False at the end."""
+        if self._eof:
+            return False
+
+        # Drop what has already been consumed before growing the buffer
+        self._buf = self._buf[self._pos:]
+        self._pos = 0
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._eof = True
+            self._buf += self._utf8.decode(b'', final=True)
+            return False
+
+        if isinstance(chunk, bytes):
+            chunk = self._utf8.decode(chunk)
+        self._buf += chunk
+        return True
+
+    def _peek(self):
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while (self._pos < len(self._buf) and
+                   self._buf[self._pos] in _WHITESPACE):
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._read():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def _expect(self, chars):
+        c = self._peek()
+        if c not in chars:
+            raise ValueError("Expected one of %r at offset %d of JSON "
+                             "stream, got %r" % (chars, self._pos, c))
+        self._pos += 1
+        return c
+
+    def _value(self):
+        """Decode the next complete JSON value from the buffer."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # A number at the very end of the buffer may continue
+                # in the next chunk
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise
+            self._read()
+
+    def _items(self):
+        """Yield the elements of the array starting at the buffer position.
+        """
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+
+        while True:
+            yield self._value()
+            if self._expect(',]') == ']':
+                break
+
+    def __iter__(self):
+        if self.key is None:
+            for item in self._items():
+                yield item
+            return
+
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+
+        while True:
+            name = self._value()
+            self._expect(':')
+            if name == self.key and self._peek() == '[':
+                for item in self._items():
+                    yield item
+            else:
+                self.header[name] = self._value()
+
+            if self._expect(',}') == '}':
+                break
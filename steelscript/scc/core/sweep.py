@@ -0,0 +1,253 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Run a single device report for every appliance of an SCC.
+
+Reports such as :py:class:`CpuUtilizationStatsReport
+<steelscript.scc.core.report.CpuUtilizationStatsReport>` take exactly one
+``device``. A :py:class:`FleetSweep` lists the appliances of the SCC and
+runs the report for each of them on a bounded thread pool, yielding the
+result of every appliance as soon as it is available:
+
+.. code-block:: python
+
+    sweep = FleetSweep(scc, CpuUtilizationStatsReport, max_workers=8,
+                       appliance_filter=lambda a: a['product_code'] == 'SH')
+    for result in sweep.run(timefilter='last 1 hour'):
+        if result.ok:
+            print(result.name, max(r['data'][0] for r in result.data))
+        print(sweep.progress)
+
+    sweep.progress.failures      # {serial: exception}
+
+Appliances come from ``scc.inventory`` when the SCC keeps one, see
+:py:class:`ApplianceInventory
+<steelscript.scc.core.inventory.ApplianceInventory>`, otherwise from an
+:py:class:`AppliancesReport <steelscript.scc.core.report.AppliancesReport>`.
+"""
+
+import time
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from steelscript.scc.core.report import stats_report_class, run_report, \
+    AppliancesReport, SCCException
+from steelscript.scc.core.batch import BatchResult
+
+__all__ = ['SweepResult', 'SweepProgress', 'FleetSweep']
+
+logger = logging.getLogger(__name__)
+
+# Default number of appliances reported on at once
+DEFAULT_MAX_WORKERS = 8
+
+
+class SweepResult(BatchResult):
+    """Outcome of the report of one appliance of a :py:class:`FleetSweep`.
+
+    The ``name`` of the result is the serial of the appliance.
+
+    :param appliance: dict, inventory record of the appliance
+    """
+
+    def __init__(self, index, name, report, criteria, appliance, error=None,
+                 elapsed=None):
+        super(SweepResult, self).__init__(index, name, report, criteria,
+                                          error=error, elapsed=elapsed)
+        self.appliance = appliance
+
+
+class SweepProgress(object):
+    """Progress of a running :py:class:`FleetSweep`.
+
+    :param total: int, number of appliances to report on
+    :param succeeded: int, number of reports that succeeded
+    :param failures: dict of the exception raised by each failed report,
+        by serial
+    :param started: float, epoch seconds the sweep started at
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.succeeded = 0
+        self.failures = {}
+        self.started = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<SweepProgress %d/%d done, %d failed, %.1fs>' % (
+            self.done, self.total, self.failed, self.elapsed)
+
+    def _record(self, result):
+        with self._lock:
+            if result.ok:
+                self.succeeded += 1
+            else:
+                self.failures[result.name] = result.error
+
+    @property
+    def failed(self):
+        return len(self.failures)
+
+    @property
+    def done(self):
+        return self.succeeded + self.failed
+
+    @property
+    def remaining(self):
+        return self.total - self.done
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def fraction(self):
+        """Fraction of the appliances done, between 0 and 1."""
+        return float(self.done) / self.total if self.total else 1.0
+
+    @property
+    def eta(self):
+        """Estimated seconds until the sweep completes, None until the
+        first appliance is done."""
+        if not self.done:
+            return None
+        return self.elapsed / self.done * self.remaining
+
+
+class FleetSweep(object):
+    """Run a single device report for every appliance, concurrently."""
+
+    def __init__(self, scc, report_class, devices=None,
+                 appliance_filter=None, max_workers=DEFAULT_MAX_WORKERS,
+                 report_options=None):
+        """Create a FleetSweep object
+
+        :param scc: SCC object used to run the reports
+        :param report_class: report class taking a ``device`` criteria,
+            or resource name of the report in ``scc_stats_reports``
+        :param devices: list of serials to report on, defaults to every
+            appliance of the SCC
+        :param appliance_filter: function called with the inventory record
+            of each appliance, returning True for those to report on
+        :param max_workers: int, maximum number of reports run at once
+        :param report_options: dict of keyword arguments used to create
+            each report object
+        """
+        report_class = stats_report_class(report_class)[1]
+        if 'device' not in report_class.required_fields:
+            raise SCCException("%s does not report on a single device"
+                               % report_class.__name__)
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1, got %s"
+                             % max_workers)
+
+        self.scc = scc
+        self.report_class = report_class
+        self.devices = devices
+        self.appliance_filter = appliance_filter
+        self.max_workers = max_workers
+        self.report_options = report_options or {}
+        self.progress = None
+
+    def __repr__(self):
+        return '<FleetSweep %s %s>' % (self.report_class.__name__,
+                                       self.progress)
+
+    def appliances(self):
+        """Return the list of inventory records of the appliances to
+        report on."""
+        inventory = getattr(self.scc, 'inventory', None)
+        if inventory is not None:
+            appliances = inventory.appliances
+        else:
+            report = AppliancesReport(self.scc)
+            report.run()
+            appliances = report.data or []
+
+        if self.devices is not None:
+            by_serial = dict((a.get('serial'), a) for a in appliances)
+            if inventory is not None:
+                serials = [inventory.resolve(d) for d in self.devices]
+            else:
+                serials = list(self.devices)
+            # Devices missing from the inventory are still reported on
+            appliances = [by_serial.get(s, {'serial': s}) for s in serials]
+
+        if self.appliance_filter is not None:
+            appliances = [a for a in appliances if self.appliance_filter(a)]
+        return [a for a in appliances if a.get('serial')]
+
+    def _run_one(self, index, appliance, criteria):
+        serial = appliance['serial']
+        report = self.report_class(self.scc, **self.report_options)
+        error, elapsed = run_report(
+            report, dict(criteria, device=serial),
+            label='%s for %s' % (self.report_class.__name__, serial))
+        return SweepResult(index, serial, report, criteria, appliance,
+                           error=error, elapsed=elapsed)
+
+    def run(self, **criteria):
+        """Run the report for every appliance, yielding a SweepResult as
+        each one finishes.
+
+        A failing appliance does not stop the sweep, its exception is
+        available as the ``error`` attribute of its result and in the
+        ``failures`` of ``self.progress``. At most max_workers reports
+        are queued ahead of the consumer, so stopping the iteration
+        early leaves the remaining appliances unqueried.
+
+        :param criteria: keyword criteria passed to each report's run
+            method, other than device
+        """
+        if 'device' in criteria:
+            raise SCCException("'device' is set by the sweep")
+        report = self.report_class(self.scc, **self.report_options)
+        fields = report.fanout_criteria(criteria)
+        if fields:
+            raise SCCException("%s can not be swept with several values of "
+                               "%s, run one sweep per value"
+                               % (self.report_class.__name__, fields))
+
+        appliances = self.appliances()
+        progress = self.progress = SweepProgress(len(appliances))
+        logger.debug("Sweeping %s over %d appliances"
+                     % (self.report_class.__name__, len(appliances)))
+
+        pending = iter(enumerate(appliances))
+        executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                      thread_name_prefix='scc-sweep')
+        running = set()
+        try:
+            while True:
+                for index, appliance in pending:
+                    running.add(executor.submit(self._run_one, index,
+                                                appliance, criteria))
+                    if len(running) >= self.max_workers:
+                        break
+                if not running:
+                    break
+
+                finished, running = wait(running,
+                                         return_when=FIRST_COMPLETED)
+                for future in finished:
+                    result = future.result()
+                    progress._record(result)
+                    yield result
+        finally:
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=True)
+            progress.finished = time.time()
+
+    def run_all(self, **criteria):
+        """Run the report for every appliance and return the results in
+        the order of the appliances."""
+        return sorted(self.run(**criteria), key=lambda r: r.index)
@@ -0,0 +1,151 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import json
+import time
+import datetime
+import threading
+import urllib.parse
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import mock
+
+import pytest
+
+from steelscript.scc.core.singleflight import SingleFlight
+from steelscript.scc.core.scc import SCCServerConnectionHook
+
+
+def dt(seconds):
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc)
+
+
+def time_series(criteria, granularity=300, value=1):
+    """Answer a stats request with one record per bucket of its range."""
+    start, end = criteria['start_time'], criteria['end_time']
+    return {'granularity': granularity,
+            'query_criteria': criteria,
+            'response_data': [{'timestamp': t, 'data': [value] * 4}
+                              for t in range(start - start % granularity,
+                                             end, granularity)]}
+
+
+class FakeService(object):
+    """Stands in for a sleepwalker service, answering every request with
+    handler(resource, criteria) and recording the requests sent."""
+
+    def __init__(self, handler, delay=0):
+        self.handler = handler
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def bind(self, resource, **variables):
+        datarep = mock.Mock()
+
+        def execute(link, criteria=None):
+            with self._lock:
+                self.calls.append((resource, dict(criteria or {})))
+            if self.delay:
+                time.sleep(self.delay)
+            return mock.Mock(data=self.handler(resource, criteria))
+        datarep.execute.side_effect = execute
+        return datarep
+
+
+class FakeSCC(object):
+    """SCC object whose services are FakeService objects."""
+
+    def __init__(self, handler=None, host='scc.example.com', auth=None,
+                 delay=0, **attrs):
+        handler = handler or (lambda resource, criteria:
+                              time_series(criteria))
+        self.host = host
+        self.auth = auth
+        self.stats = FakeService(handler, delay)
+        self.appliance_inventory = FakeService(handler, delay)
+        self.inflight = SingleFlight()
+        self.cache = None
+        self.segment_store = None
+        self.limiter = None
+        self.inventory = None
+        for name, value in attrs.items():
+            setattr(self, name, value)
+
+
+@pytest.fixture
+def fake_scc():
+    return FakeSCC()
+
+
+class StubSCC(BaseHTTPRequestHandler):
+    """Minimal SCC answering the bootstrap, OAuth and stats requests."""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _count(self, path):
+        with self.server.lock:
+            self.server.requests[path] = \
+                self.server.requests.get(path, 0) + 1
+
+    def _send(self, obj):
+        body = json.dumps(obj).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        self._count(path)
+        if path == '/api/common/1.0/services':
+            self._send([])
+        elif path == '/api/common/1.0/auth_info':
+            self._send({'supported_methods': ['OAUTH_2_0']})
+        elif path == '/api/common/1.0/info':
+            self._send({'sw_version': '9.1'})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        path = self.path.split('?')[0]
+        self._count(path)
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length).decode()
+        if path == '/api/common/1.0/oauth/token':
+            state = urllib.parse.parse_qs(body)['state'][0]
+            self._send({'access_token': 'token', 'state': state})
+            return
+        time.sleep(0.005)
+        self._send(time_series(json.loads(body)))
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self):
+        ThreadingHTTPServer.__init__(self, ('127.0.0.1', 0), StubSCC)
+        self.lock = threading.Lock()
+        self.requests = {}
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d' % self.server_address[1]
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    # Bootstrap every SCC object rather than reusing earlier sessions
+    monkeypatch.setattr(SCCServerConnectionHook, 'bootstrap_cache', None)
+    server = StubServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
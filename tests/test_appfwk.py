@@ -0,0 +1,41 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import pytest
+
+try:
+    import pandas
+    from steelscript.scc.appfwk.datasources.scc import SCCThroughputQuery, \
+        SCCAppliancesQuery
+except Exception as e:
+    # The app framework and its Django settings are optional
+    pytest.skip('steelscript.appfwk is not usable: %s' % e,
+                allow_module_level=True)
+
+
+def extract(query_class, records):
+    # extract_dataframe only depends on the class attributes
+    return query_class.__new__(query_class).extract_dataframe(records)
+
+
+def test_stats_records_are_converted_by_column():
+    records = [{'timestamp': 1500000000 + 300 * i,
+                'data': [i, 2 * i, 3 * i, 4 * i]} for i in range(3)]
+    df = extract(SCCThroughputQuery, records)
+
+    assert list(df.columns) == ['timestamp', 'wan_in', 'wan_out',
+                                'lan_in', 'lan_out']
+    assert df['lan_out'].tolist() == [0.0, 4.0, 8.0]
+    assert df['timestamp'][1] == pandas.Timestamp(1500000300, unit='s',
+                                                  tz='UTC')
+
+
+def test_plain_records_and_empty_data():
+    records = [{'serial': 'S1', 'model': 'CX'}]
+    df = extract(SCCAppliancesQuery, records)
+    assert df.to_dict('records') == records
+
+    assert extract(SCCThroughputQuery, []) is None
@@ -0,0 +1,37 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import pytest
+
+from steelscript.scc.core.batch import ReportBatch
+from steelscript.scc.core.report import SCCException
+
+from conftest import FakeSCC, dt, time_series
+
+
+def test_report_batch_keeps_order_and_errors():
+    def handler(resource, criteria):
+        if criteria['device'] == 'bad':
+            raise SCCException('bad device')
+        return time_series(criteria)
+
+    scc = FakeSCC(handler)
+    batch = ReportBatch(scc, max_workers=3)
+    for device in ['a', 'bad', 'c']:
+        batch.add('throughput', start_time=dt(3600), end_time=dt(7200),
+                  device=device, traffic_type='peak')
+
+    results = batch.run_all()
+    assert [r.index for r in results] == [0, 1, 2]
+    assert [r.ok for r in results] == [True, False, True]
+    assert isinstance(results[1].error, SCCException)
+    assert len(results[2].data) == 12
+
+
+def test_report_batch_rejects_unknown_names(fake_scc):
+    with pytest.raises(SCCException):
+        ReportBatch(fake_scc).add('no_such_report')
+
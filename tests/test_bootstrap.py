@@ -0,0 +1,93 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import os
+import stat
+import time
+
+from unittest import mock
+
+from steelscript.common.service import OAuth, UserAuth
+from steelscript.scc.core.scc import SCC, SCCServerConnectionHook
+from steelscript.scc.core.report import ThroughputStatsReport
+from steelscript.scc.core.bootstrap import BootstrapCache, \
+    make_bootstrap_key
+
+from conftest import dt
+
+
+def test_files_of_other_users_are_ignored(tmpdir):
+    path = str(tmpdir.join('bootstrap.json'))
+    auth = OAuth('access code')
+    BootstrapCache(path).put('scc', auth, '1.0', 'Bearer token')
+    assert BootstrapCache(path).get('scc', auth) is not None
+
+    with mock.patch('os.getuid', return_value=os.getuid() + 1):
+        assert BootstrapCache(path).get('scc', auth) is None
+
+
+def test_entries_are_keyed_by_access_code_and_expire(monkeypatch):
+    cache = BootstrapCache(ttl=60)
+    auth = OAuth('access code')
+    cache.put('scc', auth, '9.1', 'Bearer token')
+
+    assert cache.get('scc', auth)['authorization'] == 'Bearer token'
+    assert cache.get('scc', OAuth('other code')) is None
+    assert cache.get('other', auth) is None
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 61)
+    assert cache.get('scc', auth) is None
+
+
+def test_only_oauth_and_anonymous_sessions_are_cached():
+    assert make_bootstrap_key('scc', None) == 'scc|'
+    assert 'access code' not in make_bootstrap_key('scc',
+                                                   OAuth('access code'))
+    assert make_bootstrap_key('scc', UserAuth('admin', 'password')) is None
+
+
+def test_file_is_private_and_shared_by_instances(tmpdir):
+    path = str(tmpdir.join('bootstrap.json'))
+    auth = OAuth('access code')
+    BootstrapCache(path).put('scc', auth, '9.1', 'Bearer token')
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    with open(path) as f:
+        assert 'access code' not in f.read()
+    other = BootstrapCache(path)
+    assert other.get('scc', auth)['sw_version'] == '9.1'
+
+    other.invalidate('scc', auth)
+    assert BootstrapCache(path).get('scc', auth) is None
+
+
+def test_readable_or_corrupt_files_are_ignored(tmpdir):
+    path = str(tmpdir.join('bootstrap.json'))
+    auth = OAuth('access code')
+    BootstrapCache(path).put('scc', auth, '9.1', 'Bearer token')
+
+    os.chmod(path, 0o644)
+    assert BootstrapCache(path).get('scc', auth) is None
+
+    with open(path, 'w') as f:
+        f.write('{not json')
+    os.chmod(path, 0o600)
+    assert BootstrapCache(path).get('scc', auth) is None
+
+
+def test_later_connections_skip_the_bootstrap(stub_server, monkeypatch):
+    monkeypatch.setattr(SCCServerConnectionHook, 'bootstrap_cache',
+                        BootstrapCache())
+    for _ in range(3):
+        scc = SCC(stub_server.url, auth=OAuth('access code'))
+        report = ThroughputStatsReport(scc)
+        report.run(start_time=dt(3600), end_time=dt(7200), device='serial',
+                   traffic_type='peak')
+        assert len(report.data) == 12
+
+    assert stub_server.requests['/api/common/1.0/oauth/token'] == 1
+    assert stub_server.requests['/api/common/1.0/info'] == 1
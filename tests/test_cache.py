@@ -0,0 +1,92 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+from steelscript.common.service import OAuth, UserAuth
+from steelscript.scc.core.cache import ReportCache, make_cache_key, \
+    auth_identity
+from steelscript.scc.core.report import ThroughputStatsReport
+
+from conftest import FakeSCC, dt
+
+
+def run(scc, start=3600, end=7200):
+    report = ThroughputStatsReport(scc)
+    report.run(start_time=dt(start), end_time=dt(end), device='serial',
+               traffic_type='peak')
+    return report
+
+
+def test_repeated_report_is_answered_from_cache():
+    scc = FakeSCC(auth=OAuth('code'), cache=ReportCache(ttl=60))
+    first = run(scc)
+    second = run(scc)
+
+    assert len(scc.stats.calls) == 1
+    assert second.data == first.data
+    assert scc.cache.stats()['hits'] == 1
+
+
+def test_relative_ranges_moments_apart_share_an_entry():
+    scc = FakeSCC(auth=OAuth('code'), cache=ReportCache(ttl=60))
+    run(scc, 3600, 7200)
+    run(scc, 3660, 7260)
+
+    assert len(scc.stats.calls) == 1
+
+
+def test_criteria_are_sent_as_given():
+    scc = FakeSCC(auth=OAuth('code'), cache=ReportCache(ttl=60))
+    report = run(scc, 3660, 3660)
+
+    # Neither snapped nor rewritten, only the cache key is snapped
+    assert scc.stats.calls[0][1]['start_time'] == 3660
+    assert scc.stats.calls[0][1]['end_time'] == 3660
+    assert report.criteria['end_time'] == 3660
+
+
+def test_entries_are_not_shared_across_credentials():
+    cache = ReportCache(ttl=60)
+    alice = FakeSCC(auth=UserAuth('alice', 'secret'), cache=cache)
+    bob = FakeSCC(auth=UserAuth('bob', 'secret'), cache=cache)
+    run(alice)
+    run(bob)
+
+    assert len(alice.stats.calls) == 1
+    assert len(bob.stats.calls) == 1
+    assert len(cache) == 2
+
+
+def test_auth_identity_is_hashed():
+    identity = auth_identity(OAuth('secret code'))
+    assert identity.startswith('access_code:')
+    assert 'secret code' not in identity
+    assert auth_identity(None) == ''
+    assert auth_identity(object()) is None
+
+
+def test_unidentified_auth_is_not_cached():
+    assert make_cache_key('host', 'stats', 'throughput', 'report',
+                          {}, auth=object()) is None
+
+    scc = FakeSCC(auth=object(), cache=ReportCache(ttl=60))
+    run(scc)
+    run(scc)
+    assert len(scc.stats.calls) == 2
+    assert len(scc.cache) == 0
+
+
+def test_expired_and_evicted_entries():
+    cache = ReportCache(ttl=0, max_entries=2)
+    cache.put('a', {'value': 1})
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+    cache = ReportCache(ttl=60, max_entries=2)
+    for key in 'abc':
+        cache.put(key, {'value': key})
+    assert cache.get('a') is None
+    assert cache.get('c') == {'value': 'c'}
+    assert cache.stats()['evictions'] == 1
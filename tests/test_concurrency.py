@@ -0,0 +1,48 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+from concurrent.futures import ThreadPoolExecutor
+
+from steelscript.common.service import OAuth
+from steelscript.scc.core.scc import SCC
+from steelscript.scc.core.report import ThroughputStatsReport
+
+from conftest import FakeSCC, dt
+
+
+def run_report(scc, i):
+    start = 3600 * (i + 1)
+    report = ThroughputStatsReport(scc)
+    report.run(start_time=dt(start), end_time=dt(start + 3600),
+               device='serial%d' % i, traffic_type='peak')
+    return report
+
+
+def test_shared_scc_concurrent_reports(stub_server):
+    scc = SCC(stub_server.url, auth=OAuth('access code'), pool_size=8)
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        reports = list(executor.map(lambda i: run_report(scc, i),
+                                    range(200)))
+
+    for i, report in enumerate(reports):
+        assert len(report.data) == 12
+        assert report.data[0]['timestamp'] == 3600 * (i + 1)
+    # The session is bootstrapped once for all threads
+    assert stub_server.requests['/api/common/1.0/oauth/token'] == 1
+    assert stub_server.requests['/api/cmc.stats/1.0/throughput'] == 200
+
+
+def test_response_is_only_set_by_the_running_thread():
+    scc = FakeSCC()
+    report = run_report(scc, 0)
+    assert report.response.data['response_data'] == report.data
+
+    # Windows are requested by worker threads
+    report = ThroughputStatsReport(scc, shard_size=3600)
+    report.run(start_time=dt(3600), end_time=dt(4 * 3600), device='serial',
+               traffic_type='peak')
+    assert len(report.data) == 36
+    assert report.response is None and report.datarep is None
@@ -0,0 +1,22 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+from steelscript.scc.core.report import BWTimeSeriesStatsReport
+
+from conftest import FakeSCC, dt
+
+
+def test_devices_are_requested_in_chunks():
+    scc = FakeSCC(delay=0.05)
+    report = BWTimeSeriesStatsReport(scc, max_workers=4,
+                                     device_chunk_size=1)
+    report.run(start_time=dt(3600), end_time=dt(7200),
+               devices=['a', 'b', 'c', 'd'])
+
+    assert sorted(c['devices'] for _, c in scc.stats.calls) == \
+        [['a'], ['b'], ['c'], ['d']]
+    # Values of the device chunks are summed per timestamp
+    assert report.data[0]['data'] == [4, 4, 4, 4]
@@ -0,0 +1,170 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import os
+
+import pytest
+
+from steelscript.scc.core import scc as scc_module
+from steelscript.scc.core.report import QoSStatsReport, SubclassRegistry, \
+    BWTimeSeriesStatsReport, BWUsageStatsReport, ThroughputStatsReport, \
+    SCCException
+
+from conftest import FakeSCC, dt, time_series
+
+STATS_SERVICEDEF = os.path.join(os.path.dirname(scc_module.__file__),
+                                'servicedef', 'cmc.stats.yml')
+
+
+def qos(resource, criteria):
+    # Only QoS classes 1 and 3 carry traffic
+    class_id = criteria.get('qos_class_id', 3)
+    payload = time_series(criteria, value=class_id)
+    if class_id not in (1, 3):
+        payload['response_data'] = []
+    return payload
+
+
+def run_qos(scc, registry=None, **criteria):
+    report = QoSStatsReport(scc)
+    report.subclass_registry = registry or SubclassRegistry()
+    report.run(start_time=dt(3600), end_time=dt(7200), device='serial',
+               **criteria)
+    return report
+
+
+def test_subclass_lists_are_requested_per_id():
+    scc = FakeSCC(qos)
+    report = run_qos(scc, qos_class_id=[3, '1', 1])
+
+    assert sorted(c['qos_class_id'] for _, c in scc.stats.calls) == [1, 3]
+    assert list(report.data) == [1, 3]
+    assert report.data[1][0]['data'] == [1] * 4
+
+    matrix = report.result
+    assert matrix.dimension == 'qos_class_id'
+    assert matrix.labels == [1, 3]
+    assert matrix.values.shape == (2, 12, 4)
+    assert matrix.series(3)['bits_sent'].tolist() == [3.0] * 12
+
+
+def test_all_subclasses_are_those_seen_with_data():
+    registry = SubclassRegistry()
+    scc = FakeSCC(qos)
+
+    # Only the default class is known at first
+    report = run_qos(scc, registry, qos_class_id='all')
+    assert list(report.data) == [3]
+
+    run_qos(scc, registry, qos_class_id=[1, 2])
+    assert registry.get(scc.host, 'qos', 'serial') == [1, 3]
+    report = run_qos(scc, registry, qos_class_id='all')
+    assert list(report.data) == [1, 3]
+
+
+def test_single_subclass_is_not_fanned_out():
+    scc = FakeSCC(qos)
+    report = run_qos(scc, qos_class_id=1)
+
+    assert isinstance(report.data, list)
+    assert report.result.columns == QoSStatsReport.columns
+
+
+def test_empty_subclass_list():
+    with pytest.raises(SCCException):
+        run_qos(FakeSCC(qos), qos_class_id=[])
+
+
+@pytest.fixture(scope='module')
+def stats_servicedef():
+    return scc_module.ServiceDefLoader(cache_dir='').load(STATS_SERVICEDEF)
+
+
+def by_traffic_type(resource, criteria):
+    payload = time_series(criteria)
+    width = 2 if criteria.get('traffic_type') == 'passthrough' else 4
+    for rec in payload['response_data']:
+        rec['data'] = rec['data'][:width]
+    return payload
+
+
+def test_all_traffic_types_of_the_servicedef(stats_servicedef):
+    scc = FakeSCC(by_traffic_type)
+    scc.stats.servicedef = stats_servicedef
+    report = BWTimeSeriesStatsReport(scc)
+    report.run(start_time=dt(3600), end_time=dt(7200), traffic_type='all')
+
+    assert sorted(c['traffic_type'] for _, c in scc.stats.calls) == \
+        ['optimized', 'passthrough']
+    assert list(report.data) == ['optimized', 'passthrough']
+    # Each traffic type keeps its own columns
+    assert report.result.columns == [
+        'optimized.wan_in', 'optimized.wan_out', 'optimized.lan_in',
+        'optimized.lan_out', 'passthrough.bytes_in', 'passthrough.bytes_out']
+    assert len(report.result) == 12
+
+
+def test_traffic_type_lists_are_validated(stats_servicedef):
+    scc = FakeSCC()
+    scc.stats.servicedef = stats_servicedef
+    report = ThroughputStatsReport(scc)
+    report.run(start_time=dt(3600), end_time=dt(7200), device='serial',
+               traffic_type=['p95', 'peak', 'p95'])
+    assert list(report.data) == ['p95', 'peak']
+
+    with pytest.raises(SCCException):
+        report.run(start_time=dt(3600), end_time=dt(7200), device='serial',
+                   traffic_type=['peak', 'optimized'])
+    assert len(scc.stats.calls) == 2
+
+
+def by_port(resource, criteria):
+    if resource == 'bw_usage':
+        # Port 443 carries the most traffic
+        return {'response_data': [{'port': 80, 'data': [1, 1, 1, 1]},
+                                  {'port': 443, 'data': [5, 5, 5, 5]},
+                                  {'port': 22, 'data': [0, 0, 0, 0]}]}
+    return time_series(criteria, value=criteria['port'])
+
+
+def test_port_lists_are_requested_per_port():
+    scc = FakeSCC(by_port)
+    report = ThroughputStatsReport(scc)
+    report.run(start_time=dt(3600), end_time=dt(7200), device='serial',
+               port=[80, '443'])
+
+    assert sorted(c['port'] for _, c in scc.stats.calls) == [80, 443]
+    assert report.result.labels == [80, 443]
+    assert report.result.series(443)['wan_in'][0] == 443.0
+
+
+def test_all_ports_are_the_busiest_ones():
+    scc = FakeSCC(by_port)
+    report = ThroughputStatsReport(scc)
+    report.run(start_time=dt(3600), end_time=dt(7200), device='serial',
+               port='all')
+
+    usage = scc.stats.calls[0]
+    assert usage[0] == 'bw_usage' and usage[1]['devices'] == ['serial']
+    assert list(report.data) == [443, 80, 22]
+    assert report.criteria['port'] == [443, 80, 22]
+
+
+def test_all_ports_is_validated_before_any_request():
+    scc = FakeSCC(by_port)
+    report = ThroughputStatsReport(scc)
+    with pytest.raises(SCCException):
+        report.run(start_time=dt(3600), end_time=dt(7200), port='all')
+    with pytest.raises(SCCException):
+        report.run(start_time=dt(3600), end_time=dt(7200), device='serial',
+                   port='all', unknown=1)
+    assert scc.stats.calls == []
+
+
+def test_bandwidth_usage_is_not_fanned_out_over_ports():
+    report = BWUsageStatsReport(FakeSCC(by_port))
+    assert 'port' not in report.fanout_fields
+    assert report.fanout_criteria({'port': 'all'}) == []
@@ -0,0 +1,92 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import pytest
+
+from steelscript.scc.core.federation import FederatedSCC
+from steelscript.scc.core.report import BWUsageStatsReport, \
+    BWTimeSeriesStatsReport, ThroughputStatsReport, QoSStatsReport, \
+    SCCException
+
+from conftest import FakeSCC, dt, time_series
+
+
+def handler(value):
+    def answer(resource, criteria):
+        if resource == 'bw_usage':
+            return {'response_data': [{'port': 80, 'data': [value] * 4},
+                                      {'port': 443, 'data': [value] * 4}]}
+        return time_series(criteria, value=value)
+    return answer
+
+
+@pytest.fixture
+def federation():
+    return FederatedSCC([FakeSCC(handler(1), host='us.example.com'),
+                         FakeSCC(handler(2), host='eu.example.com')])
+
+
+def test_byte_counters_are_summed(federation):
+    report = federation.run(BWUsageStatsReport, start_time=dt(3600),
+                            end_time=dt(7200))
+
+    assert report.ok
+    assert report.data == [{'port': 80, 'data': [3] * 4},
+                           {'port': 443, 'data': [3] * 4}]
+    assert report.result['wan_in'].tolist() == [3, 3]
+
+
+def test_other_reports_are_tagged_by_scc(federation):
+    report = federation.run(ThroughputStatsReport, start_time=dt(3600),
+                            end_time=dt(7200), device='serial',
+                            traffic_type='peak')
+
+    assert len(report.data) == 24
+    assert set(rec['scc'] for rec in report.data) == \
+        set(['us.example.com', 'eu.example.com'])
+    # Throughput peaks are not added up, each SCC is a row
+    result = report.result
+    assert result.labels == ['us.example.com', 'eu.example.com']
+    assert result.values.shape[:2] == (2, 12)
+
+
+def test_fanned_out_counters_are_summed_per_value(federation):
+    report = federation.run(BWTimeSeriesStatsReport, start_time=dt(3600),
+                            end_time=dt(7200), port=[80, 443])
+
+    assert list(report.data) == [80, 443]
+    assert report.data[80][0]['data'] == [3] * 4
+    assert report.result.labels == [80, 443]
+
+
+def test_fanned_out_concatenated_data(federation):
+    report = federation.run(QoSStatsReport, start_time=dt(3600),
+                            end_time=dt(7200), device='serial',
+                            qos_class_id=[1, 2])
+
+    assert list(report.data) == [1, 2]
+    assert len(report.data[1]) == 24
+    with pytest.raises(SCCException):
+        report.result
+
+
+def test_failed_sccs_are_listed():
+    def fail(resource, criteria):
+        raise SCCException('down')
+
+    federation = FederatedSCC([FakeSCC(handler(1), host='us.example.com'),
+                               FakeSCC(fail, host='eu.example.com')])
+    report = federation.run(BWUsageStatsReport, start_time=dt(3600),
+                            end_time=dt(7200))
+
+    assert not report.ok
+    assert list(report.failures) == ['eu.example.com']
+    assert report.data[0]['data'] == [1] * 4
+
+
+def test_duplicate_hosts_are_refused():
+    with pytest.raises(ValueError):
+        FederatedSCC([FakeSCC(), FakeSCC()])
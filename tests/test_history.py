@@ -0,0 +1,86 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import pytest
+
+from steelscript.scc.core.history import HistoryStore
+
+DAY = 86400
+
+
+@pytest.fixture
+def store():
+    store = HistoryStore(':memory:')
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def series(store):
+    return store.series_id('host', 'throughput', {'device': 'serial'},
+                           columns=['wan_in', 'wan_out'])
+
+
+def points(start, values):
+    return [{'timestamp': start + 300 * i, 'data': [v, 2 * v]}
+            for i, v in enumerate(values)]
+
+
+def test_points_are_rolled_up_hourly_and_daily(store, series):
+    store.add(series, 300, points(DAY, range(12)))
+
+    hourly = store.query(series, DAY, DAY + 3600, resolution=3600)
+    assert hourly.keys.tolist() == [DAY]
+    assert hourly['wan_in'].tolist() == [5.5]
+    assert hourly['wan_out'].tolist() == [11.0]
+
+    peak = store.query(series, DAY, DAY + 3600, resolution=3600,
+                       stat='peak')
+    assert peak['wan_in'].tolist() == [11.0]
+
+    daily = store.query(series, DAY, 2 * DAY, resolution=DAY)
+    assert daily['wan_in'].tolist() == [5.5]
+
+
+def test_rollups_weigh_by_samples(store, series):
+    # A full hour of 5 minute points and one hourly point
+    store.add(series, 300, points(DAY, [1] * 12))
+    store.add(series, 3600, [{'timestamp': DAY + 3600, 'data': [13, 26]}])
+
+    daily = store.query(series, DAY, 2 * DAY, resolution=DAY)
+    assert daily['wan_in'].tolist() == [7.0]
+
+
+def test_revised_points_replace_held_ones(store, series):
+    store.add(series, 300, points(DAY, [1] * 12))
+    store.add(series, 300, points(DAY, [3] * 12))
+
+    hourly = store.query(series, DAY, DAY + 3600, resolution=3600)
+    assert hourly['wan_in'].tolist() == [3.0]
+
+
+def test_columns_and_unknown_series(store, series):
+    assert store.columns(series) == ['wan_in', 'wan_out']
+    assert store.series_id('host', 'throughput', {'device': 'other'},
+                           create=False) is None
+
+
+def test_purge_follows_retention():
+    store = HistoryStore(':memory:', retention={300: DAY})
+    series = store.series_id('host', 'throughput', {'device': 'serial'})
+    store.add(series, 300, points(DAY, [1] * 12))
+
+    store.purge(now=3 * DAY)
+    assert not len(store.query(series, DAY, 2 * DAY, resolution=300))
+    assert len(store.query(series, DAY, 2 * DAY, resolution=3600)) == 1
+    store.close()
+
+
+def test_unknown_resolution_and_stat(store, series):
+    with pytest.raises(ValueError):
+        store.add(series, 600, points(DAY, [1]))
+    with pytest.raises(ValueError):
+        store.query(series, DAY, 2 * DAY, stat='median')
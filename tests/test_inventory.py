@@ -0,0 +1,119 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import time
+
+from unittest import mock
+
+import pytest
+
+from steelscript.scc.core.report import CpuUtilizationStatsReport, \
+    SCCException
+from steelscript.scc.core.inventory import ApplianceInventory
+
+from conftest import FakeSCC, dt
+
+
+def appliance(id_, serial, hostname, address, model='CX770', **fields):
+    rec = {'id': id_, 'serial': serial, 'hostname': hostname,
+           'address': address, 'model': model,
+           'interfaces': [{'ip_addr': '192.168.0.%d' % id_}]}
+    rec.update(fields)
+    return rec
+
+
+class InventoryService(object):
+    """appliance_inventory service answering from a dict of records."""
+
+    def __init__(self, records):
+        self.records = records
+        self.calls = []
+
+    def bind(self, resource, **variables):
+        self.calls.append(resource)
+        if resource == 'appliance':
+            data = self.records[variables['id']]
+        elif resource == 'brief_appliances':
+            data = [dict((k, v) for k, v in rec.items() if k != 'version')
+                    for rec in self.records.values()]
+        else:
+            data = list(self.records.values())
+        return mock.Mock(**{'execute.return_value': mock.Mock(data=data)})
+
+
+@pytest.fixture
+def service():
+    return InventoryService(dict(
+        (i, appliance(i, 'S%d' % i, 'branch-%d' % i, '10.0.0.%d' % i,
+                      version='9.0')) for i in range(1, 9)))
+
+
+def test_lookups(service):
+    inventory = ApplianceInventory(FakeSCC(appliance_inventory=service))
+
+    assert inventory.by_serial('S2')['id'] == 2
+    assert inventory.by_hostname('BRANCH-3')['serial'] == 'S3'
+    assert inventory.by_address('192.168.0.4')['serial'] == 'S4'
+    assert len(inventory.by_model('CX770')) == 8
+    assert inventory.resolve('10.0.0.5') == 'S5'
+    assert inventory.resolve('unknown') == 'unknown'
+    assert 'branch-6' in inventory and len(inventory) == 8
+    with pytest.raises(SCCException):
+        inventory.serial('unknown')
+    assert service.calls == ['appliances']
+
+
+def test_refresh_only_fetches_changed_appliances(service):
+    inventory = ApplianceInventory(FakeSCC(appliance_inventory=service),
+                                   ttl=None)
+    inventory.refresh()
+
+    service.records[2] = appliance(2, 'S2', 'renamed', '10.0.0.2',
+                                   version='9.1')
+    service.records[9] = appliance(9, 'S9', 'branch-9', '10.0.0.9')
+    del service.records[8]
+    service.calls = []
+
+    stats = inventory.refresh()
+    assert stats == {'fetched': 2, 'full': False, 'removed': 1}
+    assert sorted(service.calls) == ['appliance', 'appliance',
+                                     'brief_appliances']
+    assert inventory.by_hostname('renamed')['version'] == '9.1'
+    assert inventory.by_hostname('branch-2') is None
+    assert inventory.by_serial('S8') is None
+    assert inventory.by_serial('S9') is not None
+
+
+def test_many_changes_fetch_the_whole_collection(service):
+    inventory = ApplianceInventory(FakeSCC(appliance_inventory=service))
+    inventory.refresh()
+    for id_, rec in list(service.records.items()):
+        service.records[id_] = dict(rec, health='Critical')
+
+    assert inventory.refresh()['full'] is True
+
+
+def test_expired_inventory_is_refreshed_on_lookup(service, monkeypatch):
+    inventory = ApplianceInventory(FakeSCC(appliance_inventory=service),
+                                   ttl=60)
+    inventory.by_serial('S1')
+    inventory.by_serial('S1')
+    assert service.calls == ['appliances']
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 61)
+    inventory.by_serial('S1')
+    assert service.calls == ['appliances', 'brief_appliances']
+
+
+def test_reports_accept_hostnames(service):
+    scc = FakeSCC(appliance_inventory=service)
+    scc.inventory = ApplianceInventory(scc)
+    report = CpuUtilizationStatsReport(scc)
+    report.run(device='branch-7', start_time=dt(3600), end_time=dt(7200))
+
+    assert scc.stats.calls[0][1]['device'] == 'S7'
+    assert len(report.data) == 12
@@ -0,0 +1,159 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import time
+
+import pytest
+import requests
+
+from steelscript.scc.core.scc import SCC
+from steelscript.scc.core.limiter import AdaptiveLimiter, TokenBucket, \
+    is_overload
+from steelscript.scc.core.report import ThroughputStatsReport
+
+from conftest import FakeSCC, dt
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        self.status = status
+
+
+def answer(limiter, latency, key='stats.throughput', error=None):
+    """Send and answer one request taking latency seconds."""
+    assert limiter.acquire(timeout=1)
+    limiter.release(time.monotonic() - latency, error=error, key=key)
+
+
+def test_limit_grows_only_when_reached():
+    limiter = AdaptiveLimiter(initial=2)
+    answer(limiter, 0.01)
+    assert limiter.limit == 2
+
+    assert limiter.acquire(timeout=1)
+    answer(limiter, 0.01)
+    assert limiter.limit == 2.5
+    limiter.release(time.monotonic())
+
+
+def test_limit_never_exceeds_max_limit():
+    limiter = AdaptiveLimiter(initial=1, max_limit=2)
+    for _ in range(20):
+        answer(limiter, 0.01)
+    assert limiter.limit == 2
+
+
+def test_overload_errors_halve_the_limit_once_per_round():
+    limiter = AdaptiveLimiter(initial=8)
+    started = time.monotonic()
+    for _ in range(3):
+        assert limiter.acquire(timeout=1)
+    for error in [HTTPError(503), requests.exceptions.Timeout()]:
+        limiter.release(started, error=error)
+    assert limiter.limit == 4
+    assert limiter.decreases == 1
+
+    # Requests sent after the decrease back off again
+    answer(limiter, 0, error=HTTPError(429))
+    assert limiter.limit == 2
+
+
+def test_client_errors_are_neutral():
+    limiter = AdaptiveLimiter(initial=4)
+    answer(limiter, 0.01, error=HTTPError(404))
+    assert limiter.limit == 4
+    assert limiter.failed == 1
+    assert not is_overload(HTTPError(400))
+    assert is_overload(requests.exceptions.ConnectionError())
+
+
+def test_acquire_times_out_when_full():
+    limiter = AdaptiveLimiter(initial=1)
+    assert limiter.acquire(timeout=1)
+    assert not limiter.acquire(timeout=0.05)
+    limiter.release(time.monotonic())
+    assert limiter.in_flight == 0
+
+
+def test_latency_growth_backs_off():
+    limiter = AdaptiveLimiter(initial=8, max_limit=8)
+    for _ in range(10):
+        answer(limiter, 0.2)
+    assert limiter.decreases == 0
+
+    # Under sustained load the fastest latency seen stays the reference
+    for _ in range(50):
+        answer(limiter, 0.6)
+    assert limiter.decreases >= 1
+    assert limiter.stats()['classes']['stats.throughput']['baseline'] == \
+        pytest.approx(0.2, abs=0.05)
+
+
+def test_request_classes_keep_their_own_baseline():
+    limiter = AdaptiveLimiter(initial=4)
+    for _ in range(20):
+        answer(limiter, 0.01, key='appliance_inventory.appliances')
+        answer(limiter, 1.0, key='stats.throughput')
+
+    # Quick listings do not make the slow reports look overloaded
+    assert limiter.decreases == 0
+    assert limiter.limit == 4
+
+
+def test_latency_target():
+    limiter = AdaptiveLimiter(initial=4, latency_target=0.1)
+    answer(limiter, 0.5)
+    assert limiter.limit == 2
+
+
+def test_slot_releases_on_errors():
+    limiter = AdaptiveLimiter(initial=4)
+    with pytest.raises(HTTPError):
+        with limiter.slot(key='stats.qos'):
+            raise HTTPError(503)
+    assert limiter.in_flight == 0
+    assert limiter.limit == 2
+
+
+def test_invalid_limits():
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(initial=8, max_limit=4)
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(backoff=1)
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.take(timeout=0)
+    assert bucket.take(timeout=0)
+    assert not bucket.take(timeout=0)
+    assert bucket.take(timeout=1)
+
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_scc_limiter_is_opt_in():
+    assert SCC('limited.example.com').limiter is None
+
+    shared = SCC('limited.example.com', limiter=True).limiter
+    assert isinstance(shared, AdaptiveLimiter)
+    assert SCC('limited.example.com', limiter=True).limiter is shared
+
+    limiter = AdaptiveLimiter(initial=8, max_limit=8)
+    assert SCC('limited.example.com', limiter=limiter).limiter is limiter
+
+
+def test_report_requests_go_through_the_limiter():
+    limiter = AdaptiveLimiter()
+    scc = FakeSCC(limiter=limiter)
+    report = ThroughputStatsReport(scc)
+    report.run(start_time=dt(3600), end_time=dt(7200), device='serial',
+               traffic_type='peak')
+
+    stats = limiter.stats()
+    assert stats['succeeded'] == 1
+    assert list(stats['classes']) == ['stats.throughput']
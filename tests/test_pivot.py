@@ -0,0 +1,85 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import numpy
+import pytest
+
+from steelscript.scc.core.report import ThroughputPerApplStatsReport, \
+    ThroughputStatsReport, SCCException
+from steelscript.scc.core.pivot import pivot, device_matrix
+
+from conftest import FakeSCC
+
+HOUR = 3600
+DAY = 86400
+
+
+def per_appliance(resource, criteria):
+    # Appliance 'b' only reports during the second hour
+    hour = (criteria['start_time'] - DAY) // HOUR
+    return {'response_data': [{'device': d, 'data': [hour, 1, 2, 3]}
+                              for d in criteria['devices']
+                              if d != 'b' or hour == 1]}
+
+
+def test_pivot_records_of_each_window():
+    windows = {HOUR: [{'device': 'b', 'data': [2, 20]}],
+               0: [{'device': 'a', 'data': [1, 10]},
+                   {'device': 'b', 'data': [3, 30]}]}
+    matrix = pivot(windows, columns=['in', 'out'])
+
+    assert matrix.devices == ['a', 'b']
+    assert matrix.timestamps.tolist() == [0, HOUR]
+    assert matrix.loc('b', HOUR).tolist() == [2.0, 20.0]
+    assert numpy.isnan(matrix.loc('a', HOUR)).all()
+    assert matrix.column('out')[1].tolist() == [30.0, 20.0]
+
+    # Unlisted devices are dropped, listed ones kept without data
+    listed = pivot(windows, columns=['in', 'out'], devices=['c', 'b'])
+    assert listed.devices == ['c', 'b']
+    assert numpy.isnan(listed.device('c')).all()
+    assert listed.device('b')[:, 0].tolist() == [3.0, 2.0]
+
+
+def test_sparse_and_dense_matrices_match():
+    windows = [(0, [{'device': 'a', 'data': [1]}]),
+               (HOUR, [{'device': 'b', 'data': [2]}])]
+    sparse = pivot(windows, columns=['in'], sparse=True)
+
+    assert len(sparse) == 2 and sparse.density == 0.5
+    assert sparse.at(HOUR).keys.tolist() == ['b']
+    assert numpy.isnan(sparse.loc('a', HOUR)).all()
+    dense = sparse.to_dense()
+    assert numpy.array_equal(dense.values, pivot(windows, ['in']).values,
+                             equal_nan=True)
+    assert dense.to_sparse().values.tolist() == sparse.values.tolist()
+
+
+def test_device_matrix_runs_one_report_per_window():
+    scc = FakeSCC(per_appliance)
+    matrix = device_matrix(scc, ThroughputPerApplStatsReport, 'a,b',
+                           start_time=DAY + 600,
+                           end_time=DAY + 2 * HOUR - 600,
+                           traffic_type='peak')
+
+    # The range is extended to whole windows
+    assert sorted(c['start_time'] for _, c in scc.stats.calls) == \
+        [DAY, DAY + HOUR]
+    assert matrix.columns == ThroughputPerApplStatsReport.columns
+    assert matrix.column('wan_in').tolist()[0] == [0.0, 1.0]
+    assert numpy.isnan(matrix.loc('b', DAY)).all()
+
+
+def test_device_matrix_arguments():
+    scc = FakeSCC(per_appliance)
+    with pytest.raises(SCCException):
+        device_matrix(scc, ThroughputStatsReport, ['a'], 0, HOUR)
+    with pytest.raises(SCCException):
+        device_matrix(scc, ThroughputPerApplStatsReport, ['a'], 0, HOUR,
+                      window=1000)
+    with pytest.raises(SCCException):
+        device_matrix(scc, ThroughputPerApplStatsReport, ['a'])
+    assert scc.stats.calls == []
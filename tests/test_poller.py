@@ -0,0 +1,105 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import pytest
+
+from steelscript.scc.core.report import ThroughputStatsReport, \
+    QoSStatsReport, SCCException
+from steelscript.scc.core.poller import ReportPoller
+
+from conftest import FakeSCC, time_series
+
+DAY = 86400
+
+
+def test_rewound_points_are_returned_again():
+    scc = FakeSCC()
+    poller = ReportPoller(scc, lookback=3600, settle_time=0)
+    series = poller.add(ThroughputStatsReport, device='serial',
+                        traffic_type='peak')
+
+    first = poller.poll(DAY)
+    assert len(first) == 12
+    new = poller.poll(DAY + 600)
+    assert [p.timestamp for p in new] == [DAY, DAY + 300]
+
+    # The points of the second poll could not be stored
+    poller.rewind(series, DAY)
+    again = poller.poll(DAY + 600)
+    assert [p.timestamp for p in again] == [DAY, DAY + 300]
+    assert not any(p.revised for p in again)
+    assert poller.poll(DAY + 600) == []
+
+
+def test_polls_only_request_new_buckets():
+    scc = FakeSCC()
+    poller = ReportPoller(scc, lookback=3600, late_window=900,
+                          settle_time=60)
+    series = poller.add('throughput', device='serial', traffic_type='peak')
+
+    points = poller.poll(DAY + 60)
+    assert [p.timestamp for p in points] == \
+        list(range(DAY - 3600, DAY, 300))
+    assert series.last == DAY - 300 and series.granularity == 300
+
+    # Not settled yet
+    assert poller.poll(DAY + 300) == []
+    points = poller.poll(DAY + 360)
+    assert [p.timestamp for p in points] == [DAY]
+    request = scc.stats.calls[-1][1]
+    assert (request['start_time'], request['end_time']) == \
+        (DAY - 900, DAY + 300)
+
+
+def test_late_and_revised_buckets():
+    missing = set([DAY - 600])
+    value = [1]
+
+    def handler(resource, criteria):
+        payload = time_series(criteria, value=value[0])
+        payload['response_data'] = [r for r in payload['response_data']
+                                    if r['timestamp'] not in missing]
+        return payload
+
+    poller = ReportPoller(FakeSCC(handler), lookback=3600, settle_time=0)
+    poller.add(ThroughputStatsReport, device='serial', traffic_type='peak')
+    assert len(poller.poll(DAY)) == 11
+
+    missing.clear()
+    value[0] = 2
+    points = poller.poll(DAY + 300)
+    late = [p for p in points if not p.revised]
+    assert [p.timestamp for p in late] == [DAY - 600, DAY]
+    assert sorted(p.timestamp for p in points if p.revised) == \
+        [DAY - 900, DAY - 300]
+
+
+def test_failing_series_do_not_stop_the_others():
+    def handler(resource, criteria):
+        if criteria['device'] == 'bad':
+            raise SCCException('unknown device')
+        return time_series(criteria)
+
+    poller = ReportPoller(FakeSCC(handler), settle_time=0)
+    good = poller.add('throughput', device='good', traffic_type='peak')
+    bad = poller.add('throughput', device='bad', traffic_type='peak')
+
+    points = poller.poll(DAY)
+    assert set(p.series for p in points) == set([good])
+    assert good.error is None
+    assert isinstance(bad.error, SCCException)
+
+
+def test_series_must_be_single_time_series():
+    poller = ReportPoller(FakeSCC())
+    with pytest.raises(SCCException):
+        poller.add('bw_usage', device='serial')
+    with pytest.raises(SCCException):
+        poller.add('throughput', device='serial', start_time=0)
+    with pytest.raises(SCCException):
+        poller.add(QoSStatsReport, device='serial', qos_class_id=[1, 2])
+    with pytest.raises(SCCException):
+        poller.add('no_such_resource', device='serial')
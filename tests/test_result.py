@@ -0,0 +1,75 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import numpy
+import pytest
+
+from steelscript.scc.core.result import ColumnarResult, SeriesMatrix
+
+
+def records(timestamps, value=1):
+    return [{'timestamp': t, 'data': [value, 2 * value]} for t in timestamps]
+
+
+def test_records_round_trip():
+    recs = records([0, 300, 600])
+    result = ColumnarResult.from_records(recs, 'timestamp',
+                                         ['wan_in', 'wan_out'])
+
+    assert result.timestamps.dtype == numpy.int64
+    assert result['wan_out'].tolist() == [2.0, 2.0, 2.0]
+    assert result.to_records() == [
+        {'timestamp': r['timestamp'], 'data': [1.0, 2.0]} for r in recs]
+
+
+def test_short_records_are_padded_and_columns_named():
+    result = ColumnarResult.from_records(
+        [{'port': 80, 'data': [1, 2]}, {'port': 443, 'data': [3]}], 'port',
+        columns=['only_one'])
+
+    assert result.columns == ['value_0', 'value_1']
+    assert numpy.isnan(result.values[1, 1])
+    with pytest.raises(KeyError):
+        result['only_one']
+    with pytest.raises(AttributeError):
+        result.timestamps
+
+
+def test_join_aligns_on_keys():
+    peak = ColumnarResult.from_records(records([0, 300]), 'timestamp',
+                                       ['in', 'out'])
+    optimized = ColumnarResult.from_records(records([300, 600], 5),
+                                            'timestamp', ['in', 'out'])
+    joined = ColumnarResult.join([('peak', peak), ('opt', optimized)])
+
+    assert joined.timestamps.tolist() == [0, 300, 600]
+    assert joined.columns == ['peak.in', 'peak.out', 'opt.in', 'opt.out']
+    assert numpy.isnan(joined['opt.in'][0])
+    assert joined['opt.in'][1:].tolist() == [5.0, 5.0]
+
+
+def test_series_matrix_aligns_labels():
+    matrix = SeriesMatrix.from_results('qos_class_id', [
+        (1, records([0, 300])), (2, records([300, 600], 3))],
+        columns=['in', 'out'])
+
+    assert matrix.values.shape == (2, 3, 2)
+    assert matrix.timestamps.tolist() == [0, 300, 600]
+    assert matrix.at(300).tolist() == [[1.0, 2.0], [3.0, 6.0]]
+    assert numpy.isnan(matrix['in'][0, 2])
+    assert matrix.series(2)['out'][1:].tolist() == [6.0, 6.0]
+    with pytest.raises(KeyError):
+        matrix.series(3)
+
+
+def test_to_pandas():
+    pandas = pytest.importorskip('pandas')
+    result = ColumnarResult.from_records(records([0, 300]), 'timestamp',
+                                         ['in', 'out'])
+    df = result.to_pandas()
+
+    assert list(df.columns) == ['timestamp', 'in', 'out']
+    assert df['timestamp'][1] == pandas.Timestamp(300, unit='s', tz='UTC')
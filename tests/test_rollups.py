@@ -0,0 +1,82 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import numpy
+import pytest
+
+from steelscript.scc.core.result import ColumnarResult
+from steelscript.scc.core.rollups import rollup
+
+HOUR = 3600
+
+
+def series(values, start=0, granularity=300):
+    keys = numpy.arange(start, start + granularity * len(values),
+                        granularity, dtype=numpy.int64)
+    return ColumnarResult('timestamp', keys,
+                          numpy.array(values, dtype=float).reshape(-1, 1),
+                          ['wan_out'], granularity=granularity)
+
+
+def test_statistics_per_series_and_window():
+    result = rollup({'a': series(range(24))}, window=HOUR,
+                    stats=['peak', 'p50', 'mean', 'sum', 'min'])
+
+    assert result.groups == ['a']
+    assert result.windows.tolist() == [0, HOUR]
+    assert result.column('peak', 'wan_out').tolist() == [[11.0, 23.0]]
+    assert result.column('p50', 'wan_out').tolist() == [[5.5, 17.5]]
+    assert result['sum'][0, :, 0].tolist() == [66.0, 210.0]
+    assert result['min'][0, :, 0].tolist() == [0.0, 12.0]
+
+
+def test_groups_are_summed_before_statistics():
+    results = {'a': series([1, 5, 1]), 'b': series([4, 1, 4]),
+               'c': series([7, 7, 7])}
+    result = rollup(results, window=HOUR, stats=['peak'],
+                    group_by={'a': 'site1', 'b': 'site1'})
+
+    assert result.groups == ['site1', 'c']
+    # The peak of the total, not the sum of the peaks
+    assert result.column('peak', 'wan_out')[:, 0].tolist() == [6.0, 7.0]
+
+    everything = rollup(results, window=None, stats=['sum'],
+                        group_by='all')
+    assert everything.groups == ['all']
+    assert everything['sum'].tolist() == [[[37.0]]]
+
+
+def test_missing_points_are_ignored():
+    # The second series starts an hour later
+    results = [('a', series([2] * 24)), ('b', series([1] * 12, start=HOUR))]
+    result = rollup(results, window=HOUR, stats=['mean', 'sum'],
+                    group_by=lambda label: 'all')
+
+    assert result.column('mean', 'wan_out').tolist() == [[2.0, 3.0]]
+    full = rollup({'a': series([1] * 12)}, window=HOUR, stats=['sum'])
+    assert not numpy.isnan(full['sum']).any()
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        rollup({})
+    with pytest.raises(ValueError):
+        rollup({'a': series([1])}, stats=['median'])
+    with pytest.raises(ValueError):
+        rollup({'a': series([1])}, window=1000)
+    other = ColumnarResult('timestamp', numpy.array([0]), [[1.0, 2.0]],
+                           ['wan_in', 'wan_out'])
+    with pytest.raises(ValueError):
+        rollup({'a': series([1]), 'b': other})
+
+
+def test_to_pandas():
+    pytest.importorskip('pandas')
+    df = rollup({'a': series(range(24))}, window=HOUR,
+                stats=['peak']).to_pandas()
+
+    assert list(df.columns) == ['group', 'timestamp', 'peak_wan_out']
+    assert df['peak_wan_out'].tolist() == [11.0, 23.0]
@@ -0,0 +1,126 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import pytest
+
+from steelscript.scc.core.report import ThroughputStatsReport
+from steelscript.scc.core.segments import SegmentStore
+
+from conftest import FakeSCC, dt, time_series
+
+DAY = 86400
+
+
+def by_span(resource, criteria):
+    # As the SCC does, long ranges are answered hourly
+    span = criteria['end_time'] - criteria['start_time']
+    return time_series(criteria, granularity=3600 if span > DAY else 300)
+
+
+@pytest.fixture
+def store():
+    store = SegmentStore(':memory:', settle_time=0)
+    yield store
+    store.close()
+
+
+def run(scc, start, end):
+    report = ThroughputStatsReport(scc)
+    report.run(start_time=dt(start), end_time=dt(end), device='serial',
+               traffic_type='peak')
+    return report
+
+
+def test_held_buckets_are_not_requested_again(store):
+    scc = FakeSCC(segment_store=store)
+    run(scc, DAY, DAY + 3 * 3600)
+    # A range of the same length an hour later
+    report = run(scc, DAY + 3600, DAY + 4 * 3600)
+
+    assert len(scc.stats.calls) == 2
+    # Only the range not held yet is requested
+    gap = scc.stats.calls[1][1]
+    assert (gap['start_time'], gap['end_time']) == \
+        (DAY + 3 * 3600, DAY + 4 * 3600)
+    timestamps = [rec['timestamp'] for rec in report.data]
+    assert timestamps == list(range(DAY + 3600, DAY + 4 * 3600, 300))
+
+
+def test_series_are_kept_per_granularity(store):
+    scc = FakeSCC(by_span, segment_store=store)
+    run(scc, DAY, 4 * DAY)
+    report = run(scc, DAY, DAY + 3 * 3600)
+
+    # The hourly buckets of the long range do not answer the short one
+    assert len(scc.stats.calls) == 2
+    assert report.granularity == 300
+    assert len(report.data) == 36
+
+    series = store.series(scc.host, 'throughput',
+                          {'device': 'serial', 'traffic_type': 'peak'})
+    assert sorted(series) == [300, 3600]
+
+
+def test_gaps_answered_at_another_granularity_refetch_the_range(store):
+    granularity = [300]
+
+    def handler(resource, criteria):
+        return time_series(criteria, granularity=granularity[0])
+
+    scc = FakeSCC(handler, segment_store=store)
+    run(scc, DAY, DAY + 3 * 3600)
+    granularity[0] = 3600
+    report = run(scc, DAY + 3600, DAY + 4 * 3600)
+
+    # The held 5 minute buckets are not mixed with hourly ones
+    assert scc.stats.calls[-1][1]['start_time'] == DAY + 3600
+    assert report.granularity == 3600
+    assert [rec['timestamp'] for rec in report.data] == \
+        list(range(DAY + 3600, DAY + 4 * 3600, 3600))
+
+
+def test_add_requires_a_known_series(store):
+    with pytest.raises(ValueError):
+        store.add(42, 0, 3600, [])
+
+
+def test_missing_ranges(store):
+    series = store.series_id('host', 'throughput', {'device': 'a'}, 300)
+    store.add(series, 3600, 7200, [])
+    assert store.missing(series, 0, 10800) == [(0, 3600), (7200, 10800)]
+    assert store.missing(series, 3600, 7200) == []
+
+
+def test_repeated_long_window_only_requests_the_gap(store):
+    scc = FakeSCC(by_span, segment_store=store)
+    span = 672 * 3600
+    run(scc, 30 * DAY, 30 * DAY + span)
+    assert len(scc.stats.calls) == 1
+
+    # The same relative window an hour later
+    report = run(scc, 30 * DAY + 3600, 30 * DAY + span + 3600)
+
+    assert len(scc.stats.calls) == 2
+    gap = scc.stats.calls[1][1]
+    assert gap['end_time'] == 30 * DAY + span + 3600
+    assert report.granularity == 3600
+    assert [rec['timestamp'] for rec in report.data] == \
+        list(range(30 * DAY + 3600, 30 * DAY + span + 3600, 3600))
+
+    # Held again, the window is answered without any request
+    run(scc, 30 * DAY + 3600, 30 * DAY + span + 3600)
+    assert len(scc.stats.calls) == 2
+
+
+def test_shortest_span(store):
+    store.set_span_granularity('host', 'throughput', 2 * DAY, 3600)
+    store.set_span_granularity('host', 'throughput', 28 * DAY, 3600)
+    store.set_span_granularity('host', 'throughput', 3600, 300)
+
+    assert store.shortest_span('host', 'throughput', 3600, 3600) == 2 * DAY
+    assert store.shortest_span('host', 'throughput', 3600, 3 * DAY) == \
+        28 * DAY
+    assert store.shortest_span('host', 'throughput', 3600, 30 * DAY) is None
@@ -0,0 +1,69 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import os
+import pickle
+import shutil
+
+from unittest import mock
+
+import pytest
+
+from steelscript.scc.core import scc
+
+SERVICEDEF = os.path.join(os.path.dirname(scc.__file__), 'servicedef',
+                          'cmc.appliance_inventory.yml')
+
+
+@pytest.fixture
+def servicedef(tmpdir):
+    filename = str(tmpdir.join('cmc.appliance_inventory.yml'))
+    shutil.copy(SERVICEDEF, filename)
+    return filename
+
+
+def plant(loader, filename, value):
+    """Write value as the cached pickle of the current filename content."""
+    with open(filename, 'rb') as f:
+        cache_file = loader._cache_file(filename, f.read())
+    os.makedirs(loader.cache_dir, mode=0o700, exist_ok=True)
+    with open(cache_file, 'wb') as f:
+        pickle.dump(value, f)
+    os.chmod(cache_file, 0o600)
+
+
+def test_cache_is_opt_in(servicedef):
+    with mock.patch.object(scc, 'SERVICEDEF_CACHE_DIR', None):
+        loader = scc.ServiceDefLoader()
+    assert not loader.cache_dir
+    assert loader.load(servicedef).name == 'cmc.appliance_inventory'
+
+
+def test_cached_definitions_are_loaded(servicedef, tmpdir):
+    loader = scc.ServiceDefLoader(str(tmpdir.join('cache')))
+    first = loader.load(servicedef)
+    assert len(os.listdir(loader.cache_dir)) == 1
+    assert loader.load(servicedef).name == first.name
+
+    plant(loader, servicedef, 'cached')
+    assert loader.load(servicedef) == 'cached'
+
+
+def test_stale_pickles_are_ignored(servicedef, tmpdir):
+    loader = scc.ServiceDefLoader(str(tmpdir.join('cache')))
+    plant(loader, servicedef, 'stale')
+    with open(servicedef, 'a') as f:
+        f.write('\n# edited\n')
+
+    assert loader.load(servicedef).name == 'cmc.appliance_inventory'
+
+
+def test_pickles_of_other_users_are_ignored(servicedef, tmpdir):
+    loader = scc.ServiceDefLoader(str(tmpdir.join('cache')))
+    plant(loader, servicedef, 'foreign')
+
+    with mock.patch('os.getuid', return_value=os.getuid() + 1):
+        assert loader.load(servicedef).name == 'cmc.appliance_inventory'
@@ -0,0 +1,35 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import pytest
+
+from steelscript.common.service import OAuth
+from steelscript.scc.core.scc import SCC, SCCException
+
+
+def test_services_are_resolved_on_first_use(stub_server):
+    scc = SCC(stub_server.url, auth=OAuth('access code'))
+    assert 'stats' not in scc.__dict__
+
+    stats = scc.stats
+    assert scc.stats is stats
+    assert 'appliance_inventory' not in scc.__dict__
+
+
+def test_requested_services_are_resolved_at_once(stub_server):
+    scc = SCC(stub_server.url, auth=OAuth('access code'),
+              services=['appliance_inventory'])
+    assert 'appliance_inventory' in scc.__dict__
+
+    with pytest.raises(SCCException):
+        scc.stats
+
+
+def test_unknown_services_and_attributes():
+    with pytest.raises(SCCException):
+        SCC('scc.example.com', services=['stats', 'reports'])
+    with pytest.raises(AttributeError):
+        SCC('scc.example.com').reports
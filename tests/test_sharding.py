@@ -0,0 +1,66 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import pytest
+
+from steelscript.scc.core.report import ThroughputStatsReport, SCCException
+
+from conftest import FakeSCC, dt, time_series
+
+DAY = 86400
+
+
+def run(scc, start, end, **options):
+    report = ThroughputStatsReport(scc, **options)
+    report.run(start_time=dt(start), end_time=dt(end), device='serial',
+               traffic_type='peak')
+    return report
+
+
+def test_windows_are_aligned_to_the_shard_size():
+    scc = FakeSCC()
+    report = ThroughputStatsReport(scc, shard_size=DAY)
+    assert report._shard_windows(DAY + 3600, 3 * DAY + 7200) == [
+        (DAY + 3600, 2 * DAY), (2 * DAY, 3 * DAY),
+        (3 * DAY, 3 * DAY + 7200)]
+
+
+def test_sharded_report_is_stitched_in_order():
+    scc = FakeSCC()
+    report = run(scc, DAY, 4 * DAY, shard_size=DAY)
+
+    assert len(scc.stats.calls) == 3
+    timestamps = [rec['timestamp'] for rec in report.data]
+    assert timestamps == list(range(DAY, 4 * DAY, 300))
+    assert report.granularity == 300
+
+
+def test_points_on_window_boundaries_are_kept_once():
+    def handler(resource, criteria):
+        # Answer the bucket at end_time as well
+        payload = time_series(criteria)
+        payload['response_data'].append(
+            {'timestamp': criteria['end_time'], 'data': [1] * 4})
+        return payload
+
+    report = run(FakeSCC(handler), DAY, 3 * DAY, shard_size=DAY)
+    timestamps = [rec['timestamp'] for rec in report.data]
+    assert timestamps == sorted(set(timestamps))
+
+
+def test_windows_of_different_granularities_are_refused():
+    def handler(resource, criteria):
+        # Older windows are answered hourly
+        granularity = 3600 if criteria['start_time'] < 2 * DAY else 300
+        return time_series(criteria, granularity=granularity)
+
+    with pytest.raises(SCCException, match='different granularities'):
+        run(FakeSCC(handler), DAY, 3 * DAY, shard_size=DAY)
+
+
+def test_shard_size_must_be_a_multiple_of_an_hour():
+    with pytest.raises(SCCException):
+        ThroughputStatsReport(FakeSCC(), shard_size=1000)
@@ -0,0 +1,74 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import time
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from steelscript.scc.core.report import ThroughputStatsReport
+from steelscript.scc.core.singleflight import SingleFlight
+
+from conftest import FakeSCC, dt
+
+
+def test_singleflight_coalesces_identical_calls():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'value': 1}
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        leader = executor.submit(flight.do, 'key', fetch)
+        started.wait(5)
+        followers = [executor.submit(flight.do, 'key', fetch)
+                     for _ in range(4)]
+        while flight.coalesced < 4:
+            time.sleep(0.01)
+        release.set()
+        results = [f.result() for f in [leader] + followers]
+
+    assert calls == [1]
+    assert results == [{'value': 1}] * 5
+    assert flight.stats()['executed'] == 1
+
+
+def test_singleflight_shares_exceptions():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        flight.do('key', fail)
+    # Finished calls are forgotten, the next one runs again
+    assert flight.do('key', lambda: 2) == 2
+
+
+def test_identical_reports_send_one_request():
+    scc = FakeSCC(delay=0.2)
+    barrier = threading.Barrier(4)
+
+    def run(i):
+        barrier.wait()
+        report = ThroughputStatsReport(scc)
+        report.run(start_time=dt(3600), end_time=dt(7200),
+                   device='serial', traffic_type='peak')
+        return report
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        reports = list(executor.map(run, range(4)))
+
+    assert len(scc.stats.calls) == 1
+    assert all(len(r.data) == 12 for r in reports)
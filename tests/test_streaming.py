@@ -0,0 +1,72 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import json
+
+import pytest
+
+from steelscript.common.service import OAuth
+from steelscript.scc.core.scc import SCC
+from steelscript.scc.core.report import ThroughputStatsReport, \
+    QoSStatsReport, SCCException
+from steelscript.scc.core.streaming import JSONArrayStream
+
+from conftest import FakeSCC, dt
+
+DOCUMENT = {'granularity': 300,
+            'response_data': [{'timestamp': 1500000000 + i,
+                               'data': [1.5e3, -2, 'café']}
+                              for i in range(5)],
+            'query_criteria': {'device': 'serial'}}
+
+
+def chunks(document, size):
+    data = json.dumps(document, ensure_ascii=False).encode('utf-8')
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('size', [1, 2, 7, 4096])
+def test_records_are_decoded_across_chunks(size):
+    # Single bytes split numbers and multi-byte characters
+    stream = JSONArrayStream(chunks(DOCUMENT, size), 'response_data')
+
+    assert list(stream) == DOCUMENT['response_data']
+    assert stream.header == {'granularity': 300,
+                             'query_criteria': {'device': 'serial'}}
+
+
+def test_top_level_and_empty_arrays():
+    assert list(JSONArrayStream(chunks([1, 22, 333], 1), None)) == \
+        [1, 22, 333]
+    assert list(JSONArrayStream([b'{"response_data": []}'],
+                                'response_data')) == []
+
+
+def test_truncated_stream_raises():
+    data = chunks(DOCUMENT, 10)[:-2]
+    with pytest.raises(ValueError):
+        list(JSONArrayStream(data, 'response_data'))
+
+
+def test_stream_rejects_fanned_out_criteria():
+    scc = FakeSCC()
+    report = QoSStatsReport(scc)
+    with pytest.raises(SCCException):
+        next(report.stream(start_time=dt(0), end_time=dt(3600),
+                           device='serial', qos_class_id=[1, 2]))
+    assert scc.stats.calls == []
+
+
+def test_stream_reads_the_response(stub_server):
+    scc = SCC(stub_server.url, auth=OAuth('access code'))
+    report = ThroughputStatsReport(scc)
+    records = list(report.stream(chunk_size=64, start_time=dt(3600),
+                                 end_time=dt(7200), device='serial',
+                                 traffic_type='peak'))
+
+    assert [r['timestamp'] for r in records] == list(range(3600, 7200, 300))
+    assert report.granularity == 300
+    assert report.data is None
@@ -0,0 +1,78 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import pytest
+
+from steelscript.scc.core.report import CpuUtilizationStatsReport, \
+    ThroughputPerApplStatsReport, SCCException
+from steelscript.scc.core.sweep import FleetSweep
+
+from conftest import FakeSCC, dt, time_series
+
+APPLIANCES = [{'id': i, 'serial': 'S%d' % i,
+               'product_code': 'SH' if i % 2 else 'EX'} for i in range(6)]
+
+
+def handler(resource, criteria):
+    if resource == 'appliances':
+        return APPLIANCES
+    if criteria['device'] == 'S3':
+        raise SCCException('appliance S3 is offline')
+    return time_series(criteria)
+
+
+def run(sweep):
+    return list(sweep.run(start_time=dt(3600), end_time=dt(7200)))
+
+
+def test_every_appliance_is_reported_on():
+    scc = FakeSCC(handler)
+    sweep = FleetSweep(scc, 'cpu_utilization', max_workers=2)
+    results = run(sweep)
+
+    assert sorted(r.name for r in results) == \
+        ['S%d' % i for i in range(6)]
+    assert sorted(r.appliance['id'] for r in results) == list(range(6))
+    progress = sweep.progress
+    assert (progress.succeeded, progress.failed, progress.remaining) == \
+        (5, 1, 0)
+    assert isinstance(progress.failures['S3'], SCCException)
+    assert progress.fraction == 1.0 and progress.finished is not None
+
+
+def test_devices_and_filter():
+    scc = FakeSCC(handler)
+    sweep = FleetSweep(scc, CpuUtilizationStatsReport,
+                       devices=['S1', 'S2', 'S3', 'unknown'],
+                       appliance_filter=lambda a: a.get('product_code')
+                       != 'EX')
+    results = run(sweep)
+
+    # Devices missing from the inventory are still reported on
+    assert sorted(r.name for r in results) == ['S1', 'S3', 'unknown']
+    assert [r.name for r in results if not r.ok] == ['S3']
+
+
+def test_stopping_early_leaves_appliances_unqueried():
+    scc = FakeSCC(handler)
+    sweep = FleetSweep(scc, CpuUtilizationStatsReport, max_workers=1)
+    results = sweep.run(start_time=dt(3600), end_time=dt(7200))
+    next(results)
+    results.close()
+
+    # At most max_workers reports are queued ahead of the consumer
+    assert len(scc.stats.calls) <= 2
+    assert sweep.progress.done == 1
+
+
+def test_invalid_sweeps():
+    scc = FakeSCC(handler)
+    with pytest.raises(SCCException):
+        FleetSweep(scc, ThroughputPerApplStatsReport)
+    with pytest.raises(ValueError):
+        FleetSweep(scc, 'cpu_utilization', max_workers=0)
+    with pytest.raises(SCCException):
+        next(FleetSweep(scc, 'cpu_utilization').run(device='S1'))